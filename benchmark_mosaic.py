@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Banc d'Essai de la Mosaïque - Art Informatique
+Mesure le débit de chaque étape de la mosaïque vidéo sur des entrées synthétiques reproductibles
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import cv2
+import numpy as np
+
+from video_mosaic import VideoMosaic
+from effets_art import EFFETS, ChaineEffets
+from bibliotheque_photos import BibliothequePhotos
+from magasin_tuiles import MagasinTuiles
+
+
+def preparer_bibliotheque(dossier_travail, nombre_photos, graine):
+    """Crée (une seule fois par taille et graine) une bibliothèque de photos synthétiques"""
+    dossier = os.path.join(dossier_travail, f"photos_{nombre_photos}_{graine}")
+    if not os.path.isdir(dossier):
+        VideoMosaic(dossier, charger=False, silencieux=True).creer_photos_demo(nombre_photos, graine, dossier)
+    return dossier
+
+
+def preparer_video(dossier_travail, largeur, hauteur, nombre_frames, graine):
+    """Crée (une seule fois par résolution et graine) une vidéo synthétique"""
+    chemin = os.path.join(dossier_travail, f"video_{largeur}x{hauteur}_{nombre_frames}_{graine}.mp4")
+    if not os.path.exists(chemin):
+        demo = VideoMosaic(charger=False, silencieux=True)
+        demo.creer_video_demo(chemin, largeur, hauteur, 30, graine=graine, nombre_frames=nombre_frames)
+    return chemin
+
+
+def mesurer_chargement(dossier_photos, **options):
+    """Temps de chargement de la bibliothèque sans index ni atlas (froid) puis avec index (chaud)"""
+    index = os.path.join(dossier_photos, BibliothequePhotos.FICHIER_INDEX)
+    if os.path.exists(index):
+        os.remove(index)
+    shutil.rmtree(os.path.join(dossier_photos, MagasinTuiles.DOSSIER), ignore_errors=True)
+    debut = time.perf_counter()
+    VideoMosaic(dossier_photos, silencieux=True, **options)
+    froid = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    mosaic = VideoMosaic(dossier_photos, silencieux=True, **options)
+    chaud = time.perf_counter() - debut
+    return mosaic, froid, chaud
+
+
+ETAPES = ('decodage', 'effets', 'analyse', 'recherche', 'assemblage', 'encodage')
+
+
+def mesurer_cas(mosaic, chemin_video, taille_pixel, dossier_travail):
+    """Temps par frame de chaque étape du rendu pour une vidéo et une taille de tuile
+
+    Chaque frame passe par mosaic.rendre_frame, comme dans traiter_video: les modes de la mosaïque
+    (descripteur, incrémental, tuiles adaptatives, diversité, effets) sont mesurés tels qu'ils
+    sont rendus. Les temps par étape sont ceux que la mosaïque note dans son suivi.
+    """
+    temps = {etape: [] for etape in ETAPES}
+    suivi = mosaic.suivi
+
+    cap = cv2.VideoCapture(chemin_video)
+    largeur = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    hauteur = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    sortie = os.path.join(dossier_travail, "sortie_benchmark.mp4")
+    out = cv2.VideoWriter(sortie, cv2.VideoWriter_fourcc(*'mp4v'), 30, (largeur, hauteur))
+
+    # Les atlas sont construits (ou relus sur disque) hors mesure, comme au premier rendu d'une vidéo
+    debut = time.perf_counter()
+    mosaic.preparer_atlas(mosaic.tailles_rendu(hauteur, largeur, taille_pixel))
+    preparation_atlas = time.perf_counter() - debut
+
+    # Frame source et frame mosaïque réutilisées, comme dans traiter_video
+    frame, resultat = None, None
+    mosaic.reinitialiser_incremental()
+    suivi.commencer()
+    try:
+        while True:
+            avant = dict(suivi.temps_etapes)
+            with suivi.mesurer('decodage'):
+                ret, frame = cap.read(image=frame)
+            if not ret:
+                break
+            resultat = mosaic.rendre_frame(frame, taille_pixel, resultat)
+            with suivi.mesurer('encodage'):
+                out.write(resultat)
+            suivi.frames_terminees()
+
+            for etape in ETAPES:
+                temps[etape].append(suivi.temps_etapes.get(etape, 0.0) - avant.get(etape, 0.0))
+    finally:
+        cap.release()
+        out.release()
+        mosaic.reinitialiser_incremental()
+        if os.path.exists(sortie):
+            os.remove(sortie)
+
+    resultats = {'preparation_atlas': preparation_atlas, 'frames': len(temps['analyse'])}
+    for etape, valeurs in temps.items():
+        valeurs = np.array(valeurs) if valeurs else np.zeros(1)
+        resultats[etape] = {'mediane': float(np.median(valeurs)), 'moyenne': float(valeurs.mean()),
+                            'min': float(valeurs.min()), 'max': float(valeurs.max())}
+    # Débit sur le temps moyen: en mode incrémental, les frames rapides et les recherches complètes alternent
+    total = sum(resultats[etape]['moyenne'] for etape in temps)
+    resultats['fps'] = 1.0 / total if total > 0 else 0.0
+    caches = suivi.etat()['taux_caches']
+    if caches:
+        resultats['taux_caches'] = caches
+    return resultats
+
+
+def environnement():
+    """Description de la machine et des versions, pour comparer des mesures comparables"""
+    try:
+        import scipy
+        version_scipy = scipy.__version__
+    except ImportError:
+        version_scipy = None
+    return {
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'processeur': platform.processor(),
+        'coeurs': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'scipy': version_scipy,
+        'threads_opencv': cv2.getNumThreads(),
+    }
+
+
+def executer(resolutions, tailles_pixel, tailles_bibliotheque, nombre_frames=30, graine=0,
+             dossier_travail=None, **options):
+    """Mesure toutes les combinaisons résolution × taille de tuile × taille de bibliothèque
+
+    options: paramètres de VideoMosaic décidant du mode de rendu mesuré (niveaux_table, descripteur,
+    seuil_incremental, taille_min_adaptative, diversite, effets_avant...)
+    """
+    temporaire = dossier_travail is None
+    dossier_travail = dossier_travail or tempfile.mkdtemp(prefix="benchmark_mosaic_")
+    os.makedirs(dossier_travail, exist_ok=True)
+
+    rapport = {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environnement': environnement(),
+               'parametres': {'resolutions': [f"{l}x{h}" for l, h in resolutions], 'tailles_pixel': tailles_pixel,
+                              'tailles_bibliotheque': tailles_bibliotheque, 'frames': nombre_frames,
+                              'graine': graine, 'options': options},
+               'cas': []}
+    try:
+        for nombre_photos in tailles_bibliotheque:
+            dossier_photos = preparer_bibliotheque(dossier_travail, nombre_photos, graine)
+            mosaic, froid, chaud = mesurer_chargement(dossier_photos, **options)
+            print(f"📚 {nombre_photos} photos: chargement {froid:.2f}s à froid, {chaud:.2f}s avec l'index")
+
+            for largeur, hauteur in resolutions:
+                chemin_video = preparer_video(dossier_travail, largeur, hauteur, nombre_frames, graine)
+                for taille_pixel in tailles_pixel:
+                    resultats = mesurer_cas(mosaic, chemin_video, taille_pixel, dossier_travail)
+                    cas = {'photos': nombre_photos, 'resolution': f"{largeur}x{hauteur}", 'taille_pixel': taille_pixel,
+                           'chargement_froid': froid, 'chargement_chaud': chaud}
+                    cas.update(resultats)
+                    rapport['cas'].append(cas)
+                    print(f"   {largeur}x{hauteur}, tuiles de {taille_pixel}px: {resultats['fps']:.1f} frames/s "
+                          f"(analyse {resultats['analyse']['mediane']*1000:.1f}ms, "
+                          f"recherche {resultats['recherche']['mediane']*1000:.1f}ms, "
+                          f"assemblage {resultats['assemblage']['mediane']*1000:.1f}ms)")
+    finally:
+        if temporaire:
+            shutil.rmtree(dossier_travail, ignore_errors=True)
+    return rapport
+
+
+def cle_cas(cas):
+    return cas['photos'], cas['resolution'], cas['taille_pixel']
+
+
+def comparer(reference, rapport, seuil=0.10):
+    """Compare deux rapports cas par cas, renvoie le nombre d'étapes plus lentes que le seuil"""
+    anciens = {cle_cas(cas): cas for cas in reference['cas']}
+    regressions = 0
+    print("\n📊 Comparaison avec la référence (temps médian, nouveau / ancien)")
+    if reference['parametres'].get('options') != rapport['parametres'].get('options'):
+        print("⚠️  Les modes de rendu de la référence et de la mesure diffèrent")
+    for cas in rapport['cas']:
+        ancien = anciens.get(cle_cas(cas))
+        if ancien is None:
+            continue
+        ecarts = []
+        for etape in ETAPES[1:]:
+            if etape not in ancien or etape not in cas:
+                continue
+            a, n = ancien[etape]['mediane'], cas[etape]['mediane']
+            if a <= 0:
+                continue
+            rapport_temps = n / a
+            marque = ""
+            if rapport_temps > 1 + seuil:
+                marque = " ⚠️"
+                regressions += 1
+            ecarts.append(f"{etape} x{rapport_temps:.2f}{marque}")
+        print(f"   {cas['photos']} photos, {cas['resolution']}, {cas['taille_pixel']}px: " + ", ".join(ecarts))
+    return regressions
+
+
+def lire_liste(texte, conversion=int):
+    return [conversion(x) for x in texte.split(',') if x]
+
+
+def lire_resolution(texte):
+    largeur, hauteur = texte.lower().split('x')
+    return int(largeur), int(hauteur)
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Banc d'essai de la mosaïque vidéo")
+    parser.add_argument("--resolutions", default="640x480,1280x720,1920x1080",
+                        help="Résolutions à mesurer (défaut: 640x480,1280x720,1920x1080)")
+    parser.add_argument("--pixel-sizes", default="10,20,40", help="Tailles de tuiles à mesurer (défaut: 10,20,40)")
+    parser.add_argument("--photos", default="100,1000", help="Tailles de bibliothèque à mesurer (défaut: 100,1000)")
+    parser.add_argument("--frames", type=int, default=30, help="Frames par vidéo synthétique (défaut: 30)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des entrées synthétiques (défaut: 0)")
+    parser.add_argument("--color-table", dest="table_couleurs", type=int, default=None, metavar="NIVEAUX",
+                        help="Mesure avec la table couleur -> photo précalculée")
+    parser.add_argument("--descriptor", choices=list(VideoMosaic.DESCRIPTEURS), default="bgr",
+                        help="Descripteur des blocs et des photos (défaut: bgr)")
+    parser.add_argument("--incremental", type=float, default=None, metavar="SEUIL",
+                        help="Mesure le mode incrémental avec ce seuil")
+    parser.add_argument("--adaptive", type=int, default=None, metavar="TAILLE_MIN",
+                        help="Mesure les tuiles adaptatives de TAILLE_MIN à la taille de tuile mesurée")
+    parser.add_argument("--variance-threshold", type=float, default=100.0,
+                        help="Variance de coupe des tuiles adaptatives (défaut: 100)")
+    parser.add_argument("--diversity", type=int, default=None, metavar="K",
+                        help="Mesure le choix sans répétition parmi les K photos les plus proches")
+    parser.add_argument("--diversity-radius", type=int, default=1,
+                        help="Rayon du voisinage sans répétition, en blocs (défaut: 1)")
+    parser.add_argument("--pre-effect", action="append", default=None, metavar="EFFET",
+                        help="Effet appliqué aux frames avant la mosaïque, répétable (" + ", ".join(EFFETS) + ")")
+    parser.add_argument("--post-effect", action="append", default=None, metavar="EFFET",
+                        help="Effet appliqué à la mosaïque, répétable")
+    parser.add_argument("--work-dir", default=None,
+                        help="Dossier où garder les entrées synthétiques entre deux mesures (défaut: temporaire)")
+    parser.add_argument("--output", default=None, help="Fichier JSON du rapport (défaut: sortie standard)")
+    parser.add_argument("--compare", default=None, help="Rapport JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Ralentissement relatif signalé comme régression (défaut: 0.10)")
+
+    args = parser.parse_args()
+    if args.diversity_radius < 1:
+        parser.error(f"--diversity-radius doit valoir au moins 1 (reçu: {args.diversity_radius})")
+    try:
+        ChaineEffets(args.pre_effect), ChaineEffets(args.post_effect)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("⏱️  BANC D'ESSAI DE LA MOSAÏQUE VIDÉO", file=sys.stderr)
+    with contextlib.redirect_stdout(sys.stderr):
+        rapport = executer([lire_resolution(r) for r in args.resolutions.split(',')], lire_liste(args.pixel_sizes),
+                           lire_liste(args.photos), args.frames, args.seed, args.work_dir,
+                           niveaux_table=args.table_couleurs, descripteur=args.descriptor,
+                           seuil_incremental=args.incremental, taille_min_adaptative=args.adaptive,
+                           seuil_variance=args.variance_threshold, diversite=args.diversity,
+                           rayon_diversite=args.diversity_radius, effets_avant=args.pre_effect,
+                           effets_apres=args.post_effect)
+
+    texte = json.dumps(rapport, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(texte)
+        print(f"📁 Rapport: {args.output}", file=sys.stderr)
+    else:
+        print(texte)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            reference = json.load(f)
+        with contextlib.redirect_stdout(sys.stderr):
+            regressions = comparer(reference, rapport, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Bibliothèque de Photos - Art Informatique
+Index persistant des photos de la mosaïque, mis à jour de façon incrémentale
+"""
+
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class BibliothequePhotos:
+    """Photos d'un dossier avec leur couleur moyenne, leur vignette et leur signature Lab, gardées dans un index sur disque"""
+
+    FICHIER_INDEX = ".index_mosaique.npz"
+    VERSION_INDEX = 2
+    # Signature: couleurs Lab moyennes d'une grille de GRILLE_SIGNATURE x GRILLE_SIGNATURE sous-blocs
+    GRILLE_SIGNATURE = 4
+    EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+    # Formats que le décodeur sait lire directement à résolution réduite
+    EXTENSIONS_REDUITES = ('.jpg', '.jpeg')
+    MODES_REDUITS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+    def __init__(self, dossier_photos, taille_vignette=32, workers=None):
+        self.dossier_photos = dossier_photos
+        self.taille_vignette = taille_vignette
+        self.workers = workers or os.cpu_count() or 1
+        self.chemin_index = os.path.join(dossier_photos, self.FICHIER_INDEX)
+        self.derniere_mise_a_jour = {'index_lu': False, 'a_jour': 0, 'analysees': 0, 'supprimees': 0}
+        self.vider()
+
+    def vider(self):
+        """Remet la bibliothèque à zéro"""
+        self.noms = []
+        self.tailles = np.zeros(0, dtype=np.int64)
+        self.dates = np.zeros(0, dtype=np.float64)
+        self.empreintes = []
+        self.moyennes = np.zeros((0, 3), dtype=np.float64)
+        self.vignettes = np.zeros((0, self.taille_vignette, self.taille_vignette, 3), dtype=np.uint8)
+        self.signatures = np.zeros((0, self.GRILLE_SIGNATURE, self.GRILLE_SIGNATURE, 3), dtype=np.float32)
+        self.index_ancien = False
+
+    def __len__(self):
+        return len(self.noms)
+
+    @property
+    def chemins(self):
+        return [os.path.join(self.dossier_photos, nom) for nom in self.noms]
+
+    def empreinte(self):
+        """Empreinte de l'ensemble de la bibliothèque (contenu et ordre des photos)"""
+        h = hashlib.blake2b(digest_size=16)
+        for empreinte in self.empreintes:
+            h.update(empreinte.encode('ascii'))
+        return h.hexdigest()
+
+    def descripteurs(self, grille):
+        """Signatures Lab ramenées à une grille de grille x grille sous-blocs (1: moyenne Lab), (n, 3 * grille²)"""
+        g = self.GRILLE_SIGNATURE
+        if g % grille:
+            raise ValueError(f"Grille de {grille}x{grille} incompatible avec les signatures {g}x{g}")
+        signatures = self.signatures.reshape(len(self), grille, g // grille, grille, g // grille, 3)
+        return signatures.mean(axis=(2, 4), dtype=np.float64).reshape(len(self), -1)
+
+    @classmethod
+    def signature(cls, vignette):
+        """Couleurs Lab moyennes (L 0-100, a et b centrés sur 0) des sous-blocs d'une vignette BGR"""
+        lab = cv2.cvtColor(vignette.astype(np.float32) * (1.0 / 255), cv2.COLOR_BGR2Lab)
+        return cv2.resize(lab, (cls.GRILLE_SIGNATURE, cls.GRILLE_SIGNATURE), interpolation=cv2.INTER_AREA)
+
+    def lister_fichiers(self):
+        """Liste les photos présentes dans le dossier avec leur taille et date de modification"""
+        fichiers = {}
+        for entree in os.scandir(self.dossier_photos):
+            if entree.is_file() and entree.name.lower().endswith(self.EXTENSIONS):
+                infos = entree.stat()
+                fichiers[entree.name] = (infos.st_size, infos.st_mtime)
+        return dict(sorted(fichiers.items()))
+
+    def lire_index(self):
+        """Lit l'index sur disque, renvoie False s'il est absent ou incompatible"""
+        if not os.path.exists(self.chemin_index):
+            return False
+        try:
+            with np.load(self.chemin_index, allow_pickle=False) as donnees:
+                version = int(donnees['version'])
+                if version not in (1, self.VERSION_INDEX) or donnees['vignettes'].shape[1] != self.taille_vignette:
+                    return False
+                self.noms = [str(n) for n in donnees['noms']]
+                self.tailles = donnees['tailles']
+                self.dates = donnees['dates']
+                self.empreintes = [str(e) for e in donnees['empreintes']]
+                self.moyennes = donnees['moyennes']
+                self.vignettes = donnees['vignettes']
+                # Index de version 1: les signatures se déduisent des vignettes, sans redécoder les photos
+                self.index_ancien = version < self.VERSION_INDEX
+                if self.index_ancien:
+                    self.signatures = np.array([self.signature(v) for v in self.vignettes], dtype=np.float32).reshape(
+                        -1, self.GRILLE_SIGNATURE, self.GRILLE_SIGNATURE, 3)
+                else:
+                    self.signatures = donnees['signatures']
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️  Index illisible, nouvelle analyse complète: {e}")
+            self.vider()
+            return False
+        return True
+
+    def ecrire_index(self):
+        """Écrit l'index sur disque (remplacement atomique du fichier)"""
+        temporaire = self.chemin_index + ".tmp"
+        try:
+            with open(temporaire, 'wb') as f:
+                np.savez(f,
+                         version=np.array(self.VERSION_INDEX),
+                         noms=np.array(self.noms, dtype=str),
+                         tailles=self.tailles,
+                         dates=self.dates,
+                         empreintes=np.array(self.empreintes, dtype=str),
+                         moyennes=self.moyennes,
+                         vignettes=self.vignettes,
+                         signatures=self.signatures)
+            os.replace(temporaire, self.chemin_index)
+        except OSError as e:
+            print(f"⚠️  Impossible d'écrire l'index {self.chemin_index}: {e}")
+
+    @staticmethod
+    def empreinte_fichier(chemin):
+        """Empreinte du contenu d'un fichier"""
+        h = hashlib.blake2b(digest_size=16)
+        with open(chemin, 'rb') as f:
+            for morceau in iter(lambda: f.read(1 << 20), b''):
+                h.update(morceau)
+        return h.hexdigest()
+
+    def mode_lecture(self, chemin, cote_minimal=None):
+        """Choisit le plus fort facteur de réduction au décodage qui garde un côté d'au moins cote_minimal (la vignette par défaut)"""
+        cote_minimal = cote_minimal or self.taille_vignette
+        if not chemin.lower().endswith(self.EXTENSIONS_REDUITES):
+            return cv2.IMREAD_COLOR
+        try:
+            # Seul l'en-tête est lu pour connaître les dimensions
+            with Image.open(chemin) as img:
+                cote = min(img.size)
+        except OSError:
+            return cv2.IMREAD_COLOR
+        for facteur, mode in self.MODES_REDUITS:
+            if cote // facteur >= cote_minimal:
+                return mode
+        return cv2.IMREAD_COLOR
+
+    def analyser_photo(self, chemin):
+        """Décode une photo (à résolution réduite si possible) et calcule sa couleur moyenne, sa vignette et sa signature"""
+        img = cv2.imread(chemin, self.mode_lecture(chemin))
+        if img is None:
+            return None
+        # Redimensionner pour un calcul plus rapide
+        moyenne = cv2.mean(cv2.resize(img, (10, 10)))[:3]  # BGR
+        vignette = cv2.resize(img, (self.taille_vignette, self.taille_vignette), interpolation=cv2.INTER_AREA)
+        return moyenne, vignette, self.signature(vignette)
+
+    def empreinte_ou_erreur(self, nom):
+        """Empreinte d'une photo du dossier, None si le fichier est illisible"""
+        try:
+            return self.empreinte_fichier(os.path.join(self.dossier_photos, nom))
+        except OSError as e:
+            print(f"⚠️  Erreur avec {nom}: {e}")
+            return None
+
+    def analyser_ou_erreur(self, chemin):
+        """Analyse d'une photo, None si elle ne peut pas être décodée"""
+        try:
+            return self.analyser_photo(chemin)
+        except Exception as e:
+            print(f"⚠️  Erreur avec {chemin}: {e}")
+            return None
+
+    def charger(self, progression=None):
+        """Met l'index à jour: seules les photos ajoutées ou modifiées sont décodées, en parallèle
+
+        progression(faites, total) est appelée au fil de l'analyse des photos.
+        """
+        fichiers = self.lister_fichiers()
+        index_lu = self.lire_index()
+
+        connues = {nom: i for i, nom in enumerate(self.noms)}
+        par_empreinte = {e: i for i, e in enumerate(self.empreintes)}
+
+        conservees = []   # (nom, taille, date, empreinte, indice dans l'ancien index)
+        a_verifier = []   # (nom, taille, date)
+        for nom, (taille, date) in fichiers.items():
+            i = connues.get(nom)
+            if i is not None and self.tailles[i] == taille and self.dates[i] == date:
+                conservees.append((nom, taille, date, self.empreintes[i], i))
+            else:
+                a_verifier.append((nom, taille, date))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Fichier nouveau ou modifié: le contenu peut être identique (copie, renommage, touch)
+            empreintes_lues = pool.map(self.empreinte_ou_erreur, [f[0] for f in a_verifier])
+            a_analyser = []   # (nom, taille, date, empreinte)
+            for (nom, taille, date), empreinte in zip(a_verifier, empreintes_lues):
+                if empreinte is None:
+                    continue
+                if empreinte in par_empreinte:
+                    conservees.append((nom, taille, date, empreinte, par_empreinte[empreinte]))
+                else:
+                    a_analyser.append((nom, taille, date, empreinte))
+
+            supprimees = len(set(connues) - set(fichiers))
+            self.derniere_mise_a_jour = {'index_lu': index_lu, 'a_jour': len(conservees),
+                                         'analysees': len(a_analyser), 'supprimees': supprimees}
+
+            chemins = [os.path.join(self.dossier_photos, f[0]) for f in a_analyser]
+            nouvelles = []
+            for n, (infos, resultat) in enumerate(zip(a_analyser, pool.map(self.analyser_ou_erreur, chemins))):
+                if resultat is not None:
+                    nouvelles.append(infos + tuple(resultat))
+                if progression:
+                    progression(n + 1, len(a_analyser))
+
+        modifie = bool(a_analyser) or supprimees > 0 or any(
+            nom != self.noms[i] or taille != self.tailles[i] or date != self.dates[i]
+            for nom, taille, date, _, i in conservees)
+
+        anciens = np.array([c[4] for c in conservees], dtype=np.intp)
+        noms = [c[0] for c in conservees] + [c[0] for c in nouvelles]
+        tailles = [c[1] for c in conservees] + [c[1] for c in nouvelles]
+        dates = [c[2] for c in conservees] + [c[2] for c in nouvelles]
+        empreintes = [c[3] for c in conservees] + [c[3] for c in nouvelles]
+        moyennes = np.concatenate([self.moyennes[anciens].reshape(-1, 3),
+                                   np.array([c[4] for c in nouvelles], dtype=np.float64).reshape(-1, 3)])
+        vignettes = np.concatenate([self.vignettes[anciens],
+                                    np.array([c[5] for c in nouvelles], dtype=np.uint8).reshape(
+                                        -1, self.taille_vignette, self.taille_vignette, 3)])
+        g = self.GRILLE_SIGNATURE
+        signatures = np.concatenate([self.signatures[anciens],
+                                     np.array([c[6] for c in nouvelles], dtype=np.float32).reshape(-1, g, g, 3)])
+
+        # Ordre stable par nom de fichier
+        ordre = sorted(range(len(noms)), key=noms.__getitem__)
+        self.noms = [noms[i] for i in ordre]
+        self.tailles = np.array(tailles, dtype=np.int64)[ordre]
+        self.dates = np.array(dates, dtype=np.float64)[ordre]
+        self.empreintes = [empreintes[i] for i in ordre]
+        self.moyennes = moyennes[ordre]
+        self.vignettes = np.ascontiguousarray(vignettes[ordre])
+        self.signatures = np.ascontiguousarray(signatures[ordre])
+
+        if modifie or not index_lu or self.index_ancien:
+            self.ecrire_index()
+            self.index_ancien = False
+        return self
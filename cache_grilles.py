@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cache des Grilles - Art Informatique
+Grilles d'indices de photos de chaque frame rendue, rangées par contenu, pour refaire un rendu sans décoder ni analyser
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from bibliotheque_photos import BibliothequePhotos
+
+
+class CacheGrilles:
+    """Grilles d'indices (frames, lignes, colonnes) des rendus, retrouvées par une clé de contenu
+
+    La clé réunit l'empreinte du contenu de la vidéo, celle de la bibliothèque (contenu et ordre
+    des photos) et les paramètres qui décident du choix des photos (taille des pixels, cadence,
+    extrait, descripteur, diversité, effets d'entrée...). Tant qu'ils ne changent pas, les
+    grilles restent valables: un nouveau rendu qui ne change que l'assemblage ou la sortie
+    (effets appliqués à la mosaïque, format, destination) n'a plus qu'à coller les tuiles.
+
+    Les grilles sont en uint16 (uint32 au-delà de 65535 photos), quelques dizaines de Ko par
+    frame: bien moins que la vidéo elle-même.
+    """
+
+    DOSSIER = os.path.join("video_mosaic_output", ".grilles_mosaique")
+    FICHIER_EMPREINTES = "empreintes_videos.json"
+    VERSION = 1
+
+    def __init__(self, dossier=None):
+        self.dossier = dossier or self.DOSSIER
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def empreinte_video(self, chemin_video):
+        """Empreinte du contenu de la vidéo, recalculée seulement si sa taille ou sa date changent"""
+        chemin = os.path.abspath(chemin_video)
+        infos = os.stat(chemin)
+        fichier = os.path.join(self.dossier, self.FICHIER_EMPREINTES)
+        try:
+            with open(fichier, encoding='utf-8') as f:
+                connues = json.load(f)
+        except (OSError, ValueError):
+            connues = {}
+        taille, date, empreinte = connues.get(chemin, (None, None, None))
+        if (taille, date) != (infos.st_size, infos.st_mtime_ns):
+            empreinte = BibliothequePhotos.empreinte_fichier(chemin)
+            connues[chemin] = (infos.st_size, infos.st_mtime_ns, empreinte)
+            temporaire = f"{fichier}.{os.getpid()}.tmp"
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                json.dump(connues, f)
+            os.replace(temporaire, fichier)
+        return empreinte
+
+    def cle(self, chemin_video, empreinte_bibliotheque, parametres):
+        """Clé des grilles d'un rendu"""
+        contenu = dict(parametres, video=self.empreinte_video(chemin_video), bibliotheque=empreinte_bibliotheque,
+                       version=self.VERSION)
+        return hashlib.blake2b(json.dumps(contenu, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+    def fichiers(self, cle):
+        base = os.path.join(self.dossier, f"grilles_{cle}")
+        return base + ".bin", base + ".json"
+
+    def lire(self, cle):
+        """Grilles enregistrées (np.memmap (frames, lignes, colonnes)) et leur description, ou (None, None)"""
+        donnees, description = self.fichiers(cle)
+        try:
+            with open(description, encoding='utf-8') as f:
+                meta = json.load(f)
+            if not meta['frames']:
+                return np.zeros((0, meta['lignes'], meta['colonnes']), dtype=meta['dtype']), meta
+            grilles = np.memmap(donnees, dtype=meta['dtype'], mode='r',
+                                shape=(meta['frames'], meta['lignes'], meta['colonnes']))
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return grilles, meta
+
+    def enregistreur(self, cle, nombre_photos, **meta):
+        """Enregistreur des grilles d'un rendu, frame par frame (voir EnregistreurGrilles)"""
+        return EnregistreurGrilles(*self.fichiers(cle), np.uint16 if nombre_photos <= 2**16 else np.uint32, meta)
+
+
+class EnregistreurGrilles:
+    """Écrit les grilles d'un rendu au fil des frames dans un fichier temporaire
+
+    Les grilles ne sont visibles dans le cache qu'une fois le rendu terminé (terminer()): un
+    rendu interrompu n'y laisse rien.
+    """
+
+    def __init__(self, donnees, description, dtype, meta):
+        self.donnees = donnees
+        self.description = description
+        self.dtype = np.dtype(dtype)
+        self.meta = meta
+        self.forme = None
+        self.frames = 0
+        self.temporaire = f"{donnees}.{os.getpid()}.tmp"
+        self.fichier = open(self.temporaire, 'wb')
+
+    def ajouter(self, grille):
+        if self.forme is None:
+            self.forme = grille.shape
+        self.fichier.write(np.ascontiguousarray(grille, dtype=self.dtype).data)
+        self.frames += 1
+
+    def terminer(self):
+        self.fichier.close()
+        lignes, colonnes = self.forme or (0, 0)
+        meta = dict(self.meta, frames=self.frames, lignes=lignes, colonnes=colonnes, dtype=self.dtype.str)
+        os.replace(self.temporaire, self.donnees)
+        temporaire = self.description + ".tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporaire, self.description)
+
+    def abandonner(self):
+        self.fichier.close()
+        try:
+            os.remove(self.temporaire)
+        except OSError:
+            pass
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Échantillonnage Vidéo - Art Informatique
+Choix des frames à rendre d'après leur horodatage, sans décoder les frames ignorées
+"""
+
+import math
+import numpy as np
+import cv2
+
+
+class EchantillonneurVideo:
+    """Parcourt une vidéo ouverte à la cadence de sortie voulue, entre deux instants
+
+    Pour chaque instant de sortie t_k = debut + k / fps_sortie, la frame source affichée à cet
+    instant est choisie. Les frames intermédiaires sont seulement avancées avec grab(), sans
+    retrieve(), et une frame source est répétée si la cadence de sortie dépasse la cadence source.
+    Les instants sont calculés à partir de k, sans cumul d'erreur pour les rapports non entiers.
+
+    Avec un pool de tampons (voir tampons_frames), les frames sont décodées dans des tampons pris
+    dans le pool, que le consommateur rend une fois la frame utilisée; une frame répétée est alors
+    copiée dans son propre tampon.
+
+    rangs (premier, dernier exclu) limite le parcours à une partie des frames de sortie de
+    l'intervalle, avec les mêmes instants que le parcours complet (segments d'un rendu).
+    """
+
+    def __init__(self, cap, fps_sortie, debut=None, fin=None, tampons=None, rangs=None):
+        self.cap = cap
+        self.tampons = tampons
+        self.rangs = rangs
+        self.fps_sortie = float(fps_sortie)
+        self.fps_source = cap.get(cv2.CAP_PROP_FPS) or self.fps_sortie
+        self.total_source = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if self.fps_sortie <= 0:
+            raise ValueError(f"FPS de sortie invalide: {fps_sortie}")
+
+        self.duree = self.total_source / self.fps_source if self.total_source > 0 else None
+        self.debut = max(0.0, debut or 0.0)
+        self.fin = fin if fin is not None else self.duree
+        if self.fin is not None and self.duree is not None:
+            self.fin = min(self.fin, self.duree)
+        if self.fin is not None and self.fin < self.debut:
+            raise ValueError(f"Intervalle vide: début {self.debut}s après la fin {self.fin}s")
+
+    @property
+    def nombre_frames(self):
+        """Nombre de frames de sortie attendues (None si la durée est inconnue)"""
+        total = None if self.fin is None else max(0, math.ceil((self.fin - self.debut) * self.fps_sortie - 1e-9))
+        if self.rangs is None:
+            return total
+        premier, dernier = self.rangs
+        dernier = dernier if total is None else min(dernier, total)
+        return max(0, dernier - premier)
+
+    def limite(self):
+        """Rang de la première frame de sortie à ne plus rendre (None si la durée est inconnue)"""
+        total = self.nombre_frames
+        return None if total is None else self.premier_rang() + total
+
+    def premier_rang(self):
+        return self.rangs[0] if self.rangs else 0
+
+    def instant(self, k):
+        """Instant (en secondes) de la k-ième frame de sortie"""
+        return self.debut + k / self.fps_sortie
+
+    def frame_source(self, instant):
+        """Numéro de la frame source affichée à un instant donné"""
+        return int(math.floor(instant * self.fps_source + 1e-6))
+
+    def __iter__(self):
+        """Renvoie des triplets (numéro de frame source, instant, frame)"""
+        position = 0  # numéro de la prochaine frame source à lire
+        k = self.premier_rang()
+        premiere = self.frame_source(self.instant(k))
+        if premiere > 0 and self.cap.set(cv2.CAP_PROP_POS_FRAMES, premiere):
+            position = premiere
+
+        # Même borne que nombre_frames: pas de frame en trop quand fin tombe juste sur un instant
+        limite = self.limite()
+        derniere_numero, derniere_frame = None, None
+        while limite is None or k < limite:
+            cible = self.frame_source(self.instant(k))
+
+            if cible != derniere_numero:
+                # Avancer sans décoder jusqu'à la frame voulue
+                while position < cible:
+                    if not self.cap.grab():
+                        return
+                    position += 1
+                ret, frame = self.cap.read(image=self.tampons.prendre() if self.tampons else None)
+                if not ret:
+                    return
+                position += 1
+                derniere_numero, derniere_frame = cible, frame
+            elif self.tampons:
+                # Le tampon de la frame répétée a pu être rendu: il n'est réécrit que par ce décodage
+                frame = self.tampons.prendre()
+                np.copyto(frame, derniere_frame)
+                derniere_frame = frame
+
+            yield derniere_numero, self.instant(k), derniere_frame
+            k += 1
+
+
+class EchantillonneurMultiple:
+    """Parcourt une vidéo une seule fois pour plusieurs cadences de sortie, entre deux instants
+
+    Chaque frame source retenue par au moins une cadence est décodée une seule fois, avec les
+    mêmes choix que l'EchantillonneurVideo de chaque cadence. Elle est renvoyée avec, pour chaque
+    cadence, le nombre de frames de sortie qu'elle fournit: 0 si la cadence ne la retient pas,
+    plus de 1 si la cadence de sortie dépasse la cadence source.
+    """
+
+    def __init__(self, cap, cadences, debut=None, fin=None, tampons=None):
+        self.cap = cap
+        self.tampons = tampons
+        self.echantillonneurs = [EchantillonneurVideo(cap, fps, debut, fin) for fps in cadences]
+
+    @property
+    def nombres_frames(self):
+        """Nombre de frames de sortie attendues pour chaque cadence (None si la durée est inconnue)"""
+        return [echantillonneur.nombre_frames for echantillonneur in self.echantillonneurs]
+
+    def __iter__(self):
+        """Renvoie des triplets (numéro de frame source, frame, répétitions par cadence)"""
+        premier = self.echantillonneurs[0]
+        position = 0
+        premiere = premier.frame_source(premier.debut)
+        if premiere > 0 and self.cap.set(cv2.CAP_PROP_POS_FRAMES, premiere):
+            position = premiere
+
+        rangs = [0] * len(self.echantillonneurs)
+
+        limites = [echantillonneur.limite() for echantillonneur in self.echantillonneurs]
+
+        def cible(i):
+            if limites[i] is not None and rangs[i] >= limites[i]:
+                return None
+            return self.echantillonneurs[i].frame_source(self.echantillonneurs[i].instant(rangs[i]))
+
+        while True:
+            cibles = [c for c in map(cible, range(len(rangs))) if c is not None]
+            if not cibles:
+                return
+            numero = min(cibles)
+            while position < numero:
+                if not self.cap.grab():
+                    return
+                position += 1
+            ret, frame = self.cap.read(image=self.tampons.prendre() if self.tampons else None)
+            if not ret:
+                return
+            position += 1
+
+            repetitions = []
+            for i in range(len(rangs)):
+                nombre = 0
+                while cible(i) == numero:
+                    rangs[i] += 1
+                    nombre += 1
+                repetitions.append(nombre)
+            yield numero, frame, repetitions
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Effets Artistiques - Art Informatique
+Les huit effets d'image, vectorisés et enchaînables, appliqués aux images comme aux frames vidéo
+"""
+
+import math
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+class Effet:
+    """Effet d'image BGR uint8: redéfinir appliquer(image, sortie=None)
+
+    Avec sortie (tableau de la forme de l'image, distinct d'elle), le résultat y est écrit et
+    sortie est renvoyée: le rendu vidéo y passe ses tampons réutilisés.
+
+    PARAMETRES donne les paramètres acceptés et leurs valeurs par défaut (entière pour un paramètre
+    entier), BORNES leurs valeurs minimale et maximale (None: pas de limite). Tout ce qui ne dépend
+    que de la résolution et des paramètres (grilles de déformation, masques, motifs) est calculé
+    une fois puis gardé en cache: une frame ne coûte ensuite qu'un ou deux appels OpenCV.
+    """
+
+    NOM = None
+    DESCRIPTION = ""
+    PARAMETRES = {}
+    BORNES = {}
+
+    # Tableaux précalculés, partagés par toutes les instances: (effet, nom, résolution, paramètres) -> tableau
+    _cache = OrderedDict()
+    TAILLE_CACHE = 32
+
+    def __init__(self, **parametres):
+        inconnus = set(parametres) - set(self.PARAMETRES)
+        if inconnus:
+            raise ValueError(f"Paramètre(s) inconnu(s) pour l'effet {self.NOM}: {', '.join(sorted(inconnus))} "
+                             f"(choix: {', '.join(self.PARAMETRES) or 'aucun'})")
+        self.parametres = dict(self.PARAMETRES)
+        for nom, valeur in parametres.items():
+            self.parametres[nom] = self.verifier(nom, valeur)
+
+    def verifier(self, nom, valeur):
+        """Valeur d'un paramètre, du type de sa valeur par défaut et dans ses bornes (ValueError sinon)"""
+        try:
+            nombre = float(valeur)
+        except (TypeError, ValueError):
+            nombre = math.nan
+        if not math.isfinite(nombre):
+            raise ValueError(f"Paramètre {nom} de l'effet {self.NOM}: nombre attendu, reçu {valeur!r}")
+        if isinstance(self.PARAMETRES[nom], int):
+            if not nombre.is_integer():
+                raise ValueError(f"Paramètre {nom} de l'effet {self.NOM}: entier attendu, reçu {valeur!r}")
+            nombre = int(nombre)
+        minimum, maximum = self.BORNES.get(nom, (None, None))
+        if (minimum is not None and nombre < minimum) or (maximum is not None and nombre > maximum):
+            limites = (f"entre {minimum:g} et {maximum:g}" if minimum is not None and maximum is not None
+                       else f"au moins {minimum:g}" if minimum is not None else f"au plus {maximum:g}")
+            raise ValueError(f"Paramètre {nom} de l'effet {self.NOM} hors limites: {valeur!r} (attendu: {limites})")
+        return nombre
+
+    def __getattr__(self, nom):
+        try:
+            return self.__dict__['parametres'][nom]
+        except KeyError:
+            raise AttributeError(nom) from None
+
+    def __repr__(self):
+        return f"{self.NOM}:" + ",".join(f"{nom}={valeur:g}" for nom, valeur in self.parametres.items())
+
+    def en_cache(self, nom, hauteur, largeur, construire):
+        """Tableau précalculé pour cette résolution et ces paramètres, construit au premier appel"""
+        cle = (type(self).__name__, nom, hauteur, largeur, tuple(sorted(self.parametres.items())))
+        tableau = self._cache.get(cle)
+        if tableau is None:
+            tableau = construire(hauteur, largeur)
+            self._cache[cle] = tableau
+            while len(self._cache) > self.TAILLE_CACHE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(cle)
+        return tableau
+
+    def appliquer(self, image, sortie=None):
+        raise NotImplementedError
+
+    @staticmethod
+    def ecrire(resultat, sortie=None):
+        """Résultat recopié dans sortie si elle est donnée"""
+        if sortie is None or resultat is sortie:
+            return resultat
+        np.copyto(sortie, resultat)
+        return sortie
+
+    @staticmethod
+    def masquer(image, masque, sortie=None):
+        """Image mise à zéro hors du masque"""
+        if sortie is None:
+            return cv2.bitwise_and(image, image, mask=masque)
+        # Hors du masque, bitwise_and laisse la destination telle quelle
+        sortie[...] = 0
+        return cv2.bitwise_and(image, image, dst=sortie, mask=masque)
+
+
+class EffetGeometrique(Effet):
+    """Déformation de l'image: redéfinir grilles(), qui donne pour chaque pixel ses coordonnées sources
+
+    Les grilles sont converties une fois en virgule fixe: chaque frame est un seul cv2.remap.
+    """
+
+    def grilles(self, hauteur, largeur):
+        raise NotImplementedError
+
+    def grilles_fixes(self, hauteur, largeur):
+        carte_x, carte_y = self.grilles(hauteur, largeur)
+        return cv2.convertMaps(carte_x.astype(np.float32), carte_y.astype(np.float32), cv2.CV_16SC2)
+
+    def deformer(self, image, sortie=None):
+        hauteur, largeur = image.shape[:2]
+        carte, fraction = self.en_cache('grilles', hauteur, largeur, self.grilles_fixes)
+        return cv2.remap(image, carte, fraction, cv2.INTER_LINEAR, dst=sortie, borderMode=cv2.BORDER_REFLECT_101)
+
+    def appliquer(self, image, sortie=None):
+        return self.deformer(image, sortie)
+
+
+def coordonnees(hauteur, largeur):
+    """Grilles des coordonnées x et y de chaque pixel"""
+    return np.meshgrid(np.arange(largeur, dtype=np.float64), np.arange(hauteur, dtype=np.float64))
+
+
+def replier(valeurs, taille):
+    """Ramène des coordonnées dans [0, taille - 1] par réflexion (image répétée en miroir)"""
+    periode = 2 * max(taille - 1, 1)
+    return (taille - 1) - np.abs(np.mod(valeurs, periode) - (taille - 1))
+
+
+def blocs_moyens(image, taille):
+    """Image en aplats de la couleur moyenne de chaque case de taille x taille"""
+    hauteur, largeur = image.shape[:2]
+    lignes, colonnes = -(-hauteur // taille), -(-largeur // taille)
+    reduite = cv2.resize(image, (colonnes, lignes), interpolation=cv2.INTER_AREA)
+    return reduite, cv2.resize(reduite, (colonnes * taille, lignes * taille),
+                               interpolation=cv2.INTER_NEAREST)[:hauteur, :largeur]
+
+
+class MosaiqueColoree(Effet):
+    NOM = "mosaique"
+    DESCRIPTION = "Mosaïque Colorée - carrés colorés avec variations chromatiques"
+    PARAMETRES = {'taille': 16, 'variation': 30, 'joint': 1, 'graine': 0}
+    BORNES = {'taille': (1, None), 'variation': (0, None), 'joint': (0, None), 'graine': (0, None)}
+
+    def variations(self, lignes, colonnes):
+        rng = np.random.default_rng(self.graine)
+        return rng.integers(-self.variation, self.variation + 1, (lignes, colonnes, 3)).astype(np.int16)
+
+    def masque_joints(self, hauteur, largeur):
+        masque = np.full((hauteur, largeur), 255, dtype=np.uint8)
+        for joint in range(self.joint):
+            masque[joint::self.taille, :] = 0
+            masque[:, joint::self.taille] = 0
+        return masque
+
+    def appliquer(self, image, sortie=None):
+        hauteur, largeur = image.shape[:2]
+        reduite, _ = blocs_moyens(image, self.taille)
+        variations = self.en_cache('variations', *reduite.shape[:2], self.variations)
+        reduite = np.clip(reduite + variations, 0, 255).astype(np.uint8)
+        carres = cv2.resize(reduite, (reduite.shape[1] * self.taille, reduite.shape[0] * self.taille),
+                            interpolation=cv2.INTER_NEAREST)[:hauteur, :largeur]
+        if not self.joint:
+            return self.ecrire(carres, sortie)
+        return self.masquer(carres, self.en_cache('joints', hauteur, largeur, self.masque_joints), sortie)
+
+
+class VaguesChromatiques(EffetGeometrique):
+    NOM = "vagues"
+    DESCRIPTION = "Vagues Chromatiques - déformations sinusoïdales avec variations de couleurs"
+    PARAMETRES = {'amplitude': 12.0, 'periode': 80.0, 'intensite': 0.25}
+    BORNES = {'periode': (1.0, None), 'intensite': (0.0, 1.0)}
+
+    def grilles(self, hauteur, largeur):
+        x, y = coordonnees(hauteur, largeur)
+        return (x + self.amplitude * np.sin(2 * np.pi * y / self.periode),
+                y + 0.5 * self.amplitude * np.sin(2 * np.pi * x / (1.5 * self.periode)))
+
+    def motif(self, hauteur, largeur):
+        # Arc-en-ciel ondulant, mélangé à l'image déformée
+        x, y = coordonnees(hauteur, largeur)
+        teinte = (x + y + self.periode * np.sin(2 * np.pi * y / self.periode)) / (3 * self.periode) * 180
+        hsv = np.dstack([np.mod(teinte, 180), np.full_like(x, 255), np.full_like(x, 255)]).astype(np.uint8)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+    def appliquer(self, image, sortie=None):
+        deformee = self.deformer(image, sortie)
+        if self.intensite <= 0:
+            return deformee
+        motif = self.en_cache('motif', *image.shape[:2], self.motif)
+        return cv2.addWeighted(deformee, 1 - self.intensite, motif, self.intensite, 0, dst=deformee)
+
+
+class PixelisationArtistique(Effet):
+    NOM = "pixelisation"
+    DESCRIPTION = "Pixelisation Artistique - formes géométriques (cercles, carrés, triangles)"
+    PARAMETRES = {'taille': 12}
+    BORNES = {'taille': (1, None)}
+
+    def masque_formes(self, hauteur, largeur):
+        taille = self.taille
+        masque = np.zeros((hauteur, largeur), dtype=np.uint8)
+        rayon = max(1, taille // 2 - 1)
+        for i, y in enumerate(range(0, hauteur, taille)):
+            for j, x in enumerate(range(0, largeur, taille)):
+                forme = (i + j) % 3
+                if forme == 0:
+                    cv2.circle(masque, (x + taille // 2, y + taille // 2), rayon, 255, -1)
+                elif forme == 1:
+                    cv2.rectangle(masque, (x + 1, y + 1), (x + taille - 2, y + taille - 2), 255, -1)
+                else:
+                    sommets = np.array([[x + taille // 2, y + 1], [x + 1, y + taille - 2],
+                                        [x + taille - 2, y + taille - 2]], dtype=np.int32)
+                    cv2.fillPoly(masque, [sommets], 255)
+        return masque
+
+    def appliquer(self, image, sortie=None):
+        _, aplats = blocs_moyens(image, self.taille)
+        masque = self.en_cache('formes', *image.shape[:2], self.masque_formes)
+        return self.masquer(aplats, masque, sortie)
+
+
+class DecompositionRGB(Effet):
+    NOM = "rgb"
+    DESCRIPTION = "Décomposition RGB - canaux rouge, vert et bleu décalés"
+    PARAMETRES = {'decalage': 8, 'vertical': 0}
+
+    @staticmethod
+    def decaler(canal, dx, dy):
+        # Translation par tranches, les bords sont prolongés
+        hauteur, largeur = canal.shape
+        dx, dy = max(-largeur + 1, min(largeur - 1, dx)), max(-hauteur + 1, min(hauteur - 1, dy))
+        resultat = np.empty_like(canal)
+        sy, dy_ = (slice(0, hauteur - dy), slice(dy, hauteur)) if dy >= 0 else (slice(-dy, hauteur), slice(0, hauteur + dy))
+        sx, dx_ = (slice(0, largeur - dx), slice(dx, largeur)) if dx >= 0 else (slice(-dx, largeur), slice(0, largeur + dx))
+        resultat[dy_, dx_] = canal[sy, sx]
+        if dy > 0:
+            resultat[:dy] = resultat[dy]
+        elif dy < 0:
+            resultat[dy:] = resultat[dy - 1]
+        if dx > 0:
+            resultat[:, :dx] = resultat[:, dx:dx + 1]
+        elif dx < 0:
+            resultat[:, dx:] = resultat[:, dx - 1:dx]
+        return resultat
+
+    def appliquer(self, image, sortie=None):
+        bleu, vert, rouge = cv2.split(image)
+        return cv2.merge([self.decaler(bleu, -self.decalage, -self.vertical), vert,
+                          self.decaler(rouge, self.decalage, self.vertical)], dst=sortie)
+
+
+class Kaleidoscope(EffetGeometrique):
+    NOM = "kaleidoscope"
+    DESCRIPTION = "Effet Kaléidoscope - miroir répété en segments"
+    PARAMETRES = {'segments': 8, 'rotation': 0.0}
+    BORNES = {'segments': (1, None)}
+
+    def grilles(self, hauteur, largeur):
+        x, y = coordonnees(hauteur, largeur)
+        cx, cy = (largeur - 1) / 2, (hauteur - 1) / 2
+        rayon = np.hypot(x - cx, y - cy)
+        secteur = 2 * np.pi / max(1, self.segments)
+        angle = np.mod(np.arctan2(y - cy, x - cx), secteur)
+        # Un segment sur deux est retourné: les bords des segments se raccordent en miroir
+        angle = np.minimum(angle, secteur - angle) + math.radians(self.rotation)
+        return cx + rayon * np.cos(angle), cy + rayon * np.sin(angle)
+
+
+class TransformationSinusoidale(EffetGeometrique):
+    NOM = "sinusoidale"
+    DESCRIPTION = "Transformation Sinusoïdale - ondulations de l'image"
+    PARAMETRES = {'amplitude': 20.0, 'frequence': 3.0}
+
+    def grilles(self, hauteur, largeur):
+        x, y = coordonnees(hauteur, largeur)
+        return (x + self.amplitude * np.sin(2 * np.pi * self.frequence * y / hauteur),
+                y + self.amplitude * np.sin(2 * np.pi * self.frequence * x / largeur))
+
+
+class EffetFractal(EffetGeometrique):
+    NOM = "fractal"
+    DESCRIPTION = "Effet Fractal - image repliée par les itérations d'un ensemble de Julia"
+    PARAMETRES = {'iterations': 3, 'cx': -0.4, 'cy': 0.6, 'zoom': 1.5}
+    BORNES = {'iterations': (0, None), 'zoom': (0.01, None)}
+
+    def grilles(self, hauteur, largeur):
+        x, y = coordonnees(hauteur, largeur)
+        echelle = self.zoom / (min(hauteur, largeur) / 2)
+        z = (x - largeur / 2) * echelle + 1j * (y - hauteur / 2) * echelle
+        c = complex(self.cx, self.cy)
+        for _ in range(self.iterations):
+            z = z * z + c
+            # Les points qui s'échappent sont bornés: ils retombent quelque part dans l'image répétée
+            module = np.abs(z)
+            z = np.where(module > 1e3, z / np.maximum(module, 1e-12) * 1e3, z)
+        return (replier(z.real / echelle + largeur / 2, largeur),
+                replier(z.imag / echelle + hauteur / 2, hauteur))
+
+
+class MelangeChromatique(Effet):
+    NOM = "melange"
+    DESCRIPTION = "Mélange Chromatique - canaux de couleur mélangés"
+    PARAMETRES = {'intensite': 0.6}
+    BORNES = {'intensite': (0.0, 1.0)}
+
+    def appliquer(self, image, sortie=None):
+        # Chaque canal reçoit une part du suivant: une seule transformation linéaire par pixel
+        f = self.intensite
+        matrice = (1 - f) * np.eye(3) + f * np.array([[0.2, 0.8, 0.0], [0.0, 0.2, 0.8], [0.8, 0.0, 0.2]])
+        return cv2.transform(image, matrice.astype(np.float32), dst=sortie)
+
+
+# Les huit effets, dans l'ordre du menu
+EFFETS = OrderedDict((effet.NOM, effet) for effet in (
+    MosaiqueColoree, VaguesChromatiques, PixelisationArtistique, DecompositionRGB,
+    Kaleidoscope, TransformationSinusoidale, EffetFractal, MelangeChromatique))
+
+
+def creer_effet(description):
+    """Crée un effet depuis sa description 'nom' ou 'nom:parametre=valeur,parametre=valeur'"""
+    nom, _, texte = description.partition(':')
+    nom = nom.strip().lower()
+    if nom not in EFFETS:
+        raise ValueError(f"Effet inconnu: {nom} (choix: {', '.join(EFFETS)})")
+    parametres = {}
+    for element in filter(None, (e.strip() for e in texte.split(','))):
+        cle, egal, valeur = element.partition('=')
+        if not egal:
+            raise ValueError(f"Paramètre mal formé pour l'effet {nom}: '{element}' (attendu: parametre=valeur)")
+        parametres[cle.strip()] = valeur.strip()
+    return EFFETS[nom](**parametres)
+
+
+class ChaineEffets:
+    """Suite d'effets appliqués l'un après l'autre, décrite par une liste de textes (voir creer_effet)
+
+    Les descriptions se transmettent telles quelles aux processus de rendu.
+    """
+
+    def __init__(self, descriptions=()):
+        self.descriptions = list(descriptions or ())
+        self.effets = [creer_effet(d) for d in self.descriptions]
+
+    def __len__(self):
+        return len(self.effets)
+
+    def __repr__(self):
+        return " -> ".join(map(repr, self.effets))
+
+    def appliquer(self, image, sortie=None):
+        """Applique les effets; le dernier écrit dans sortie si elle est donnée (voir Effet.appliquer)"""
+        for i, effet in enumerate(self.effets):
+            image = effet.appliquer(image, sortie if i == len(self.effets) - 1 else None)
+        return image
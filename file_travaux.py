@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+File de Travaux - Art Informatique
+Rendus de mosaïques en lot depuis une file SQLite locale, par des processus qui gardent la bibliothèque chargée
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import multiprocessing
+from collections import OrderedDict
+
+FICHIER_FILE = "travaux_mosaic.db"
+
+# Paramètres d'un travail passés au constructeur de VideoMosaic: deux travaux qui ont les mêmes
+# (et le même dossier de photos) partagent la mosaïque chargée d'un processus de travail
+OPTIONS_MOSAIQUE = ('niveaux_table', 'seuil_incremental', 'taille_min_adaptative', 'seuil_variance',
+                    'diversite', 'rayon_diversite', 'descripteur', 'effets_avant', 'effets_apres', 'cache_grilles')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS travaux (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video TEXT NOT NULL,
+    parametres TEXT NOT NULL,
+    etat TEXT NOT NULL DEFAULT 'en_attente',
+    tentatives INTEGER NOT NULL DEFAULT 0,
+    max_tentatives INTEGER NOT NULL DEFAULT 3,
+    disponible REAL NOT NULL,
+    cree REAL NOT NULL,
+    debut REAL,
+    fin REAL,
+    travailleur TEXT,
+    hote TEXT,
+    pid INTEGER,
+    resultat TEXT,
+    erreur TEXT,
+    mesures TEXT
+);
+CREATE INDEX IF NOT EXISTS travaux_a_faire ON travaux (etat, disponible, id);
+"""
+
+
+class FileTravaux:
+    """File de travaux de rendu dans une base SQLite, partagée par plusieurs processus d'un même hôte
+
+    Un travail passe de 'en_attente' à 'en_cours' quand un processus le prend (dans une
+    transaction immédiate: deux processus ne prennent jamais le même), puis à 'termine' ou,
+    après max_tentatives échecs, à 'echoue'. Un travail échoué est repris plus tard, avec un
+    délai qui double à chaque tentative. Un travail resté 'en_cours' alors que son processus
+    n'existe plus est remis en attente.
+    """
+
+    ETATS = ('en_attente', 'en_cours', 'termine', 'echoue')
+
+    def __init__(self, chemin=FICHIER_FILE):
+        self.chemin = chemin
+        self.connexion = sqlite3.connect(chemin, timeout=60, isolation_level=None)
+        self.connexion.row_factory = sqlite3.Row
+        # Journal WAL: les lectures (état de la file) ne bloquent pas les processus de travail
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.executescript(SCHEMA)
+
+    def fermer(self):
+        self.connexion.close()
+
+    def transaction(self):
+        """Transaction prise en écriture dès le début: les autres processus attendent leur tour"""
+        self.connexion.execute("BEGIN IMMEDIATE")
+        return self.connexion
+
+    def ajouter(self, video, parametres=None, max_tentatives=3):
+        """Ajoute un travail (chemin de la vidéo et paramètres du rendu), renvoie son numéro"""
+        maintenant = time.time()
+        curseur = self.connexion.execute(
+            "INSERT INTO travaux (video, parametres, max_tentatives, disponible, cree) VALUES (?, ?, ?, ?, ?)",
+            (os.path.abspath(video), json.dumps(parametres or {}), max_tentatives, maintenant, maintenant))
+        return curseur.lastrowid
+
+    def prendre(self, travailleur):
+        """Prend le plus ancien travail disponible (dict), ou None si aucun ne l'est"""
+        maintenant = time.time()
+        connexion = self.transaction()
+        try:
+            ligne = connexion.execute("SELECT * FROM travaux WHERE etat = 'en_attente' AND disponible <= ? "
+                                      "ORDER BY id LIMIT 1", (maintenant,)).fetchone()
+            if ligne is not None:
+                connexion.execute("UPDATE travaux SET etat = 'en_cours', debut = ?, fin = NULL, travailleur = ?, "
+                                  "hote = ?, pid = ?, tentatives = tentatives + 1 WHERE id = ?",
+                                  (maintenant, travailleur, socket.gethostname(), os.getpid(), ligne['id']))
+            connexion.execute("COMMIT")
+        except BaseException:
+            connexion.execute("ROLLBACK")
+            raise
+        if ligne is None:
+            return None
+        travail = dict(ligne)
+        travail.update(parametres=json.loads(travail['parametres']), etat='en_cours', debut=maintenant,
+                       tentatives=travail['tentatives'] + 1)
+        return travail
+
+    def terminer(self, numero, resultat, mesures):
+        self.connexion.execute("UPDATE travaux SET etat = 'termine', fin = ?, resultat = ?, erreur = NULL, "
+                               "mesures = ? WHERE id = ?", (time.time(), resultat, json.dumps(mesures), numero))
+
+    def echouer(self, numero, erreur, delai_reprise=5.0):
+        """Note l'échec d'une tentative: le travail est repris plus tard, ou abandonné après la dernière"""
+        connexion = self.transaction()
+        try:
+            ligne = connexion.execute("SELECT tentatives, max_tentatives FROM travaux WHERE id = ?",
+                                      (numero,)).fetchone()
+            reprise = ligne['tentatives'] < ligne['max_tentatives']
+            connexion.execute("UPDATE travaux SET etat = ?, fin = ?, erreur = ?, disponible = ? WHERE id = ?",
+                              ('en_attente' if reprise else 'echoue', time.time(), erreur,
+                               time.time() + delai_reprise * 2 ** (ligne['tentatives'] - 1), numero))
+            connexion.execute("COMMIT")
+        except BaseException:
+            connexion.execute("ROLLBACK")
+            raise
+        return reprise
+
+    def remettre(self, numero):
+        """Remet en attente un travail interrompu sans que la tentative compte"""
+        self.connexion.execute("UPDATE travaux SET etat = 'en_attente', tentatives = tentatives - 1, "
+                               "travailleur = NULL, pid = NULL WHERE id = ? AND etat = 'en_cours'", (numero,))
+
+    def recuperer_abandonnes(self):
+        """Remet en attente les travaux 'en_cours' de cet hôte dont le processus n'existe plus"""
+        connexion = self.transaction()
+        try:
+            abandonnes = [ligne['id'] for ligne in connexion.execute(
+                "SELECT id, pid FROM travaux WHERE etat = 'en_cours' AND hote = ?", (socket.gethostname(),))
+                if not processus_existe(ligne['pid'])]
+            connexion.executemany("UPDATE travaux SET etat = 'en_attente', tentatives = tentatives - 1, "
+                                  "travailleur = NULL, pid = NULL WHERE id = ?", [(n,) for n in abandonnes])
+            connexion.execute("COMMIT")
+        except BaseException:
+            connexion.execute("ROLLBACK")
+            raise
+        return abandonnes
+
+    def compter(self):
+        """Nombre de travaux dans chaque état"""
+        comptes = dict.fromkeys(self.ETATS, 0)
+        for ligne in self.connexion.execute("SELECT etat, COUNT(*) AS n FROM travaux GROUP BY etat"):
+            comptes[ligne['etat']] = ligne['n']
+        return comptes
+
+    def travaux(self, etat=None):
+        """Liste des travaux (dicts), les plus anciens d'abord"""
+        if etat:
+            lignes = self.connexion.execute("SELECT * FROM travaux WHERE etat = ? ORDER BY id", (etat,))
+        else:
+            lignes = self.connexion.execute("SELECT * FROM travaux ORDER BY id")
+        return [dict(ligne) for ligne in lignes]
+
+
+def processus_existe(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TravailleurMosaique:
+    """Processus de travail: prend les travaux de la file un par un et les rend
+
+    Les mosaïques chargées (bibliothèque, index des couleurs, atlas de tuiles) sont gardées
+    d'un travail à l'autre, pour les `nombre_mosaiques` derniers jeux de photos et d'options:
+    un travail ne paie que son rendu. Une bibliothèque dont le dossier a changé est relue
+    (seules les photos nouvelles ou modifiées sont analysées).
+    """
+
+    def __init__(self, chemin_file=FICHIER_FILE, nom=None, attente=1.0, jusqu_a_vide=False,
+                 nombre_mosaiques=2, delai_reprise=5.0):
+        self.file = FileTravaux(chemin_file)
+        self.nom = nom or f"{socket.gethostname()}:{os.getpid()}"
+        self.attente = attente
+        self.jusqu_a_vide = jusqu_a_vide
+        self.nombre_mosaiques = nombre_mosaiques
+        self.delai_reprise = delai_reprise
+        self.mosaiques = OrderedDict()
+        self.travaux_faits = 0
+
+    def obtenir_mosaique(self, parametres):
+        """Mosaïque chargée pour le dossier de photos et les options du travail (gardée pour les suivants)"""
+        # Importé ici: ajouter des travaux ou lire l'état de la file ne charge ni OpenCV ni NumPy
+        from video_mosaic import VideoMosaic
+        dossier = parametres.get('photos', "photos_mosaique")
+        options = {nom: parametres[nom] for nom in OPTIONS_MOSAIQUE if parametres.get(nom) is not None}
+        cle = (os.path.abspath(dossier), json.dumps(options, sort_keys=True))
+        entree = self.mosaiques.get(cle)
+        if entree is None:
+            mosaic = VideoMosaic(dossier, silencieux=True, **options)
+            entree = self.mosaiques[cle] = [mosaic, photos_dossier(dossier)]
+            while len(self.mosaiques) > self.nombre_mosaiques:
+                self.mosaiques.popitem(last=False)
+        else:
+            self.mosaiques.move_to_end(cle)
+            mosaic = entree[0]
+            # L'index et les atlas écrits dans le dossier ne comptent pas: seules les photos décident
+            photos = photos_dossier(dossier)
+            if photos != entree[1]:
+                mosaic.charger_photos_mosaique()
+                entree[1] = photos
+        return mosaic
+
+    def executer(self, travail):
+        """Rend un travail; renvoie (résultat, mesures)"""
+        from sorties_video import creer_sortie
+        parametres = travail['parametres']
+        debut = time.perf_counter()
+        mosaic = self.obtenir_mosaique(parametres)
+        preparation = time.perf_counter() - debut
+
+        sortie = None
+        if parametres.get('sortie'):
+            sortie = creer_sortie(parametres['sortie'], parametres.get('format'), parametres.get('fps'))
+        debut = time.perf_counter()
+        resultat = mosaic.traiter_video(travail['video'], parametres.get('taille_pixel', 20), parametres.get('fps', 10),
+                                        1, parametres.get('debut'), parametres.get('fin'), sortie=sortie)
+        if resultat is None:
+            raise IOError(f"Impossible de traiter la vidéo: {travail['video']}")
+        mesures = {
+            'attente': travail['debut'] - travail['cree'],
+            'preparation': preparation,
+            'rendu': time.perf_counter() - debut,
+            'frames': mosaic.suivi.frames_faites,
+            'etapes': mosaic.suivi.temps_etapes,
+        }
+        return str(resultat), mesures
+
+    def boucle(self):
+        """Traite les travaux jusqu'à l'interruption (ou jusqu'à ce que la file soit vide)"""
+        recuperes = self.file.recuperer_abandonnes()
+        if recuperes:
+            print(f"♻️  [{self.nom}] Travaux abandonnés remis en attente: {', '.join(map(str, recuperes))}")
+        while True:
+            travail = self.file.prendre(self.nom)
+            if travail is None:
+                if self.jusqu_a_vide and not self.file.compter()['en_attente']:
+                    return self.travaux_faits
+                time.sleep(self.attente)
+                continue
+
+            numero = travail['id']
+            print(f"🎬 [{self.nom}] Travail {numero} (tentative {travail['tentatives']}/{travail['max_tentatives']}): "
+                  f"{travail['video']}")
+            try:
+                resultat, mesures = self.executer(travail)
+            except KeyboardInterrupt:
+                self.file.remettre(numero)
+                print(f"⏹️  [{self.nom}] Interrompu: travail {numero} remis en attente")
+                return self.travaux_faits
+            except Exception as e:
+                if self.file.echouer(numero, f"{type(e).__name__}: {e}", self.delai_reprise):
+                    print(f"⚠️  [{self.nom}] Travail {numero} en échec, sera repris: {e}")
+                else:
+                    print(f"❌ [{self.nom}] Travail {numero} abandonné après {travail['tentatives']} tentatives: {e}")
+                continue
+            self.file.terminer(numero, resultat, mesures)
+            self.travaux_faits += 1
+            print(f"✅ [{self.nom}] Travail {numero}: {mesures['frames']} frames en {mesures['rendu']:.1f}s "
+                  f"(préparation {mesures['preparation']:.1f}s) -> {resultat}")
+
+
+def photos_dossier(dossier):
+    """Photos du dossier avec leur taille et leur date (None sans dossier): change si une photo est ajoutée, modifiée ou supprimée"""
+    from bibliotheque_photos import BibliothequePhotos
+    return BibliothequePhotos(dossier).lister_fichiers() if os.path.isdir(dossier) else None
+
+
+def _travailleur(chemin_file, options):
+    """Point d'entrée d'un processus de travail"""
+    try:
+        TravailleurMosaique(chemin_file, **options).boucle()
+    except KeyboardInterrupt:
+        pass
+
+
+def lancer_travailleurs(chemin_file=FICHIER_FILE, nombre=1, **options):
+    """Lance `nombre` processus de travail sur la file et attend leur fin"""
+    if nombre <= 1:
+        return TravailleurMosaique(chemin_file, **options).boucle()
+    processus = [multiprocessing.Process(target=_travailleur, args=(chemin_file, options)) for _ in range(nombre)]
+    for p in processus:
+        p.start()
+    try:
+        for p in processus:
+            p.join()
+    except KeyboardInterrupt:
+        # Chaque processus reçoit aussi l'interruption et remet son travail en attente
+        for p in processus:
+            p.join()
+
+
+def afficher_etat(file):
+    """Résumé de la file et détail des travaux"""
+    comptes = file.compter()
+    print("📋 " + ", ".join(f"{etat}: {n}" for etat, n in comptes.items()))
+    for travail in file.travaux():
+        duree = f"{travail['fin'] - travail['debut']:.1f}s" if travail['fin'] and travail['debut'] else "-"
+        mesures = json.loads(travail['mesures']) if travail['mesures'] else {}
+        details = (f", {mesures['frames']} frames, attente {mesures['attente']:.1f}s, "
+                   f"préparation {mesures['preparation']:.1f}s") if mesures else ""
+        print(f"   {travail['id']:>5}  {travail['etat']:<10}  {travail['tentatives']}/{travail['max_tentatives']}  "
+              f"{duree:>7}{details}  {os.path.basename(travail['video'])}")
+        if travail['erreur'] and travail['etat'] != 'termine':
+            print(f"          ❌ {travail['erreur']}")
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Rendus de mosaïques vidéo en lot depuis une file SQLite")
+    parser.add_argument("--queue", default=FICHIER_FILE, help=f"Base SQLite de la file (défaut: {FICHIER_FILE})")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    ajout = commandes.add_parser("add", help="Ajoute des vidéos à rendre")
+    ajout.add_argument("videos", nargs="+", help="Vidéos à rendre, un travail par vidéo")
+    ajout.add_argument("--photos", default="photos_mosaique", help="Dossier contenant les photos pour la mosaïque")
+    ajout.add_argument("--pixel-size", type=int, default=20, help="Taille des 'pixels' photos (défaut: 20)")
+    ajout.add_argument("--fps", type=float, default=10, help="FPS de la vidéo de sortie (défaut: 10)")
+    ajout.add_argument("--start", type=float, default=None, help="Début de l'extrait à traiter, en secondes")
+    ajout.add_argument("--end", type=float, default=None, help="Fin de l'extrait à traiter, en secondes")
+    ajout.add_argument("--output", default=None, metavar="DESTINATION",
+                       help="Destination du rendu, avec {nom} pour le nom de la vidéo "
+                            "(défaut: video_mosaic_output/mosaic_<nom>)")
+    ajout.add_argument("--output-format", default=None, help="Format de --output (mp4, png, jpg, raw, y4m)")
+    ajout.add_argument("--incremental", type=float, default=None, metavar="SEUIL")
+    ajout.add_argument("--adaptive", type=int, default=None, metavar="TAILLE_MIN")
+    ajout.add_argument("--variance-threshold", type=float, default=None)
+    ajout.add_argument("--diversity", type=int, default=None, metavar="K")
+    ajout.add_argument("--diversity-radius", type=int, default=None)
+    ajout.add_argument("--descriptor", default=None, help="bgr, lab, lab2x2 ou lab4x4 (défaut: bgr)")
+    ajout.add_argument("--color-table", dest="table_couleurs", type=int, default=None, metavar="NIVEAUX")
+    ajout.add_argument("--pre-effect", action="append", default=None, metavar="EFFET")
+    ajout.add_argument("--post-effect", action="append", default=None, metavar="EFFET")
+    ajout.add_argument("--grid-cache", default=None, metavar="DOSSIER",
+                       help="Cache des grilles de photos par frame (voir video_mosaic.py --grid-cache)")
+    ajout.add_argument("--retries", type=int, default=3, help="Nombre de tentatives par travail (défaut: 3)")
+
+    travail = commandes.add_parser("work", help="Traite les travaux de la file")
+    travail.add_argument("--workers", type=int, default=1, help="Nombre de processus de travail (défaut: 1)")
+    travail.add_argument("--until-empty", action="store_true", help="S'arrête quand plus aucun travail n'attend")
+    travail.add_argument("--poll", type=float, default=1.0, help="Attente entre deux recherches de travail, en secondes")
+    travail.add_argument("--retry-delay", type=float, default=5.0,
+                         help="Délai avant la reprise d'un travail en échec, doublé à chaque tentative (défaut: 5)")
+
+    commandes.add_parser("status", help="Affiche l'état des travaux")
+
+    args = parser.parse_args()
+
+    if args.commande == "add":
+        if args.diversity_radius is not None and args.diversity_radius < 1:
+            parser.error(f"--diversity-radius doit valoir au moins 1 (reçu: {args.diversity_radius})")
+        file = FileTravaux(args.queue)
+        for video in args.videos:
+            nom = os.path.splitext(os.path.basename(video))[0]
+            parametres = {
+                'photos': os.path.abspath(args.photos), 'taille_pixel': args.pixel_size, 'fps': args.fps,
+                'debut': args.start, 'fin': args.end, 'format': args.output_format,
+                'sortie': os.path.abspath(args.output.format(nom=nom)) if args.output else None,
+                'seuil_incremental': args.incremental, 'taille_min_adaptative': args.adaptive,
+                'seuil_variance': args.variance_threshold, 'diversite': args.diversity,
+                'rayon_diversite': args.diversity_radius, 'descripteur': args.descriptor,
+                'niveaux_table': args.table_couleurs, 'effets_avant': args.pre_effect,
+                'effets_apres': args.post_effect,
+                'cache_grilles': os.path.abspath(args.grid_cache) if args.grid_cache else None,
+            }
+            print(f"➕ Travail {file.ajouter(video, parametres, args.retries)}: {video}")
+        return 0
+
+    if args.commande == "work":
+        print(f"⚙️  Traitement de la file {args.queue} sur {args.workers} processus")
+        lancer_travailleurs(args.queue, args.workers, attente=args.poll, jusqu_a_vide=args.until_empty,
+                            delai_reprise=args.retry_delay)
+        afficher_etat(FileTravaux(args.queue))
+        return 0
+
+    afficher_etat(FileTravaux(args.queue))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Index de Couleurs - Art Informatique
+Recherche rapide de la photo la plus proche d'une couleur pour la mosaïque
+"""
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy est optionnel: recherche exhaustive vectorisée sinon
+    cKDTree = None
+
+
+class IndexCouleurs:
+    """Index des descripteurs des photos (couleurs moyennes ou signatures), interrogé par lots entiers
+
+    Au-delà de DIMENSIONS_ARBRE dimensions, la recherche est approchée: les candidats sont cherchés
+    sur une projection en composantes principales (ACP), puis reclassés sur les descripteurs complets.
+    """
+
+    # Nombre maximal de distances calculées à la fois en recherche exhaustive
+    TAILLE_LOT = 1 << 22
+    DIMENSIONS_ARBRE = 8
+    # Candidats de la projection reclassés sur les descripteurs complets
+    CANDIDATS_RECLASSEMENT = 32
+
+    def __init__(self, moyennes, niveaux_table=None, table=None):
+        self.moyennes = np.ascontiguousarray(moyennes, dtype=np.float64)
+        if len(self.moyennes) == 0:
+            raise ValueError("Impossible d'indexer une bibliothèque de photos vide")
+        self.dimensions = self.moyennes.shape[1]
+
+        self.centre = None
+        self.projection = None
+        self.points = self.moyennes
+        if self.dimensions > self.DIMENSIONS_ARBRE:
+            self.centre = self.moyennes.mean(axis=0)
+            _, _, axes = np.linalg.svd(self.moyennes - self.centre, full_matrices=False)
+            self.projection = np.ascontiguousarray(axes[:self.DIMENSIONS_ARBRE].T)
+            self.points = self.projeter(self.moyennes)
+            self.normes_completes = np.einsum('ij,ij->i', self.moyennes, self.moyennes)
+
+        self.arbre = cKDTree(self.points) if cKDTree is not None else None
+        self.normes = np.einsum('ij,ij->i', self.points, self.points)
+
+        self.table = table
+        self.niveaux_table = None if table is None else table.shape[0]
+        # Tables des k meilleures photos par case, construites à la demande
+        self.tables_k = {}
+        if niveaux_table and table is None:
+            self.construire_table(niveaux_table)
+
+    def __len__(self):
+        return len(self.moyennes)
+
+    def construire_table(self, niveaux=32):
+        """Précalcule la meilleure photo pour chaque case d'une grille BGR quantifiée (niveaux³ cases)"""
+        if self.dimensions != 3:
+            raise ValueError("La table de correspondance ne s'applique qu'aux couleurs moyennes BGR")
+        pas = 256.0 / niveaux
+        centres = (np.arange(niveaux) + 0.5) * pas
+        grille = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'), axis=-1)
+
+        self.table = self.rechercher_exact(grille.reshape(-1, 3)).reshape(niveaux, niveaux, niveaux)
+        self.niveaux_table = niveaux
+        return self.table
+
+    def rechercher(self, couleurs):
+        """Indices des photos les plus proches pour un tableau de couleurs (..., 3)"""
+        couleurs = np.asarray(couleurs, dtype=np.float64)
+        if self.table is None:
+            return self.rechercher_exact(couleurs)
+
+        cases = np.clip((couleurs * (self.niveaux_table / 256.0)).astype(np.intp), 0, self.niveaux_table - 1)
+        return self.table[cases[..., 0], cases[..., 1], cases[..., 2]]
+
+    def rechercher_k(self, couleurs, k):
+        """Indices des k photos les plus proches, de la plus proche à la moins proche (..., k)"""
+        couleurs = np.asarray(couleurs, dtype=np.float64)
+        k = min(k, len(self.moyennes))
+        if self.niveaux_table is None:
+            return self.rechercher_k_exact(couleurs, k)
+
+        table = self.tables_k.get(k)
+        if table is None:
+            pas = 256.0 / self.niveaux_table
+            centres = (np.arange(self.niveaux_table) + 0.5) * pas
+            grille = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'), axis=-1)
+            table = self.tables_k[k] = self.rechercher_k_exact(grille, k)
+        cases = np.clip((couleurs * (self.niveaux_table / 256.0)).astype(np.intp), 0, self.niveaux_table - 1)
+        return table[cases[..., 0], cases[..., 1], cases[..., 2]]
+
+    def rechercher_k_exact(self, couleurs, k):
+        """Recherche des k plus proches sans quantification (arbre k-d, ou calcul exhaustif par lots)"""
+        couleurs = np.asarray(couleurs, dtype=np.float64)
+        forme = couleurs.shape[:-1]
+        requetes = couleurs.reshape(-1, self.dimensions)
+        if self.projection is None:
+            indices = self.plus_proches(requetes, k)
+        else:
+            candidats = self.plus_proches(self.projeter(requetes), min(len(self), max(k, self.CANDIDATS_RECLASSEMENT)))
+            indices = self.reclasser(requetes, candidats, k)
+        return indices.reshape(forme + (k,))
+
+    def rechercher_exact(self, couleurs):
+        """Recherche sans quantification de la photo la plus proche"""
+        return self.rechercher_k_exact(couleurs, 1)[..., 0]
+
+    def projeter(self, descripteurs):
+        return (descripteurs - self.centre) @ self.projection
+
+    def plus_proches(self, requetes, k):
+        """Indices (requêtes, k) des k points de l'index les plus proches, du plus proche au moins proche"""
+        if self.arbre is not None:
+            _, indices = self.arbre.query(requetes, k=k)
+            return indices.astype(np.intp).reshape(len(requetes), k)
+
+        indices = np.empty((len(requetes), k), dtype=np.intp)
+        pas = max(1, self.TAILLE_LOT // len(self.points))
+        for debut in range(0, len(requetes), pas):
+            lot = requetes[debut:debut + pas]
+            # |a - b|² = |a|² - 2a·b + |b|², le terme |a|² ne change pas le classement
+            distances = self.normes[None, :] - 2.0 * (lot @ self.points.T)
+            if k == 1:
+                indices[debut:debut + pas, 0] = np.argmin(distances, axis=1)
+                continue
+            # Les k plus petites distances sans tri complet, puis triées entre elles
+            meilleurs = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < len(self.points) else \
+                np.broadcast_to(np.arange(k), (len(lot), k))
+            ordre = np.argsort(np.take_along_axis(distances, meilleurs, axis=1), axis=1)
+            indices[debut:debut + pas] = np.take_along_axis(meilleurs, ordre, axis=1)
+        return indices
+
+    def reclasser(self, requetes, candidats, k):
+        """Garde les k meilleurs candidats d'après les distances sur les descripteurs complets"""
+        indices = np.empty((len(requetes), k), dtype=np.intp)
+        pas = max(1, self.TAILLE_LOT // (candidats.shape[1] * self.dimensions))
+        for debut in range(0, len(requetes), pas):
+            lot = candidats[debut:debut + pas]
+            distances = self.normes_completes[lot] - 2.0 * np.einsum('md,mkd->mk', requetes[debut:debut + pas],
+                                                                      self.moyennes[lot])
+            ordre = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            indices[debut:debut + pas] = np.take_along_axis(lot, ordre, axis=1)
+        return indices
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Magasin de Tuiles - Art Informatique
+Atlas des tuiles de la mosaïque dans des fichiers projetés en mémoire, avec un budget de mémoire vive
+"""
+
+import os
+import glob
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+class MagasinTuiles:
+    """Atlas de tuiles (n_photos, hauteur, largeur, 3) par taille, dans des fichiers .npy projetés en mémoire
+
+    Seules les tailles demandées par le rendu sont construites, chaque photo étant décodée une
+    fois pour toutes les tailles et redimensionnée comme au rendu d'origine (photo complète,
+    interpolation bilinéaire), quelle que soit la taille des tuiles. Les fichiers sont relus aux exécutions suivantes tant que
+    la bibliothèque ne change pas, et les processus de rendu les ouvrent sans copie: le système
+    garde leurs pages dans son cache et peut les libérer au besoin. Les atlas utilisés sont aussi
+    copiés en mémoire vive dans la limite de budget_octets, les moins récemment utilisés sortant
+    les premiers; au-delà, ils sont lus directement dans les fichiers.
+    """
+
+    DOSSIER = ".tuiles_mosaique"
+    # Change quand la construction des tuiles change: les atlas des versions précédentes sont reconstruits
+    VERSION = 2
+
+    def __init__(self, bibliotheque, budget_octets=256 * 2**20, dossier=None):
+        self.bibliotheque = bibliotheque
+        self.budget_octets = budget_octets
+        self.dossier = dossier or os.path.join(bibliotheque.dossier_photos, self.DOSSIER)
+        self.empreinte = bibliotheque.empreinte()[:16]
+        self.projetes = {}
+        # Copies en mémoire vive, de la moins à la plus récemment utilisée
+        self.en_memoire = OrderedDict()
+        self.octets_en_memoire = 0
+
+    def __len__(self):
+        return len(self.projetes)
+
+    def __contains__(self, taille):
+        return taille in self.projetes
+
+    def __getitem__(self, taille):
+        atlas = self.en_memoire.get(taille)
+        if atlas is None:
+            return self.projetes[taille]
+        self.en_memoire.move_to_end(taille)
+        return atlas
+
+    def fichier(self, taille):
+        return os.path.join(self.dossier, f"atlas_{taille[0]}x{taille[1]}_{self.empreinte}_v{self.VERSION}.npy")
+
+    def projete(self, taille):
+        """Atlas projeté depuis son fichier (à partager avec d'autres processus)"""
+        return self.projetes[taille]
+
+    def preparer(self, tailles):
+        """Ouvre ou construit les atlas demandés et les garde en mémoire vive si le budget le permet
+
+        Renvoie le nombre d'atlas qu'il a fallu construire à partir des photos.
+        """
+        tailles = list(dict.fromkeys(tailles))
+        manquantes = [t for t in tailles if t not in self.projetes and not self.ouvrir(t)]
+        if manquantes:
+            self.construire(manquantes)
+            for taille in manquantes:
+                self.ouvrir(taille)
+
+        for taille in tailles:
+            if taille in self.en_memoire:
+                self.en_memoire.move_to_end(taille)
+            else:
+                self.charger_en_memoire(taille, tailles)
+        return len(manquantes)
+
+    def ouvrir(self, taille):
+        """Projette le fichier d'un atlas déjà construit, False s'il manque ou ne correspond plus"""
+        try:
+            atlas = np.load(self.fichier(taille), mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        if atlas.shape != (len(self.bibliotheque), taille[0], taille[1], 3):
+            return False
+        self.projetes[taille] = atlas
+        return True
+
+    def charger_en_memoire(self, taille, utilisees=()):
+        """Copie un atlas en mémoire vive en libérant les moins récemment utilisés, sauf ceux en cours d'usage"""
+        octets = self.projetes[taille].nbytes
+        liberables = [t for t in self.en_memoire if t not in utilisees]
+        if self.octets_en_memoire - sum(self.en_memoire[t].nbytes for t in liberables) + octets > self.budget_octets:
+            return False
+        for ancienne in liberables:
+            if self.octets_en_memoire + octets <= self.budget_octets:
+                break
+            self.octets_en_memoire -= self.en_memoire.pop(ancienne).nbytes
+        self.en_memoire[taille] = np.array(self.projetes[taille])
+        self.octets_en_memoire += octets
+        return True
+
+    def construire(self, tailles):
+        """Écrit les fichiers des atlas manquants, chaque photo n'étant décodée qu'une fois pour toutes les tailles"""
+        os.makedirs(self.dossier, exist_ok=True)
+        self.nettoyer()
+        bibliotheque = self.bibliotheque
+        temporaires = {t: f"{self.fichier(t)}.{os.getpid()}.tmp" for t in tailles}
+        atlas = {t: np.lib.format.open_memmap(temporaires[t], mode='w+', dtype=np.uint8,
+                                              shape=(len(bibliotheque), t[0], t[1], 3))
+                 for t in tailles}
+
+        for i, chemin_photo in enumerate(bibliotheque.chemins):
+            img_photo = cv2.imread(chemin_photo)
+            if img_photo is None:
+                continue
+            for hauteur, largeur in tailles:
+                atlas[(hauteur, largeur)][i] = cv2.resize(img_photo, (largeur, hauteur))
+
+        for taille in tailles:
+            atlas.pop(taille).flush()
+            os.replace(temporaires[taille], self.fichier(taille))
+
+    def nettoyer(self):
+        """Supprime les atlas d'une version précédente de la bibliothèque"""
+        for chemin in glob.glob(os.path.join(self.dossier, "atlas_*.npy")):
+            if not chemin.endswith(f"_{self.empreinte}_v{self.VERSION}.npy"):
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    pass
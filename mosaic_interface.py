@@ -8,16 +8,59 @@ import os
 import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import time
+import queue
 import threading
 from video_mosaic import VideoMosaic
+from suivi_rendu import ObservateurRendu
 import cv2
 from PIL import Image, ImageTk
 
+
+class ObservateurInterface(ObservateurRendu):
+    """Transmet l'avancement et un aperçu réduit du rendu à l'interface, par une file thread-safe
+
+    Appelé depuis le thread d'encodage: les messages sont espacés d'au moins `intervalle`
+    secondes (`intervalle_apercu` pour l'aperçu) pour ne jamais ralentir le rendu.
+    """
+
+    def __init__(self, file_messages, largeur_apercu=320, intervalle=0.1, intervalle_apercu=0.5):
+        self.file_messages = file_messages
+        self.largeur_apercu = largeur_apercu
+        self.intervalle = intervalle
+        self.intervalle_apercu = intervalle_apercu
+        self.dernier_envoi = 0.0
+        self.dernier_apercu = 0.0
+
+    def progression(self, etat):
+        maintenant = time.perf_counter()
+        if maintenant - self.dernier_envoi < self.intervalle and etat['frames_faites'] != etat['frames_total']:
+            return
+        self.dernier_envoi = maintenant
+        if etat['frames_total']:
+            self.file_messages.put(('progression', etat['frames_faites'] / etat['frames_total'] * 100))
+            self.file_messages.put(('statut', f"Frame {etat['frames_faites']}/{etat['frames_total']} - "
+                                              f"{etat['fps']:.1f} frames/s, reste {etat['eta'] or 0:.0f}s"))
+        else:
+            self.file_messages.put(('statut', f"Frame {etat['frames_faites']} - {etat['fps']:.1f} frames/s"))
+
+    def frame_rendue(self, frame):
+        maintenant = time.perf_counter()
+        if maintenant - self.dernier_apercu < self.intervalle_apercu:
+            return
+        self.dernier_apercu = maintenant
+        hauteur, largeur = frame.shape[:2]
+        echelle = min(1.0, self.largeur_apercu / largeur)
+        apercu = cv2.resize(frame, (max(1, int(largeur * echelle)), max(1, int(hauteur * echelle))),
+                            interpolation=cv2.INTER_AREA)
+        self.file_messages.put(('apercu', cv2.cvtColor(apercu, cv2.COLOR_BGR2RGB)))
+
+
 class MosaicInterface:
     def __init__(self, root):
         self.root = root
         self.root.title("🎨 Mosaïque Vidéo Photographique")
-        self.root.geometry("600x500")
+        self.root.geometry("600x800")
         self.root.configure(bg='#2c3e50')
         
         # Variables
@@ -28,11 +71,17 @@ class MosaicInterface:
         self.progress = tk.DoubleVar()
         self.status_text = tk.StringVar(value="Prêt à traiter une vidéo")
         
-        # Instance de mosaïque
+        # Instance de mosaïque, gardée chargée entre deux traitements
         self.mosaic = None
         self.processing = False
+        self.annulation = None
+        self.image_apercu = None
+        
+        # Messages des threads de travail: seul le thread de Tk touche à l'interface
+        self.file_messages = queue.Queue()
         
         self.setup_ui()
+        self.root.after(100, self.lire_messages)
     
     def setup_ui(self):
         """Configure l'interface utilisateur"""
@@ -115,6 +164,14 @@ class MosaicInterface:
                                     bg='#f39c12', fg='white', font=('Arial', 12, 'bold'), width=15, height=2)
         self.demo_button.pack(side='left', padx=5)
         
+        self.preview_button = tk.Button(buttons_frame, text="👁️ Aperçu rapide", command=self.start_preview, 
+                                       bg='#2980b9', fg='white', font=('Arial', 12, 'bold'), width=15, height=2)
+        self.preview_button.pack(side='left', padx=5)
+        
+        self.cancel_button = tk.Button(buttons_frame, text="⏹️ Annuler", command=self.cancel_processing, state='disabled',
+                                      bg='#c0392b', fg='white', font=('Arial', 12, 'bold'), width=10, height=2)
+        self.cancel_button.pack(side='left', padx=5)
+        
         # Barre de progression
         progress_frame = tk.Frame(process_frame, bg='#34495e')
         progress_frame.pack(fill='x', padx=10, pady=10)
@@ -129,6 +186,13 @@ class MosaicInterface:
         
         self.status_label = tk.Label(status_frame, textvariable=self.status_text, bg='#34495e', fg='#ecf0f1', font=('Arial', 10))
         self.status_label.pack(anchor='w')
+        
+        # Aperçu des dernières frames rendues
+        preview_frame = tk.LabelFrame(main_frame, text="👁️ Aperçu", bg='#34495e', fg='#ecf0f1', font=('Arial', 12, 'bold'))
+        preview_frame.pack(padx=10, pady=10, fill='both', expand=True)
+        
+        self.preview_label = tk.Label(preview_frame, bg='#2c3e50')
+        self.preview_label.pack(padx=10, pady=10, fill='both', expand=True)
     
     def browse_video(self):
         """Ouvrir le dialogue pour choisir une vidéo"""
@@ -150,21 +214,32 @@ class MosaicInterface:
     
     def create_demo(self):
         """Créer une vidéo de démonstration"""
+        if self.processing:
+            return
         self.status_text.set("Création de la vidéo de démonstration...")
-        self.root.update()
+        self.commencer_travail()
         
+        thread = threading.Thread(target=self.process_demo)
+        thread.daemon = True
+        thread.start()
+    
+    def process_demo(self):
+        """Créer la vidéo de démonstration dans un thread séparé (pas besoin des photos)"""
         try:
-            if not self.mosaic:
-                self.mosaic = VideoMosaic(self.photos_path.get())
-            
-            demo_path = self.mosaic.creer_video_demo()
-            self.video_path.set(demo_path)
-            self.status_text.set(f"Vidéo de démonstration créée: {demo_path}")
-            messagebox.showinfo("Succès", f"Vidéo de démonstration créée:\n{demo_path}")
-            
+            demo_path = VideoMosaic(charger=False, silencieux=True).creer_video_demo()
+            self.file_messages.put(('demo', demo_path))
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la création de la vidéo demo:\n{str(e)}")
-            self.status_text.set("Erreur lors de la création de la vidéo demo")
+            self.file_messages.put(('erreur_demo', str(e)))
+    
+    def obtenir_mosaique(self, dossier_photos):
+        """Renvoie l'instance de mosaïque, recréée seulement si le dossier des photos change"""
+        if self.mosaic is None or self.mosaic.dossier_photos != dossier_photos:
+            self.mosaic = VideoMosaic(dossier_photos, progression_chargement=self.progression_chargement)
+        return self.mosaic
+    
+    def progression_chargement(self, faites, total):
+        self.file_messages.put(('statut', f"Chargement des photos: {faites}/{total}"))
+        self.file_messages.put(('progression', faites / total * 100 if total else 0))
     
     def start_processing(self):
         """Démarrer le traitement de la vidéo"""
@@ -175,56 +250,172 @@ class MosaicInterface:
             messagebox.showwarning("Attention", "Veuillez sélectionner une vidéo à traiter")
             return
         
+        # Les variables Tk sont lues ici: le thread de travail ne touche pas à l'interface
+        parametres = (self.video_path.get(), self.photos_path.get(), self.pixel_size.get(), self.fps_output.get())
+        self.annulation = threading.Event()
+        self.commencer_travail()
+        self.cancel_button.config(state='normal')
+        self.process_button.config(text="⏳ Traitement en cours...")
+        
         # Démarrer le traitement dans un thread séparé
-        self.processing = True
-        self.process_button.config(state='disabled', text="⏳ Traitement en cours...")
-        self.demo_button.config(state='disabled')
+        thread = threading.Thread(target=self.process_video, args=parametres + (self.annulation,))
+        thread.daemon = True
+        thread.start()
+    
+    def start_preview(self):
+        """Planche de quelques frames rendues à échelle réduite, pour régler la taille des pixels"""
+        if self.processing:
+            return
+        
+        if not self.video_path.get():
+            messagebox.showwarning("Attention", "Veuillez sélectionner une vidéo à prévisualiser")
+            return
         
-        thread = threading.Thread(target=self.process_video)
+        parametres = (self.video_path.get(), self.photos_path.get(), self.pixel_size.get())
+        self.commencer_travail()
+        
+        thread = threading.Thread(target=self.process_preview, args=parametres)
         thread.daemon = True
         thread.start()
     
-    def process_video(self):
+    def process_preview(self, video, dossier_photos, taille_pixel):
+        """Rendre la planche d'aperçu dans un thread séparé (photos et index gardés pour le rendu)"""
+        try:
+            self.file_messages.put(('statut', "Initialisation de la mosaïque..."))
+            mosaic = self.obtenir_mosaique(dossier_photos)
+            self.file_messages.put(('statut', "Rendu de l'aperçu..."))
+            debut = time.perf_counter()
+            planche = mosaic.planche_apercu(video, taille_pixel, nombre=6, largeur_vignette=320)
+            if planche is None:
+                self.file_messages.put(('erreur', f"Impossible de lire la vidéo: {video}"))
+                return
+            hauteur, largeur = planche.shape[:2]
+            facteur = min(1.0, 660 / largeur, 500 / hauteur)
+            planche = cv2.resize(planche, (int(largeur * facteur), int(hauteur * facteur)), interpolation=cv2.INTER_AREA)
+            self.file_messages.put(('planche', (cv2.cvtColor(planche, cv2.COLOR_BGR2RGB), time.perf_counter() - debut)))
+        except Exception as e:
+            self.file_messages.put(('erreur', str(e)))
+    
+    def cancel_processing(self):
+        """Demander l'arrêt du traitement en cours"""
+        if self.annulation is not None:
+            self.annulation.set()
+            self.cancel_button.config(state='disabled')
+            self.status_text.set("Annulation en cours...")
+    
+    def process_video(self, video, dossier_photos, taille_pixel, fps_output, annulation):
         """Traiter la vidéo dans un thread séparé"""
         try:
-            # Initialiser la mosaïque
-            self.status_text.set("Initialisation de la mosaïque...")
-            self.root.update()
-            
-            self.mosaic = VideoMosaic(self.photos_path.get())
+            # Initialiser la mosaïque (les photos ne sont relues que si le dossier change)
+            self.file_messages.put(('statut', "Initialisation de la mosaïque..."))
+            mosaic = self.obtenir_mosaique(dossier_photos)
+            if annulation.is_set():
+                self.file_messages.put(('annule', None))
+                return
             
             # Traiter la vidéo
-            self.status_text.set("Traitement de la vidéo en cours...")
-            self.root.update()
+            self.file_messages.put(('statut', "Traitement de la vidéo en cours..."))
+            observateur = ObservateurInterface(self.file_messages)
+            mosaic.ajouter_observateur(observateur)
+            try:
+                resultat = mosaic.traiter_video(video, taille_pixel, fps_output, annulation=annulation)
+            finally:
+                mosaic.retirer_observateur(observateur)
             
-            resultat = self.mosaic.traiter_video(
-                self.video_path.get(),
-                self.pixel_size.get(),
-                self.fps_output.get()
-            )
-            
-            # Succès
-            self.root.after(0, lambda: self.processing_complete(resultat))
+            if annulation.is_set():
+                self.file_messages.put(('annule', None))
+            elif resultat is None:
+                self.file_messages.put(('erreur', f"Impossible de traiter la vidéo: {video}"))
+            else:
+                self.file_messages.put(('fini', resultat))
             
         except Exception as e:
             # Erreur
-            self.root.after(0, lambda: self.processing_error(str(e)))
+            self.file_messages.put(('erreur', str(e)))
     
-    def processing_complete(self, resultat):
-        """Appelé quand le traitement est terminé avec succès"""
+    def lire_messages(self):
+        """Applique les messages des threads de travail (appelé régulièrement par Tk)"""
+        try:
+            while True:
+                genre, valeur = self.file_messages.get_nowait()
+                if genre == 'statut':
+                    self.status_text.set(valeur)
+                elif genre == 'progression':
+                    self.progress.set(valeur)
+                elif genre == 'apercu':
+                    self.afficher_apercu(valeur)
+                elif genre == 'planche':
+                    self.preview_complete(*valeur)
+                elif genre == 'fini':
+                    self.processing_complete(valeur)
+                elif genre == 'annule':
+                    self.processing_cancelled()
+                elif genre == 'erreur':
+                    self.processing_error(valeur)
+                elif genre == 'demo':
+                    self.demo_complete(valeur)
+                elif genre == 'erreur_demo':
+                    self.demo_error(valeur)
+        except queue.Empty:
+            pass
+        self.root.after(100, self.lire_messages)
+    
+    def afficher_apercu(self, image_rgb):
+        """Affiche une frame réduite; la référence est gardée pour que Tk ne la libère pas"""
+        self.image_apercu = ImageTk.PhotoImage(Image.fromarray(image_rgb))
+        self.preview_label.config(image=self.image_apercu)
+    
+    def commencer_travail(self):
+        self.processing = True
+        self.progress.set(0)
+        self.process_button.config(state='disabled')
+        self.demo_button.config(state='disabled')
+        self.preview_button.config(state='disabled')
+    
+    def terminer_travail(self):
         self.processing = False
+        self.annulation = None
         self.process_button.config(state='normal', text="🚀 Démarrer le traitement")
         self.demo_button.config(state='normal')
+        self.preview_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+    
+    def demo_complete(self, demo_path):
+        """Appelé quand la vidéo de démonstration est créée"""
+        self.terminer_travail()
+        self.video_path.set(demo_path)
+        self.status_text.set(f"Vidéo de démonstration créée: {demo_path}")
+        messagebox.showinfo("Succès", f"Vidéo de démonstration créée:\n{demo_path}")
+    
+    def demo_error(self, error_msg):
+        """Appelé quand la création de la vidéo de démonstration échoue"""
+        self.terminer_travail()
+        messagebox.showerror("Erreur", f"Erreur lors de la création de la vidéo demo:\n{error_msg}")
+        self.status_text.set("Erreur lors de la création de la vidéo demo")
+    
+    def preview_complete(self, image_rgb, duree):
+        """Appelé quand la planche d'aperçu est prête"""
+        self.terminer_travail()
+        self.progress.set(0)
+        self.afficher_apercu(image_rgb)
+        self.status_text.set(f"Aperçu rendu en {duree:.1f}s (pixels de {self.pixel_size.get()})")
+    
+    def processing_complete(self, resultat):
+        """Appelé quand le traitement est terminé avec succès"""
+        self.terminer_travail()
         self.progress.set(100)
         self.status_text.set(f"Traitement terminé! Vidéo sauvegardée: {resultat}")
         
         messagebox.showinfo("Succès", f"Vidéo mosaïque créée avec succès!\n\nSauvegardée dans:\n{resultat}")
     
+    def processing_cancelled(self):
+        """Appelé quand le traitement a été annulé"""
+        self.terminer_travail()
+        self.status_text.set("Traitement annulé")
+    
     def processing_error(self, error_msg):
         """Appelé quand le traitement échoue"""
-        self.processing = False
-        self.process_button.config(state='normal', text="🚀 Démarrer le traitement")
-        self.demo_button.config(state='normal')
+        self.terminer_travail()
         self.status_text.set(f"Erreur: {error_msg}")
         
         messagebox.showerror("Erreur", f"Erreur lors du traitement:\n{error_msg}")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Pipeline Vidéo - Art Informatique
+Décodage, rendu et encodage des frames en parallèle, reliés par des files bornées
+"""
+
+import queue
+import threading
+import time
+
+
+class StatistiquesEtape:
+    """Compteurs d'une étape du pipeline: éléments traités, temps de travail et d'attente, profondeur de file"""
+
+    def __init__(self, nom):
+        self.nom = nom
+        self.elements = 0
+        self.temps_actif = 0.0
+        self.temps_attente = 0.0
+        self.profondeur_totale = 0
+        self.profondeur_max = 0
+        self.mesures_profondeur = 0
+        self.debut = None
+        self.fin = None
+
+    def mesurer_file(self, file):
+        profondeur = file.qsize()
+        self.profondeur_totale += profondeur
+        self.profondeur_max = max(self.profondeur_max, profondeur)
+        self.mesures_profondeur += 1
+
+    def resume(self):
+        """Statistiques de l'étape sous forme de dictionnaire"""
+        duree = (self.fin or time.perf_counter()) - self.debut if self.debut else 0.0
+        return {
+            'elements': self.elements,
+            'temps_actif': self.temps_actif,
+            'temps_attente': self.temps_attente,
+            'debit': self.elements / duree if duree > 0 else 0.0,
+            'occupation': self.temps_actif / duree if duree > 0 else 0.0,
+            'profondeur_file_moyenne': self.profondeur_totale / self.mesures_profondeur if self.mesures_profondeur else 0.0,
+            'profondeur_file_max': self.profondeur_max,
+        }
+
+
+class PipelineVideo:
+    """Trois étapes dans des threads: décodage -> rendu -> encodage, avec des files bornées entre elles
+
+    La mémoire reste plafonnée à taille_file frames par file, et le décodage comme l'encodage
+    se font pendant que le rendu travaille.
+    """
+
+    FIN = object()
+
+    def __init__(self, taille_file=8):
+        self.file_decodee = queue.Queue(maxsize=taille_file)
+        self.file_rendue = queue.Queue(maxsize=taille_file)
+        self.arret = threading.Event()
+        self.erreur = None
+        self.stats = {nom: StatistiquesEtape(nom) for nom in ('decodage', 'rendu', 'encodage')}
+
+    def _deposer(self, file, element, stats):
+        """Dépose dans une file bornée, abandonne si le pipeline s'arrête"""
+        debut = time.perf_counter()
+        while not self.arret.is_set():
+            try:
+                file.put(element, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.temps_attente += time.perf_counter() - debut
+        return not self.arret.is_set()
+
+    def _prendre(self, file, stats):
+        """Prend dans une file, renvoie FIN si le pipeline s'arrête"""
+        debut = time.perf_counter()
+        stats.mesurer_file(file)
+        element = self.FIN
+        while not self.arret.is_set():
+            try:
+                element = file.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stats.temps_attente += time.perf_counter() - debut
+        return element
+
+    def _echouer(self, erreur):
+        if self.erreur is None:
+            self.erreur = erreur
+        self.arret.set()
+
+    def _decoder(self, source):
+        stats = self.stats['decodage']
+        stats.debut = time.perf_counter()
+        try:
+            iterateur = iter(source)
+            while not self.arret.is_set():
+                debut = time.perf_counter()
+                element = next(iterateur, self.FIN)
+                stats.temps_actif += time.perf_counter() - debut
+                if element is self.FIN:
+                    break
+                stats.elements += 1
+                if not self._deposer(self.file_decodee, element, stats):
+                    break
+        except Exception as e:
+            self._echouer(e)
+        finally:
+            stats.fin = time.perf_counter()
+            self._deposer(self.file_decodee, self.FIN, stats)
+
+    def _encoder(self, ecrire):
+        stats = self.stats['encodage']
+        stats.debut = time.perf_counter()
+        try:
+            while True:
+                element = self._prendre(self.file_rendue, stats)
+                if element is self.FIN:
+                    break
+                debut = time.perf_counter()
+                ecrire(element)
+                stats.temps_actif += time.perf_counter() - debut
+                stats.elements += 1
+        except Exception as e:
+            self._echouer(e)
+        finally:
+            stats.fin = time.perf_counter()
+
+    def executer(self, source, rendre, ecrire, terminer=None):
+        """Fait passer les frames de source dans le pipeline
+
+        source: itérable des frames à rendre (parcouru dans le thread de décodage)
+        rendre(frame): liste des frames rendues prêtes à écrire
+        terminer(): frames rendues restantes une fois la source épuisée
+        ecrire(frame): écrit une frame rendue (appelé dans le thread d'encodage)
+        """
+        decodeur = threading.Thread(target=self._decoder, args=(source,), daemon=True)
+        encodeur = threading.Thread(target=self._encoder, args=(ecrire,), daemon=True)
+        decodeur.start()
+        encodeur.start()
+
+        stats = self.stats['rendu']
+        stats.debut = time.perf_counter()
+        try:
+            while True:
+                element = self._prendre(self.file_decodee, stats)
+                if element is self.FIN:
+                    break
+                debut = time.perf_counter()
+                pretes = rendre(element)
+                stats.temps_actif += time.perf_counter() - debut
+                stats.elements += 1
+                for frame in pretes:
+                    self._deposer(self.file_rendue, frame, stats)
+
+            if terminer and not self.arret.is_set():
+                debut = time.perf_counter()
+                pretes = terminer()
+                stats.temps_actif += time.perf_counter() - debut
+                for frame in pretes:
+                    self._deposer(self.file_rendue, frame, stats)
+        except BaseException as e:
+            self._echouer(e)
+        finally:
+            stats.fin = time.perf_counter()
+            self._deposer(self.file_rendue, self.FIN, stats)
+            decodeur.join()
+            encodeur.join()
+
+        if self.erreur is not None:
+            raise self.erreur
+        return self.statistiques()
+
+    def statistiques(self):
+        """Débit, occupation et profondeur de file de chaque étape"""
+        return {nom: etape.resume() for nom, etape in self.stats.items()}
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Rendu en Direct - Art Informatique
+Mosaïque en temps réel depuis une caméra ou un flux de frames brutes, avec un budget de latence
+"""
+
+import time
+import threading
+from collections import Counter
+import cv2
+import numpy as np
+
+from tampons_frames import PoolTampons
+
+
+class SourceDirecte:
+    """Lit les frames dans un thread et ne garde que la plus récente
+
+    Quand le rendu prend du retard, les frames intermédiaires sont sautées (et comptées) au lieu
+    d'attendre dans une file: la latence ne s'accumule pas.
+    """
+
+    def __init__(self, lire, liberer=None):
+        self.lire = lire
+        self.liberer = liberer
+        self.condition = threading.Condition()
+        self.derniere = None
+        self.finie = False
+        self.lues = 0
+        self.sautees = 0
+        self.thread = threading.Thread(target=self.boucle, daemon=True)
+        self.thread.start()
+
+    def boucle(self):
+        try:
+            while not self.finie:
+                frame = self.lire()
+                if frame is None:
+                    break
+                instant = time.perf_counter()
+                with self.condition:
+                    if self.derniere is not None:
+                        self.sautees += 1
+                    self.derniere = (frame, instant)
+                    self.lues += 1
+                    self.condition.notify()
+        finally:
+            with self.condition:
+                self.finie = True
+                self.condition.notify_all()
+
+    def suivante(self):
+        """Renvoie (frame, instant de lecture) pour la frame la plus récente, None à la fin du flux"""
+        with self.condition:
+            while self.derniere is None and not self.finie:
+                self.condition.wait()
+            element, self.derniere = self.derniere, None
+            return element
+
+    def fermer(self):
+        with self.condition:
+            self.finie = True
+        # Une lecture bloquée sur un tube ne peut pas être interrompue: le thread est un démon
+        self.thread.join(timeout=1.0)
+        if self.liberer:
+            self.liberer()
+
+
+def source_camera(source, largeur=None, hauteur=None):
+    """Source lue par OpenCV: indice de caméra, ou adresse d'un flux (rtsp://, http://...)"""
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Impossible d'ouvrir la source: {source}")
+    if largeur and hauteur:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, largeur)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, hauteur)
+
+    def lire():
+        ret, frame = cap.read()
+        return frame if ret else None
+    return SourceDirecte(lire, cap.release)
+
+
+def source_brute(flux, largeur, hauteur):
+    """Frames BGR brutes de largeur x hauteur lues sur un flux binaire (ex: sys.stdin.buffer)"""
+    taille = largeur * hauteur * 3
+
+    def lire():
+        donnees = flux.read(taille)
+        if len(donnees) < taille:
+            return None
+        return np.frombuffer(donnees, dtype=np.uint8).reshape(hauteur, largeur, 3)
+    return SourceDirecte(lire)
+
+
+class SortieFenetre:
+    """Affiche les frames dans une fenêtre OpenCV; 'q' ou Échap arrête le rendu
+
+    Les autres sorties (flux brut ou y4m, fichiers) sont celles de sorties_video.
+    """
+
+    def __init__(self, titre="Mosaïque en direct"):
+        self.titre = titre
+        self.liberer = None
+
+    def ecrire(self, frame):
+        cv2.imshow(self.titre, frame)
+        if self.liberer:
+            self.liberer(frame)
+        return cv2.waitKey(1) & 0xFF not in (ord('q'), 27)
+
+    def fermer(self):
+        cv2.destroyAllWindows()
+
+
+class RegulateurLatence:
+    """Choisit la taille des tuiles pour tenir le budget de latence par frame
+
+    La latence (lecture -> frame émise) est lissée: au-dessus du budget, les tuiles grossissent
+    (moins de blocs à chercher et à coller), bien en dessous elles redescendent vers la taille
+    demandée. Quelques frames doivent passer entre deux changements pour éviter d'osciller.
+    """
+
+    def __init__(self, budget, taille_min, taille_max, facteur=1.25, marge=0.6, delai=10, lissage=0.2):
+        self.budget = budget
+        self.marge = marge
+        self.delai = delai
+        self.lissage = lissage
+
+        self.tailles = []
+        taille = taille_min
+        while taille < taille_max:
+            self.tailles.append(taille)
+            taille = max(taille + 1, int(round(taille * facteur)))
+        self.tailles.append(max(taille_min, taille_max))
+
+        self.position = 0
+        self.moyenne = None
+        self.frames_depuis_changement = 0
+
+    @property
+    def taille(self):
+        return self.tailles[self.position]
+
+    def observer(self, latence):
+        """Note la latence d'une frame et ajuste la taille des tuiles si besoin"""
+        if self.moyenne is None:
+            self.moyenne = latence
+        else:
+            self.moyenne += self.lissage * (latence - self.moyenne)
+        self.frames_depuis_changement += 1
+        if self.frames_depuis_changement < self.delai:
+            return
+
+        if self.moyenne > self.budget and self.position < len(self.tailles) - 1:
+            self.position += 1
+        elif self.moyenne < self.marge * self.budget and self.position > 0:
+            self.position -= 1
+        else:
+            return
+        self.moyenne = None
+        self.frames_depuis_changement = 0
+
+
+class RenduDirect:
+    """Rend en continu les frames d'une source vers une sortie en tenant un budget de latence"""
+
+    def __init__(self, mosaic, source, sortie, taille_pixel=20, budget_latence=0.1, taille_max=None,
+                 annulation=None, intervalle_rapport=5.0):
+        self.mosaic = mosaic
+        self.source = source
+        self.sortie = sortie
+        self.regulateur = RegulateurLatence(budget_latence, taille_pixel, taille_max or 4 * taille_pixel)
+        self.annulation = annulation
+        self.intervalle_rapport = intervalle_rapport
+        self.latences = []
+        self.tailles_utilisees = Counter()
+        self.duree = 0.0
+        # Frames mosaïques réutilisées une fois affichées ou écrites par la sortie
+        self.tampons = None
+
+    def executer(self):
+        """Rend jusqu'à la fin de la source, une annulation, Ctrl+C ou la fermeture de la sortie"""
+        mosaic = self.mosaic
+        mosaic.reinitialiser_incremental()
+        mosaic.suivi.commencer()
+        debut = None
+        dernier_rapport = time.perf_counter()
+        try:
+            while not (self.annulation and self.annulation.is_set()):
+                element = self.source.suivante()
+                if element is None:
+                    break
+                frame, instant = element
+
+                premiere = debut is None
+                if premiere:
+                    # Tous les atlas sont construits d'avance: changer de taille ne bloque pas le rendu
+                    hauteur, largeur = frame.shape[:2]
+                    self.tampons = PoolTampons((hauteur, largeur, 3))
+                    self.sortie.liberer = self.tampons.rendre
+                    mosaic.preparer_atlas([t for taille in self.regulateur.tailles
+                                           for t in mosaic.tailles_rendu(hauteur, largeur, taille)])
+                    mosaic.afficher(f"📡 Rendu en direct {largeur}x{hauteur}, budget {self.regulateur.budget*1000:.0f}ms, "
+                                    f"tuiles de {self.regulateur.tailles[0]} à {self.regulateur.tailles[-1]}px")
+                    debut = time.perf_counter()
+
+                taille = self.regulateur.taille
+                if not self.sortie.ecrire(mosaic.rendre_frame(frame, taille, self.tampons.prendre())):
+                    break
+                self.tailles_utilisees[taille] += 1
+                # La latence de la première frame compte la préparation des atlas: ni mesurée, ni régulée
+                if premiere:
+                    continue
+                latence = time.perf_counter() - instant
+                self.latences.append(latence)
+                self.regulateur.observer(latence)
+
+                maintenant = time.perf_counter()
+                if maintenant - dernier_rapport >= self.intervalle_rapport:
+                    dernier_rapport = maintenant
+                    recentes = np.array(self.latences[-100:]) * 1000
+                    mosaic.afficher(f"   {sum(self.tailles_utilisees.values()) / (maintenant - debut):.1f} frames/s, "
+                                    f"latence p50 {np.percentile(recentes, 50):.0f}ms "
+                                    f"p90 {np.percentile(recentes, 90):.0f}ms, tuiles {taille}px, "
+                                    f"{self.source.sautees} frames sautées")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.source.fermer()
+            self.sortie.fermer()
+
+        self.duree = time.perf_counter() - debut if debut is not None else 0.0
+        rapport = self.rapport()
+        mosaic.afficher(f"✅ {rapport['frames']} frames en {rapport['duree']:.1f}s: {rapport['fps']:.1f} frames/s, "
+                        f"{rapport['sautees']} sautées")
+        if self.latences:
+            latence = rapport['latence_ms']
+            mosaic.afficher(f"   ⏱️  latence p50 {latence['p50']:.0f}ms, p90 {latence['p90']:.0f}ms, "
+                            f"p99 {latence['p99']:.0f}ms, max {latence['max']:.0f}ms")
+            mosaic.afficher("   🧱 tuiles: " + ", ".join(f"{t}px x{n}" for t, n in sorted(rapport['tailles'].items())))
+        return rapport
+
+    def rapport(self):
+        """Frames rendues, sautées, débit, percentiles de latence (ms) et tailles de tuiles utilisées"""
+        latences = np.array(self.latences) * 1000 if self.latences else np.zeros(1)
+        frames = sum(self.tailles_utilisees.values())
+        return {
+            'frames': frames,
+            'sautees': self.source.sautees,
+            'duree': self.duree,
+            'fps': frames / self.duree if self.duree > 0 else 0.0,
+            'latence_ms': {'p50': float(np.percentile(latences, 50)), 'p90': float(np.percentile(latences, 90)),
+                           'p99': float(np.percentile(latences, 99)), 'max': float(latences.max())},
+            'tailles': dict(self.tailles_utilisees),
+        }
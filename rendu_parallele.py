@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Rendu Parallèle - Art Informatique
+Rendu des frames de la mosaïque sur plusieurs processus, écrites dans l'ordre
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+# Mosaïque du processus de rendu, construite une fois par l'initialiseur
+_mosaique = None
+_segments = None
+# Frame mosaïque du processus, réutilisée: le résultat est copié vers le processus principal avant la tâche suivante
+_tampons_sortie = {}
+
+
+class MemoirePartagee:
+    """Tableaux numpy copiés une fois en mémoire partagée, relus sans copie par les autres processus
+
+    Les tableaux déjà projetés depuis un fichier (np.memmap) ne sont pas copiés: les autres
+    processus projettent le même fichier.
+    """
+
+    def __init__(self, tableaux):
+        self.segments = []
+        self.descriptions = {}
+        try:
+            for nom, tableau in tableaux.items():
+                if isinstance(tableau, np.memmap) and tableau.filename:
+                    # Déjà dans un fichier projeté: les autres processus l'ouvrent directement
+                    self.descriptions[nom] = ('fichier', tableau.filename, tableau.shape, tableau.dtype.str, tableau.offset)
+                    continue
+                tableau = np.ascontiguousarray(tableau)
+                segment = shared_memory.SharedMemory(create=True, size=max(1, tableau.nbytes))
+                self.segments.append(segment)
+                np.ndarray(tableau.shape, tableau.dtype, buffer=segment.buf)[...] = tableau
+                self.descriptions[nom] = ('memoire', segment.name, tableau.shape, tableau.dtype.str, 0)
+        except Exception:
+            self.fermer()
+            raise
+
+    @staticmethod
+    def ouvrir(descriptions):
+        """Rattache les tableaux décrits, renvoie (segments à garder ouverts, tableaux)"""
+        segments = []
+        tableaux = {}
+        for nom, (genre, source, forme, type_donnees, decalage) in descriptions.items():
+            if genre == 'fichier':
+                tableaux[nom] = np.memmap(source, np.dtype(type_donnees), mode='r', offset=decalage, shape=forme)
+                continue
+            segment = shared_memory.SharedMemory(name=source)
+            segments.append(segment)
+            tableau = np.ndarray(forme, np.dtype(type_donnees), buffer=segment.buf)
+            tableau.flags.writeable = False
+            tableaux[nom] = tableau
+        return segments, tableaux
+
+    def fermer(self):
+        """Libère les segments de mémoire partagée"""
+        for segment in self.segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments = []
+
+
+def initialiser_processus(descriptions, options=None):
+    """Construit la mosaïque du processus de rendu à partir de l'état partagé (options: voir VideoMosaic.options_rendu)"""
+    global _mosaique, _segments
+    from video_mosaic import VideoMosaic
+
+    _segments, etat = MemoirePartagee.ouvrir(descriptions)
+    _mosaique = VideoMosaic(charger=False, silencieux=True, **(options or {}))
+    _mosaique.charger_etat_rendu(etat)
+
+
+def mosaique_processus():
+    """Mosaïque du processus de rendu courant"""
+    return _mosaique
+
+
+def _rendre_frame(frame, taille_pixel, avec_grille=False):
+    tampon = _tampons_sortie.get(frame.shape)
+    if tampon is None:
+        tampon = _tampons_sortie[frame.shape] = np.empty(frame.shape, dtype=np.uint8)
+    resultat = _mosaique.rendre_frame(frame, taille_pixel, tampon)
+    return (resultat, _mosaique.derniere_grille) if avec_grille else resultat
+
+
+class RenduParallele:
+    """Pool de processus de rendu partageant l'atlas et l'index des couleurs, frames rendues dans l'ordre
+
+    liberer(frame), si elle est donnée, reçoit chaque frame source une fois rendue: elle n'est
+    copiée vers le processus de rendu qu'après soumettre(), elle ne peut pas être réutilisée avant.
+    Avec avec_grilles, les résultats sont des paires (frame mosaïque, grille des indices de photos).
+    """
+
+    def __init__(self, mosaic, hauteur, largeur, taille_pixel, workers, liberer=None, avec_grilles=False):
+        self.taille_pixel = taille_pixel
+        self.liberer = liberer
+        self.avec_grilles = avec_grilles
+        self.max_en_cours = 2 * workers
+        # Tampon de réordonnancement: les frames finies en avance attendent leur tour ici
+        self.en_cours = deque()
+
+        self.memoire = MemoirePartagee(mosaic.exporter_etat_rendu(hauteur, largeur, taille_pixel))
+        try:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=initialiser_processus,
+                                            initargs=(self.memoire.descriptions, mosaic.options_rendu()))
+        except Exception:
+            self.memoire.fermer()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def soumettre(self, frame):
+        """Envoie une frame au rendu et renvoie les frames mosaïques déjà prêtes, dans l'ordre"""
+        self.en_cours.append((self.pool.submit(_rendre_frame, frame, self.taille_pixel, self.avec_grilles), frame))
+
+        pretes = []
+        while self.en_cours and (len(self.en_cours) >= self.max_en_cours or self.en_cours[0][0].done()):
+            pretes.append(self.resultat(*self.en_cours.popleft()))
+        return pretes
+
+    def resultat(self, futur, frame):
+        resultat = futur.result()
+        if self.liberer:
+            self.liberer(frame)
+        return resultat
+
+    def terminer(self):
+        """Attend et renvoie, dans l'ordre, toutes les frames encore en cours de rendu"""
+        pretes = [self.resultat(futur, frame) for futur, frame in self.en_cours]
+        self.en_cours.clear()
+        return pretes
+
+    def fermer(self):
+        for futur, _ in self.en_cours:
+            futur.cancel()
+        self.en_cours.clear()
+        self.pool.shutdown(wait=True)
+        self.memoire.fermer()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Rendu par Segments - Art Informatique
+Rendu des longues vidéos par segments indépendants, reprenable après une interruption
+"""
+
+import os
+import json
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import cv2
+
+from echantillonnage_video import EchantillonneurVideo
+from pipeline_video import PipelineVideo
+from rendu_parallele import MemoirePartagee, initialiser_processus, mosaique_processus
+from tampons_frames import PoolTampons
+
+
+def _rendre_segment(chemin_video, debut, fin, rangs, fps_output, taille_pixel, fichier_partiel):
+    """Rend les frames de sortie rangs (premier, dernier exclu) de l'intervalle debut-fin dans leur propre fichier
+
+    Exécuté dans un processus de rendu. Les instants sont ceux du rendu complet: la somme des
+    frames des segments est exactement le nombre de frames du rendu sans segments.
+    """
+    mosaic = mosaique_processus()
+    cap = cv2.VideoCapture(chemin_video)
+    if not cap.isOpened():
+        raise IOError(f"Impossible d'ouvrir la vidéo: {chemin_video}")
+    largeur = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    hauteur = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    # Écriture dans un fichier temporaire: un segment interrompu n'est jamais pris pour un segment fini
+    temporaire = fichier_partiel + ".tmp.mp4"
+    out = cv2.VideoWriter(temporaire, cv2.VideoWriter_fourcc(*'mp4v'), fps_output, (largeur, hauteur))
+    if not out.isOpened():
+        cap.release()
+        raise IOError(f"Impossible d'écrire le segment: {temporaire}")
+
+    # Frames sources et mosaïques réutilisées une fois rendues ou écrites
+    tampons_entree = PoolTampons((hauteur, largeur, 3))
+    tampons_sortie = PoolTampons((hauteur, largeur, 3))
+
+    def rendre(frame):
+        resultat = mosaic.rendre_frame(frame, taille_pixel, tampons_sortie.prendre())
+        tampons_entree.rendre(frame)
+        return [resultat]
+
+    def ecrire(frame):
+        out.write(frame)
+        tampons_sortie.rendre(frame)
+
+    mosaic.reinitialiser_incremental()
+    frames = (frame for _, _, frame in EchantillonneurVideo(cap, fps_output, debut, fin, tampons_entree, rangs))
+    try:
+        stats = PipelineVideo().executer(frames, rendre, ecrire)
+    finally:
+        cap.release()
+        out.release()
+
+    os.replace(temporaire, fichier_partiel)
+    return stats['encodage']['elements']
+
+
+class RenduSegments:
+    """Découpe une vidéo en segments rendus dans des processus séparés, suivis par un manifeste
+
+    Chaque segment est écrit dans son propre fichier. Le manifeste note les segments terminés :
+    une nouvelle exécution avec les mêmes paramètres ne rend que les segments manquants, puis
+    les fichiers des segments sont mis bout à bout dans la vidéo finale.
+    """
+
+    FICHIER_MANIFESTE = "manifeste.json"
+
+    def __init__(self, mosaic, chemin_video, nom_sortie, taille_pixel=20, fps_output=10,
+                 duree_segment=60, workers=1, debut=None, fin=None, annulation=None):
+        self.mosaic = mosaic
+        self.chemin_video = chemin_video
+        self.nom_sortie = nom_sortie
+        self.taille_pixel = taille_pixel
+        self.fps_output = float(fps_output)
+        self.duree_segment = duree_segment
+        self.workers = max(1, workers)
+        self.debut = debut
+        self.fin = fin
+        self.annulation = annulation
+        self.dossier_segments = nom_sortie + ".segments"
+        self.chemin_manifeste = os.path.join(self.dossier_segments, self.FICHIER_MANIFESTE)
+
+    def parametres(self):
+        """Paramètres qui déterminent le contenu des segments: s'ils changent, tout est à refaire"""
+        infos = os.stat(self.chemin_video)
+        return {
+            'video': os.path.abspath(self.chemin_video),
+            'taille_video': infos.st_size,
+            'date_video': infos.st_mtime,
+            'taille_pixel': self.taille_pixel,
+            'fps_output': self.fps_output,
+            # Les segments sont des plages de rangs de frames de sortie, et non plus des instants
+            'version_segments': 2,
+            'duree_segment': self.duree_segment,
+            'debut': self.debut,
+            'fin': self.fin,
+            'seuil_incremental': self.mosaic.seuil_incremental,
+            'taille_min_adaptative': self.mosaic.taille_min_adaptative,
+            'seuil_variance': self.mosaic.seuil_variance,
+            'diversite': self.mosaic.diversite,
+            'rayon_diversite': self.mosaic.rayon_diversite,
+            'descripteur': self.mosaic.descripteur,
+            'effets_avant': self.mosaic.effets_avant.descriptions,
+            'effets_apres': self.mosaic.effets_apres.descriptions,
+            'niveaux_table': self.mosaic.niveaux_table,
+            'photos': self.mosaic.bibliotheque.empreinte() if self.mosaic.bibliotheque else None,
+        }
+
+    def planifier(self, hauteur, largeur, echantillonneur):
+        """Découpe l'intervalle à rendre en segments alignés sur les frames de sortie"""
+        total = echantillonneur.nombre_frames
+        if total is None:
+            raise ValueError("Durée de la vidéo inconnue: impossible de la découper en segments")
+
+        frames_par_segment = max(1, round(self.duree_segment * self.fps_output))
+        segments = []
+        for i, k in enumerate(range(0, total, frames_par_segment)):
+            k_fin = min(k + frames_par_segment, total)
+            segments.append({
+                'indice': i,
+                'rangs': [k, k_fin],
+                'frames': k_fin - k,
+                'fichier': f"segment_{i:05d}.mp4",
+                'termine': False,
+            })
+        return {'parametres': self.parametres(), 'hauteur': hauteur, 'largeur': largeur, 'total': total,
+                'segments': segments}
+
+    def lire_manifeste(self):
+        try:
+            with open(self.chemin_manifeste, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ecrire_manifeste(self, manifeste):
+        temporaire = self.chemin_manifeste + ".tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(manifeste, f, indent=1)
+        os.replace(temporaire, self.chemin_manifeste)
+
+    def preparer(self):
+        """Relit le manifeste d'une exécution précédente ou en crée un nouveau"""
+        cap = cv2.VideoCapture(self.chemin_video)
+        if not cap.isOpened():
+            raise IOError(f"Impossible d'ouvrir la vidéo: {self.chemin_video}")
+        try:
+            largeur = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            hauteur = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            echantillonneur = EchantillonneurVideo(cap, self.fps_output, self.debut, self.fin)
+            manifeste = self.lire_manifeste()
+            if manifeste is None or manifeste['parametres'] != self.parametres():
+                if manifeste is not None:
+                    self.mosaic.afficher("♻️  Paramètres modifiés depuis le dernier rendu: segments recalculés")
+                    shutil.rmtree(self.dossier_segments, ignore_errors=True)
+                manifeste = self.planifier(hauteur, largeur, echantillonneur)
+        finally:
+            cap.release()
+
+        os.makedirs(self.dossier_segments, exist_ok=True)
+        # Un segment noté terminé mais dont le fichier a disparu est à refaire
+        for segment in manifeste['segments']:
+            if segment['termine'] and not os.path.exists(os.path.join(self.dossier_segments, segment['fichier'])):
+                segment['termine'] = False
+        self.ecrire_manifeste(manifeste)
+        return manifeste
+
+    def executer(self):
+        """Rend les segments manquants puis assemble la vidéo finale (None si le rendu a été annulé)"""
+        manifeste = self.preparer()
+        segments = manifeste['segments']
+        a_rendre = [s for s in segments if not s['termine']]
+        self.mosaic.suivi.commencer(sum(s['frames'] for s in a_rendre))
+        self.mosaic.afficher(f"🧩 {len(segments)} segments de {self.duree_segment:g}s, {len(segments) - len(a_rendre)} déjà rendus")
+
+        if a_rendre:
+            etat = self.mosaic.exporter_etat_rendu(manifeste['hauteur'], manifeste['largeur'], self.taille_pixel)
+            memoire = MemoirePartagee(etat)
+            try:
+                workers = min(self.workers, len(a_rendre))
+                with ProcessPoolExecutor(max_workers=workers, initializer=initialiser_processus,
+                                         initargs=(memoire.descriptions, self.mosaic.options_rendu())) as pool:
+                    # Un segment n'est soumis que lorsqu'un processus se libère: une annulation laisse
+                    # finir les segments en cours, les autres restent à rendre à la reprise
+                    restants = iter(a_rendre)
+                    futurs = {}
+
+                    def lancer():
+                        s = next(restants, None)
+                        if s is not None and not (self.annulation and self.annulation.is_set()):
+                            futurs[pool.submit(_rendre_segment, self.chemin_video, self.debut, self.fin, s['rangs'],
+                                               self.fps_output, self.taille_pixel,
+                                               os.path.join(self.dossier_segments, s['fichier']))] = s
+
+                    for _ in range(workers):
+                        lancer()
+                    while futurs:
+                        faits_maintenant, _ = wait(futurs, return_when=FIRST_COMPLETED)
+                        for futur in faits_maintenant:
+                            segment = futurs.pop(futur)
+                            segment['frames'] = futur.result()
+                            segment['termine'] = True
+                            self.ecrire_manifeste(manifeste)
+                            faits = sum(s['termine'] for s in segments)
+                            self.mosaic.afficher(f"   Segment {segment['indice'] + 1}/{len(segments)} terminé ({faits}/{len(segments)})")
+                            self.mosaic.suivi.frames_terminees(segment['frames'])
+                            lancer()
+            finally:
+                memoire.fermer()
+
+        if not all(s['termine'] for s in segments):
+            self.mosaic.suivi.terminer()
+            print(f"⏹️  Traitement annulé: {sum(s['termine'] for s in segments)}/{len(segments)} segments rendus, "
+                  f"reprise possible")
+            return None
+
+        # Une vidéo plus courte que sa durée annoncée donne des segments incomplets
+        rendues = sum(s['frames'] for s in segments)
+        if rendues != manifeste['total']:
+            print(f"⚠️  {rendues} frames rendues pour {manifeste['total']} attendues")
+
+        with self.mosaic.suivi.mesurer('concatenation'):
+            self.concatener(manifeste)
+        self.mosaic.suivi.terminer()
+        self.mosaic.afficher(f"✅ Vidéo traitée! {sum(s['frames'] for s in segments)} frames créées")
+        return self.nom_sortie
+
+    def concatener(self, manifeste):
+        """Met bout à bout les fichiers des segments (ffmpeg sans réencodage s'il est installé)"""
+        fichiers = [os.path.join(self.dossier_segments, s['fichier']) for s in manifeste['segments']]
+
+        if shutil.which('ffmpeg'):
+            liste = os.path.join(self.dossier_segments, "concat.txt")
+            with open(liste, 'w', encoding='utf-8') as f:
+                for fichier in fichiers:
+                    f.write(f"file '{os.path.abspath(fichier)}'\n")
+            commande = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', liste, '-c', 'copy', self.nom_sortie]
+            if subprocess.run(commande).returncode == 0:
+                return
+            print("⚠️  Échec de ffmpeg, assemblage des segments avec OpenCV")
+
+        out = cv2.VideoWriter(self.nom_sortie, cv2.VideoWriter_fourcc(*'mp4v'), self.fps_output,
+                              (manifeste['largeur'], manifeste['hauteur']))
+        if not out.isOpened():
+            raise IOError(f"Impossible de créer la vidéo: {self.nom_sortie}")
+        try:
+            for fichier in fichiers:
+                cap = cv2.VideoCapture(fichier)
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    out.write(frame)
+                cap.release()
+        finally:
+            out.release()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Rendu de Variantes - Art Informatique
+Plusieurs rendus d'une même vidéo (tailles de pixels et cadences différentes) en un seul décodage
+"""
+
+import numpy as np
+import cv2
+
+from echantillonnage_video import EchantillonneurMultiple
+from pipeline_video import PipelineVideo
+from tampons_frames import PoolTampons
+
+
+class RenduVariantes:
+    """Rend une vidéo en plusieurs variantes (taille_pixel, fps) en la décodant une seule fois
+
+    Chaque frame source est décodée et passée par les effets d'entrée une fois pour toutes les
+    variantes qui la retiennent. Les descripteurs des blocs sont calculés en une seule analyse
+    pour toutes les tailles (voir VideoMosaic.calculer_descripteurs_tailles), puis chaque
+    variante fait sa recherche, son assemblage et ses effets de sortie, et écrit dans sa propre
+    sortie. Les frames produites sont les mêmes que celles de rendus séparés.
+    """
+
+    def __init__(self, mosaic, chemin_video, variantes, sorties, debut=None, fin=None, annulation=None):
+        self.mosaic = mosaic
+        self.chemin_video = chemin_video
+        self.variantes = [(int(taille), float(fps)) for taille, fps in variantes]
+        self.sorties = sorties
+        self.debut = debut
+        self.fin = fin
+        self.annulation = annulation
+        # État du mode incrémental de chaque variante, échangé avec celui de la mosaïque
+        self.etats = [None] * len(self.variantes)
+        self.fermees = [False] * len(self.variantes)
+        self.tampons_entree = None
+        self.tampons_sortie = None
+
+    def rendre(self, element):
+        """Rend une frame source pour les variantes qui la retiennent: liste de (variante, mosaïque)"""
+        mosaic = self.mosaic
+        _, frame, repetitions = element
+        actives = [i for i, nombre in enumerate(repetitions) if nombre and not self.fermees[i]]
+
+        source = mosaic.effets_entree(frame)
+
+        # Les tuiles adaptatives font leur propre découpage: pas de descripteurs communs
+        descripteurs = {}
+        if not mosaic.taille_min_adaptative and mosaic.index_couleurs is not None:
+            with mosaic.suivi.mesurer('analyse'):
+                descripteurs = mosaic.calculer_descripteurs_tailles(source, {self.variantes[i][0] for i in actives})
+
+        rendues = []
+        for i in actives:
+            taille_pixel = self.variantes[i][0]
+            mosaic.etat_incremental = self.etats[i]
+            resultat = self.tampons_sortie.prendre()
+            mosaique = mosaic.mosaique_frame(source, taille_pixel, mosaic.tampon_mosaique(resultat.shape, resultat),
+                                             descripteurs.get(taille_pixel))
+            self.etats[i] = mosaic.etat_incremental
+            resultat = mosaic.effets_sortie(mosaique, resultat)
+            rendues.append((i, resultat))
+            # Frame répétée (cadence de sortie supérieure à la source): chaque écriture a son tampon
+            for _ in range(repetitions[i] - 1):
+                copie = self.tampons_sortie.prendre()
+                np.copyto(copie, resultat)
+                rendues.append((i, copie))
+
+        self.tampons_entree.rendre(frame)
+        return rendues
+
+    def executer(self):
+        """Rend toutes les variantes; renvoie les résultats des sorties (None si annulé ou illisible)"""
+        mosaic = self.mosaic
+        cap = cv2.VideoCapture(self.chemin_video)
+        if not cap.isOpened():
+            print(f"❌ Impossible d'ouvrir la vidéo: {self.chemin_video}")
+            return None
+
+        largeur = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        hauteur = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.tampons_entree = PoolTampons((hauteur, largeur, 3))
+        self.tampons_sortie = PoolTampons((hauteur, largeur, 3))
+        echantillonneur = EchantillonneurMultiple(cap, [fps for _, fps in self.variantes], self.debut, self.fin,
+                                                  self.tampons_entree)
+        nombres = echantillonneur.nombres_frames
+        total = None if None in nombres else sum(nombres)
+
+        for (taille_pixel, fps), sortie, nombre in zip(self.variantes, self.sorties, nombres):
+            sortie.preparer(largeur, hauteur, fps)
+            sortie.liberer = self.tampons_sortie.rendre
+            mosaic.afficher(f"   🎞️  {taille_pixel}px à {fps:g} FPS" + (f": {nombre} frames" if nombre is not None else ""))
+        # Les atlas de toutes les variantes sont préparés avant le rendu
+        mosaic.preparer_atlas([t for taille_pixel, _ in self.variantes
+                               for t in mosaic.tailles_rendu(hauteur, largeur, taille_pixel)])
+
+        suivi = mosaic.suivi
+
+        def frames_a_traiter():
+            frames = iter(echantillonneur)
+            while not (self.annulation and self.annulation.is_set()) and not all(self.fermees):
+                with suivi.mesurer('decodage'):
+                    element = next(frames, None)
+                if element is None:
+                    return
+                yield element
+
+        def ecrire(element):
+            i, frame_mosaique = element
+            suivi.frames_terminees(frame=frame_mosaique)
+            with suivi.mesurer('encodage'):
+                if not self.fermees[i] and not self.sorties[i].ecrire(frame_mosaique):
+                    self.fermees[i] = True
+
+        suivi.commencer(total)
+        try:
+            stats = PipelineVideo().executer(frames_a_traiter(), self.rendre, ecrire)
+        except BaseException:
+            for sortie in self.sorties:
+                sortie.abandonner()
+            raise
+        finally:
+            cap.release()
+            mosaic.reinitialiser_incremental()
+
+        mosaic.statistiques_pipeline = stats
+        frames_traitees = stats['encodage']['elements']
+        if self.annulation and self.annulation.is_set():
+            for sortie in self.sorties:
+                sortie.abandonner()
+            suivi.terminer()
+            print(f"⏹️  Traitement annulé après {frames_traitees} frames")
+            return None
+        resultats = []
+        with suivi.mesurer('encodage'):
+            for sortie in self.sorties:
+                resultats.append(sortie.fermer())
+        suivi.terminer()
+        mosaic.afficher(f"✅ {len(self.variantes)} variantes traitées en un décodage: {frames_traitees} frames "
+                        f"à partir de {stats['decodage']['elements']} frames décodées")
+        return resultats
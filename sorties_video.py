@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Sorties Vidéo - Art Informatique
+Destinations des frames rendues (vidéo mp4, suite d'images, flux brut ou y4m, mémoire), écrites en arrière-plan
+"""
+
+import os
+import sys
+import queue
+import threading
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+
+class Sortie:
+    """Destination des frames rendues: redéfinir ouvrir_destination(), ecrire_frame() et terminer()
+
+    ecrire() dépose la frame dans une file bornée et rend la main tout de suite: un thread
+    d'écriture la passe à ecrire_frame(). Le rendu n'attend que si la file est pleine. Les
+    erreurs d'écriture ressortent à l'appel suivant d'ecrire() ou à fermer(). Une sortie fermée
+    par le lecteur (tube cassé) ne lève pas d'erreur: ecrire() renvoie False.
+
+    liberer(frame), si elle est fixée, est appelée quand une frame a été écrite et peut être
+    réutilisée (voir tampons_frames.PoolTampons.rendre).
+    """
+
+    # Les sorties trop rapides pour valoir un thread écrivent directement
+    asynchrone = True
+    # Les sorties qui finissent d'écrire ailleurs (ou gardent les frames) libèrent elles-mêmes
+    liberation_differee = False
+    FIN = object()
+
+    def __init__(self, fps=None, taille_file=8):
+        self.fps = fps
+        self.taille = None
+        self.frames_ecrites = 0
+        self.taille_file = taille_file
+        self.file = None
+        self.thread = None
+        self.erreur = None
+        self.fermee_par_lecteur = False
+        self.liberer = None
+
+    def preparer(self, largeur, hauteur, fps=None):
+        """Fixe la taille et la cadence des frames (sinon: taille de la première frame, cadence par défaut)"""
+        if self.taille is not None:
+            return
+        self.taille = (largeur, hauteur)
+        self.fps = self.fps or fps or 30
+        self.ouvrir_destination()
+        if self.asynchrone:
+            self.file = queue.Queue(maxsize=self.taille_file)
+            self.thread = threading.Thread(target=self.boucle, daemon=True)
+            self.thread.start()
+
+    def ecrire(self, frame):
+        """Ajoute une frame, renvoie False si la destination ne reçoit plus rien"""
+        if self.taille is None:
+            self.preparer(frame.shape[1], frame.shape[0])
+        self.verifier()
+        if self.fermee_par_lecteur:
+            return False
+        if self.file is None:
+            self.ecrire_protege(frame)
+        else:
+            self.file.put(frame)
+        return not self.fermee_par_lecteur
+
+    def boucle(self):
+        while True:
+            frame = self.file.get()
+            if frame is self.FIN:
+                return
+            # Après une erreur, la file est vidée sans écrire pour ne pas bloquer le rendu
+            if self.erreur is None and not self.fermee_par_lecteur:
+                try:
+                    self.ecrire_protege(frame)
+                except Exception as e:
+                    self.erreur = e
+
+    def ecrire_protege(self, frame):
+        try:
+            self.ecrire_frame(frame)
+            self.frames_ecrites += 1
+            if self.liberer and not self.liberation_differee:
+                self.liberer(frame)
+        except BrokenPipeError:
+            self.fermee_par_lecteur = True
+
+    def verifier(self):
+        if self.erreur is not None:
+            erreur, self.erreur = self.erreur, None
+            raise erreur
+
+    def attendre(self):
+        if self.thread is not None:
+            self.file.put(self.FIN)
+            self.thread.join()
+            self.thread = None
+
+    def fermer(self):
+        """Attend la fin des écritures et renvoie le résultat (chemin, tableau...)"""
+        self.attendre()
+        try:
+            self.verifier()
+        finally:
+            resultat = self.terminer() if self.taille is not None else None
+        return resultat
+
+    def abandonner(self):
+        """Arrête l'écriture et supprime ce qui a été écrit (traitement annulé)"""
+        self.attendre()
+        self.erreur = None
+        if self.taille is not None:
+            self.terminer()
+        self.supprimer()
+
+    def ouvrir_destination(self):
+        pass
+
+    def ecrire_frame(self, frame):
+        raise NotImplementedError
+
+    def terminer(self):
+        pass
+
+    def supprimer(self):
+        pass
+
+
+class SortieMP4(Sortie):
+    """Vidéo écrite par OpenCV (mp4v par défaut)"""
+
+    def __init__(self, chemin, fps=None, codec='mp4v', taille_file=8):
+        super().__init__(fps, taille_file)
+        self.chemin = chemin
+        self.codec = codec
+        self.writer = None
+
+    def ouvrir_destination(self):
+        dossier = os.path.dirname(self.chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.writer = cv2.VideoWriter(self.chemin, cv2.VideoWriter_fourcc(*self.codec), self.fps, self.taille)
+        if not self.writer.isOpened():
+            raise IOError(f"Impossible de créer la vidéo: {self.chemin}")
+
+    def ecrire_frame(self, frame):
+        self.writer.write(frame)
+
+    def terminer(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+        return self.chemin
+
+    def supprimer(self):
+        if os.path.exists(self.chemin):
+            os.remove(self.chemin)
+
+
+class SortieImages(Sortie):
+    """Suite d'images numérotées (PNG ou JPEG) compressées sur plusieurs threads
+
+    Les images peuvent ensuite être encodées en parallèle par un outil externe, par exemple
+    ffmpeg -framerate 10 -i dossier/frame_%06d.png.
+    """
+
+    liberation_differee = True
+
+    def __init__(self, dossier, format='png', workers=None, qualite=95, prefixe="frame_", fps=None, taille_file=8):
+        super().__init__(fps, taille_file)
+        self.dossier = dossier
+        self.format = format.lower().lstrip('.')
+        if self.format == 'jpeg':
+            self.format = 'jpg'
+        if self.format not in ('png', 'jpg'):
+            raise ValueError(f"Format d'image inconnu: {format} (choix: png, jpg)")
+        self.workers = workers or os.cpu_count() or 1
+        self.parametres = [cv2.IMWRITE_JPEG_QUALITY, qualite] if self.format == 'jpg' else []
+        self.prefixe = prefixe
+        self.pool = None
+        self.en_cours = []
+        self.ecrites = []
+
+    def ouvrir_destination(self):
+        os.makedirs(self.dossier, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def chemin(self, numero):
+        return os.path.join(self.dossier, f"{self.prefixe}{numero:06d}.{self.format}")
+
+    def ecrire_image(self, chemin, frame):
+        if not cv2.imwrite(chemin, frame, self.parametres):
+            raise IOError(f"Impossible d'écrire l'image: {chemin}")
+        if self.liberer:
+            self.liberer(frame)
+
+    def ecrire_frame(self, frame):
+        # cv2.imwrite libère le GIL: les compressions se font vraiment en parallèle
+        chemin = self.chemin(len(self.ecrites) + 1)
+        self.ecrites.append(chemin)
+        self.en_cours.append(self.pool.submit(self.ecrire_image, chemin, frame))
+        if len(self.en_cours) >= 2 * self.workers:
+            self.en_cours.pop(0).result()
+
+    def terminer(self):
+        if self.pool is not None:
+            try:
+                for futur in self.en_cours:
+                    futur.result()
+            finally:
+                self.en_cours = []
+                self.pool.shutdown(wait=True)
+                self.pool = None
+        return self.dossier
+
+    def supprimer(self):
+        for chemin in self.ecrites:
+            if os.path.exists(chemin):
+                os.remove(chemin)
+
+
+class SortieFlux(Sortie):
+    """Frames brutes (BGR 8 bits) ou YUV4MPEG2 (y4m, 4:2:0) vers un fichier, un tube ou la sortie standard
+
+    destination: chemin, '-' pour la sortie standard (prise à la création de la sortie), ou flux
+    binaire déjà ouvert. Le y4m porte sa taille et sa cadence: ffplay ou ffmpeg le lisent sans
+    autre option.
+    """
+
+    def __init__(self, destination, format='raw', fps=None, taille_file=8):
+        super().__init__(fps, taille_file)
+        if format not in ('raw', 'y4m'):
+            raise ValueError(f"Format de flux inconnu: {format} (choix: raw, y4m)")
+        self.nom = destination if isinstance(destination, str) else getattr(destination, 'name', None)
+        self.destination = sys.stdout.buffer if destination == '-' else destination
+        self.format = format
+        self.flux = None
+        self.a_fermer = False
+        self.yuv = None
+
+    def ouvrir_destination(self):
+        largeur, hauteur = self.taille
+        if self.format == 'y4m' and (largeur % 2 or hauteur % 2):
+            raise ValueError(f"Le y4m 4:2:0 demande une taille paire ({largeur}x{hauteur})")
+        if isinstance(self.destination, str):
+            self.flux = open(self.destination, 'wb')
+            self.a_fermer = True
+        else:
+            self.flux = self.destination
+        if self.format == 'y4m':
+            cadence = Fraction(self.fps).limit_denominator(1001)
+            self.flux.write(f"YUV4MPEG2 W{largeur} H{hauteur} F{cadence.numerator}:{cadence.denominator} "
+                            f"Ip A1:1 C420jpeg\n".encode('ascii'))
+
+    def ecrire_frame(self, frame):
+        # Écriture directe de la mémoire des tableaux, sans copie en bytes
+        if self.format == 'y4m':
+            self.yuv = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, self.yuv)
+            self.flux.write(b"FRAME\n")
+            self.flux.write(self.yuv.data)
+        else:
+            self.flux.write(np.ascontiguousarray(frame).data)
+        self.flux.flush()
+
+    def terminer(self):
+        if self.flux is not None:
+            try:
+                if self.a_fermer:
+                    self.flux.close()
+                else:
+                    self.flux.flush()
+            except BrokenPipeError:
+                pass
+            self.flux = None
+        return self.nom
+
+    def supprimer(self):
+        if self.a_fermer and os.path.exists(self.destination):
+            os.remove(self.destination)
+
+
+class SortieMemoire(Sortie):
+    """Garde les frames en mémoire; fermer() renvoie un tableau (frames, hauteur, largeur, 3)"""
+
+    asynchrone = False
+    # Les frames sont gardées: jamais rendues au pool
+    liberation_differee = True
+
+    def __init__(self, fps=None):
+        super().__init__(fps)
+        self.frames = []
+
+    def ecrire_frame(self, frame):
+        self.frames.append(frame)
+
+    def terminer(self):
+        if not self.frames:
+            largeur, hauteur = self.taille
+            return np.zeros((0, hauteur, largeur, 3), dtype=np.uint8)
+        return np.stack(self.frames)
+
+    def supprimer(self):
+        self.frames = []
+
+
+FORMATS = ('mp4', 'png', 'jpg', 'raw', 'y4m')
+
+
+def creer_sortie(destination, format=None, fps=None):
+    """Sortie d'après la destination et le format (déduit de l'extension si absent)
+
+    '-' écrit un flux brut (ou y4m) sur la sortie standard; png et jpg écrivent une suite
+    d'images dans le dossier destination.
+    """
+    if format is None:
+        extension = os.path.splitext(destination)[1].lower().lstrip('.')
+        if destination == '-':
+            format = 'raw'
+        elif extension in FORMATS:
+            format = extension
+        elif extension in ('bgr', 'jpeg'):
+            format = {'bgr': 'raw', 'jpeg': 'jpg'}[extension]
+        elif not extension:
+            format = 'png'
+        else:
+            format = 'mp4'
+    if format not in FORMATS:
+        raise ValueError(f"Format de sortie inconnu: {format} (choix: {', '.join(FORMATS)})")
+    if format in ('png', 'jpg'):
+        return SortieImages(destination, format, fps=fps)
+    if format in ('raw', 'y4m'):
+        return SortieFlux(destination, format, fps=fps)
+    return SortieMP4(destination, fps=fps)
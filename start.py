@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Transformations d'Images - Art Informatique
+Applique les effets artistiques à une image et sauvegarde le résultat dans art_output/
+"""
+
+import os
+import math
+import time
+import argparse
+from pathlib import Path
+import cv2
+import numpy as np
+from PIL import Image
+
+from effets_art import EFFETS, ChaineEffets
+
+TAILLE_MAX = 800
+DOSSIER_SORTIE = "art_output"
+
+
+def creer_image_demo(chemin="demo_image.png", largeur=800, hauteur=600):
+    """Crée une image de démonstration: dégradé coloré, cercles et lignes"""
+    print("🖼️  Création d'une image de démonstration...")
+    x, y = np.meshgrid(np.linspace(0, 1, largeur), np.linspace(0, 1, hauteur))
+    image = np.dstack([255 * (1 - y), 255 * x * (1 - y) + 128 * y, 255 * y]).astype(np.uint8)
+    for i in range(6):
+        centre = (int(largeur * (0.15 + 0.14 * i)), int(hauteur * (0.5 + 0.25 * math.sin(i))))
+        cv2.circle(image, centre, 40 + 10 * i, (255 - 40 * i, 60 + 30 * i, 200), -1)
+    for i in range(0, largeur, 80):
+        cv2.line(image, (i, 0), (largeur - i, hauteur), (255, 255, 255), 3)
+    cv2.imwrite(chemin, image)
+    print(f"✅ Image de démonstration créée: {chemin}")
+    return chemin
+
+
+def charger_image(chemin):
+    """Charge une image en BGR, réduite à TAILLE_MAX pixels de côté au plus"""
+    with Image.open(chemin) as img:
+        img = img.convert('RGB')
+        img.thumbnail((TAILLE_MAX, TAILLE_MAX))
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+
+def sauvegarder(image, chemin_source, nom_effet):
+    """Sauvegarde le résultat dans art_output/ (JPEG qualité 95)"""
+    Path(DOSSIER_SORTIE).mkdir(exist_ok=True)
+    nom = f"{Path(chemin_source).stem}_{nom_effet}.jpg"
+    chemin = os.path.join(DOSSIER_SORTIE, nom)
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(chemin, quality=95)
+    return chemin
+
+
+def appliquer(image, chemin_source, descriptions, ouvrir=False):
+    """Applique une chaîne d'effets à l'image et sauvegarde le résultat"""
+    chaine = ChaineEffets(descriptions)
+    debut = time.perf_counter()
+    resultat = chaine.appliquer(image)
+    duree = time.perf_counter() - debut
+    nom = "+".join(effet.NOM for effet in chaine.effets)
+    chemin = sauvegarder(resultat, chemin_source, nom)
+    print(f"✨ {nom}: {duree*1000:.0f}ms -> {chemin}")
+    if ouvrir:
+        try:
+            Image.open(chemin).show()
+        except Exception:
+            pass
+    return chemin
+
+
+def choisir_interactivement():
+    """Demande l'image et l'effet (menu 1-9)"""
+    chemin = input("📂 Chemin de l'image (Entrée pour l'image de démonstration): ").strip()
+    print("\n🎨 Effets disponibles:")
+    for i, effet in enumerate(EFFETS.values(), 1):
+        print(f"   {i}. {effet.DESCRIPTION}")
+    print(f"   {len(EFFETS) + 1}. Tous les effets")
+    while True:
+        choix = input(f"\nVotre choix (1-{len(EFFETS) + 1}): ").strip()
+        if choix.isdigit() and 1 <= int(choix) <= len(EFFETS) + 1:
+            break
+        print("❌ Choix invalide.")
+    noms = list(EFFETS)
+    effets = [[nom] for nom in noms] if int(choix) == len(EFFETS) + 1 else [[noms[int(choix) - 1]]]
+    return chemin, effets
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Transformations d'images artistiques")
+    parser.add_argument("image", nargs="?", help="Image à transformer (défaut: image de démonstration)")
+    parser.add_argument("--effect", action="append", default=None, metavar="EFFET",
+                        help="Effet à appliquer, répétable pour les enchaîner: nom ou nom:parametre=valeur,... "
+                             "(" + ", ".join(EFFETS) + "); sans cette option, un menu est proposé")
+    parser.add_argument("--all", action="store_true", help="Applique chacun des effets séparément")
+    parser.add_argument("--no-open", action="store_true", help="N'ouvre pas les images créées")
+
+    args = parser.parse_args()
+
+    print("🎨 TRANSFORMATIONS D'IMAGES ARTISTIQUES 🎨")
+    print("=" * 50)
+
+    try:
+        if args.effect or args.all:
+            chemin = args.image or ""
+            effets = [[nom] for nom in EFFETS] if args.all else [args.effect]
+        else:
+            chemin, effets = choisir_interactivement()
+            chemin = chemin or args.image or ""
+
+        if not chemin:
+            chemin = "demo_image.png" if os.path.exists("demo_image.png") else creer_image_demo()
+        image = charger_image(chemin)
+        print(f"🖼️  Image: {chemin} ({image.shape[1]}x{image.shape[0]})")
+
+        for descriptions in effets:
+            appliquer(image, chemin, descriptions, ouvrir=not args.no_open and len(effets) == 1)
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrompu")
+        return 1
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return 1
+
+    print(f"\n✅ Transformations terminées! Résultats dans '{DOSSIER_SORTIE}/'")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
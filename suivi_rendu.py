@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Suivi du Rendu - Art Informatique
+Mesures par étape et notifications d'avancement du rendu de la mosaïque
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class ObservateurRendu:
+    """Interface des observateurs du rendu: redéfinir les méthodes utiles
+
+    Les méthodes reçoivent l'état du suivi (voir SuiviRendu.etat). Pendant traiter_video,
+    progression() et frame_rendue() sont appelées depuis le thread d'encodage après chaque
+    frame écrite: elles doivent rendre la main vite pour ne pas ralentir le rendu.
+    """
+
+    def debut(self, etat):
+        pass
+
+    def progression(self, etat):
+        pass
+
+    def frame_rendue(self, frame):
+        """Reçoit la dernière frame mosaïque écrite (à ne pas modifier)"""
+        pass
+
+    def fin(self, etat):
+        pass
+
+
+class ObservateurConsole(ObservateurRendu):
+    """Affiche l'avancement dans le terminal (comportement par défaut hors mode silencieux)"""
+
+    def progression(self, etat):
+        if etat['frames_total']:
+            print(f"   Frame {etat['frames_faites']}/{etat['frames_total']} "
+                  f"({etat['frames_faites']/etat['frames_total']*100:.1f}%) "
+                  f"- {etat['fps']:.1f} frames/s, reste {etat['eta'] or 0:.0f}s")
+        else:
+            print(f"   Frame {etat['frames_faites']} - {etat['fps']:.1f} frames/s")
+
+    def fin(self, etat):
+        for etape, duree in etat['temps_etapes'].items():
+            print(f"   ⏱️  {etape}: {duree:.2f}s")
+        for cache, taux in etat['taux_caches'].items():
+            print(f"   🗃️  cache {cache}: {taux*100:.0f}% de réutilisation")
+
+
+class SuiviRendu:
+    """Compteurs du rendu: frames faites, temps cumulé par étape, débit, temps restant, caches
+
+    Les mesures se résument à quelques appels à time.perf_counter par frame et peuvent rester actives.
+    Les compteurs sont mis à jour depuis les threads du pipeline (décodage, rendu, encodage): un
+    verrou protège chaque mise à jour.
+    """
+
+    def __init__(self, observateurs=(), frames_total=None):
+        self.observateurs = list(observateurs)
+        self.frames_total = frames_total
+        self.frames_faites = 0
+        self.temps_etapes = {}
+        self.caches = {}
+        self.debut_rendu = time.perf_counter()
+        self.verrou = threading.Lock()
+
+    @contextmanager
+    def mesurer(self, etape):
+        """Ajoute la durée du bloc au temps cumulé de l'étape"""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ajouter_temps(etape, time.perf_counter() - debut)
+
+    def ajouter_temps(self, etape, duree):
+        with self.verrou:
+            self.temps_etapes[etape] = self.temps_etapes.get(etape, 0.0) + duree
+
+    def compter_cache(self, cache, reutilises, calcules):
+        """Compte les éléments d'un cache réutilisés ou recalculés"""
+        with self.verrou:
+            anciens = self.caches.get(cache, (0, 0))
+            self.caches[cache] = (anciens[0] + reutilises, anciens[1] + calcules)
+
+    def commencer(self, frames_total=None):
+        """Remet à zéro les frames et les temps par étape (les caches restent cumulés) et prévient les observateurs"""
+        self.frames_total = frames_total
+        with self.verrou:
+            self.frames_faites = 0
+            self.temps_etapes = {}
+        self.debut_rendu = time.perf_counter()
+        for observateur in self.observateurs:
+            observateur.debut(self.etat())
+
+    def frames_terminees(self, nombre=1, frame=None):
+        """Note des frames terminées (avec la dernière frame rendue si elle est connue) et prévient les observateurs"""
+        with self.verrou:
+            self.frames_faites += nombre
+        if self.observateurs:
+            etat = self.etat()
+            for observateur in self.observateurs:
+                observateur.progression(etat)
+                if frame is not None:
+                    observateur.frame_rendue(frame)
+
+    def terminer(self):
+        etat = self.etat()
+        for observateur in self.observateurs:
+            observateur.fin(etat)
+        return etat
+
+    def etat(self):
+        """Instantané du suivi sous forme de dictionnaire"""
+        with self.verrou:
+            frames_faites = self.frames_faites
+            temps_etapes = dict(self.temps_etapes)
+            caches = dict(self.caches)
+        ecoule = time.perf_counter() - self.debut_rendu
+        fps = frames_faites / ecoule if ecoule > 0 else 0.0
+        eta = None
+        if self.frames_total and fps > 0:
+            eta = max(0, self.frames_total - frames_faites) / fps
+        return {
+            'frames_faites': frames_faites,
+            'frames_total': self.frames_total,
+            'ecoule': ecoule,
+            'fps': fps,
+            'eta': eta,
+            'temps_etapes': temps_etapes,
+            'taux_caches': {nom: r / (r + c) for nom, (r, c) in caches.items() if r + c},
+        }
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tampons de Frames - Art Informatique
+Réserve de tableaux réutilisés d'une frame à l'autre, pour que le rendu n'alloue plus de mémoire
+"""
+
+import threading
+import numpy as np
+
+
+class PoolTampons:
+    """Tampons de même forme, pris pour une frame puis rendus une fois la frame consommée
+
+    prendre() renvoie un tampon libre, ou en alloue un nouveau si tous sont en usage: un tampon
+    jamais rendu (gardé par une sortie en mémoire, perdu sur une erreur) ne bloque donc rien.
+    Au plus `capacite` tampons libres sont gardés. Les tampons d'une autre forme rendus par erreur
+    sont ignorés. Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(self, forme, dtype=np.uint8, capacite=32):
+        self.forme = tuple(forme)
+        self.dtype = np.dtype(dtype)
+        self.capacite = capacite
+        self.libres = []
+        self.verrou = threading.Lock()
+        self.alloues = 0
+        self.reutilises = 0
+
+    def prendre(self):
+        """Tampon non initialisé de la forme du pool"""
+        with self.verrou:
+            if self.libres:
+                self.reutilises += 1
+                return self.libres.pop()
+            self.alloues += 1
+        return np.empty(self.forme, self.dtype)
+
+    def rendre(self, tampon):
+        """Remet un tampon dans la réserve: il ne doit plus être lu ni écrit par l'appelant"""
+        if tampon is None or tampon.shape != self.forme or tampon.dtype != self.dtype or not tampon.flags.writeable:
+            return
+        with self.verrou:
+            if len(self.libres) < self.capacite:
+                self.libres.append(tampon)
@@ -0,0 +1,34 @@
+"""
+Entrées synthétiques communes aux tests: une petite bibliothèque de photos et une courte vidéo
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_mosaic import VideoMosaic
+
+
+@pytest.fixture(scope="session")
+def photos(tmp_path_factory):
+    """Dossier de 16 photos de démonstration reproductibles"""
+    dossier = str(tmp_path_factory.mktemp("photos"))
+    VideoMosaic(charger=False, silencieux=True).creer_photos_demo(16, graine=1, dossier=dossier)
+    return dossier
+
+
+@pytest.fixture(scope="session")
+def video(tmp_path_factory):
+    """Vidéo 160x120 de 20 frames à 10 FPS"""
+    chemin = str(tmp_path_factory.mktemp("video") / "video.mp4")
+    VideoMosaic(charger=False, silencieux=True).creer_video_demo(chemin, 160, 120, 10, graine=2, nombre_frames=20)
+    return chemin
+
+
+@pytest.fixture(autouse=True)
+def dossier_courant(tmp_path, monkeypatch):
+    """Les rendus écrivent dans video_mosaic_output/ du dossier courant: un dossier temporaire par test"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,55 @@
+"""
+Analyse des blocs et assemblage: comparés au calcul direct, bloc par bloc
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from video_mosaic import VideoMosaic
+
+
+def frame_aleatoire(hauteur=61, largeur=83, graine=0):
+    return np.random.default_rng(graine).integers(0, 256, (hauteur, largeur, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("taille_pixel", [1, 7, 16, 100])
+def test_moyennes_blocs_identiques_au_calcul_direct(taille_pixel):
+    frame = frame_aleatoire()
+    moyennes = VideoMosaic(charger=False, silencieux=True).calculer_moyennes_blocs(frame, taille_pixel)
+
+    hauteur, largeur = frame.shape[:2]
+    attendues = np.array([[frame[y:y + taille_pixel, x:x + taille_pixel].reshape(-1, 3).mean(axis=0)
+                           for x in range(0, largeur, taille_pixel)]
+                          for y in range(0, hauteur, taille_pixel)])
+    np.testing.assert_allclose(moyennes, attendues, rtol=0, atol=1e-9)
+
+
+def test_descripteurs_tailles_identiques_a_l_analyse_par_taille(photos):
+    mosaic = VideoMosaic(photos, silencieux=True)
+    frame = frame_aleatoire()
+    tailles = (5, 10, 20, 7)
+    descripteurs = mosaic.calculer_descripteurs_tailles(frame, tailles)
+    for taille in tailles:
+        np.testing.assert_allclose(descripteurs[taille], mosaic.calculer_descripteurs_blocs(frame, taille),
+                                   rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("taille_pixel", [7, 40])
+def test_mosaique_identique_au_rendu_bloc_par_bloc(photos, taille_pixel):
+    """Chaque bloc reçoit la photo de couleur moyenne la plus proche, redimensionnée depuis la photo d'origine"""
+    mosaic = VideoMosaic(photos, silencieux=True)
+    frame = frame_aleatoire()
+    rendu = mosaic.creer_mosaique_frame(frame, taille_pixel)
+
+    hauteur, largeur = frame.shape[:2]
+    photos_originales = [cv2.imread(chemin) for chemin in mosaic.bibliotheque.chemins]
+    attendu = np.empty_like(frame)
+    for y in range(0, hauteur, taille_pixel):
+        for x in range(0, largeur, taille_pixel):
+            bloc = frame[y:y + taille_pixel, x:x + taille_pixel]
+            moyenne = bloc.reshape(-1, 3).mean(axis=0)
+            indice = np.argmin(((mosaic.index_couleurs.moyennes - moyenne) ** 2).sum(axis=1))
+            attendu[y:y + taille_pixel, x:x + taille_pixel] = cv2.resize(photos_originales[indice],
+                                                                         (bloc.shape[1], bloc.shape[0]))
+    np.testing.assert_array_equal(rendu, attendu)
@@ -0,0 +1,59 @@
+"""
+File de travaux: reprises après un échec et abandon après la dernière tentative
+"""
+
+from file_travaux import FileTravaux, TravailleurMosaique
+
+
+class TravailleurFragile(TravailleurMosaique):
+    """Échoue aux `echecs` premières tentatives de chaque travail"""
+
+    def __init__(self, *args, echecs=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.echecs = echecs
+
+    def executer(self, travail):
+        if travail['tentatives'] <= self.echecs:
+            raise RuntimeError("panne passagère")
+        return super().executer(travail)
+
+
+def test_echouer_reprend_puis_abandonne(tmp_path):
+    file = FileTravaux(str(tmp_path / "file.db"))
+    numero = file.ajouter("video.mp4", max_tentatives=2)
+    assert file.prendre("t")['tentatives'] == 1
+    assert file.echouer(numero, "erreur 1", delai_reprise=60)
+    # Pas repris avant la fin du délai
+    assert file.prendre("t") is None
+    assert file.compter()['en_attente'] == 1
+
+    file.connexion.execute("UPDATE travaux SET disponible = 0")
+    assert file.prendre("t")['tentatives'] == 2
+    assert not file.echouer(numero, "erreur 2", delai_reprise=60)
+    travail, = file.travaux()
+    assert (travail['etat'], travail['tentatives'], travail['erreur']) == ('echoue', 2, "erreur 2")
+    assert file.prendre("t") is None
+
+
+def test_travailleur_abandonne_une_video_illisible(tmp_path, photos):
+    chemin = str(tmp_path / "file.db")
+    file = FileTravaux(chemin)
+    numero = file.ajouter(str(tmp_path / "absente.mp4"), {'photos': photos}, max_tentatives=3)
+
+    assert TravailleurMosaique(chemin, attente=0.01, jusqu_a_vide=True, delai_reprise=0).boucle() == 0
+    travail, = file.travaux()
+    assert travail['id'] == numero
+    assert (travail['etat'], travail['tentatives']) == ('echoue', 3)
+    assert travail['erreur'].startswith("OSError")
+
+
+def test_travailleur_termine_apres_une_reprise(tmp_path, photos, video):
+    chemin = str(tmp_path / "file.db")
+    file = FileTravaux(chemin)
+    file.ajouter(video, {'photos': photos, 'taille_pixel': 10, 'sortie': str(tmp_path / "rendu.y4m")},
+                 max_tentatives=2)
+
+    assert TravailleurFragile(chemin, attente=0.01, jusqu_a_vide=True, delai_reprise=0).boucle() == 1
+    travail, = file.travaux()
+    assert (travail['etat'], travail['tentatives'], travail['erreur']) == ('termine', 2, None)
+    assert (tmp_path / "rendu.y4m").stat().st_size > 0
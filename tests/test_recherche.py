@@ -0,0 +1,88 @@
+"""
+Recherche des photos: k plus proches (avec reclassement après projection) et choix sans répétition
+"""
+
+import numpy as np
+import pytest
+
+from index_couleurs import IndexCouleurs
+from video_mosaic import VideoMosaic
+
+
+def k_plus_proches(points, requetes, k):
+    """Recherche exhaustive de référence"""
+    distances = ((requetes[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1)
+    return np.argsort(distances, axis=1, kind='stable')[:, :k]
+
+
+@pytest.mark.parametrize("dimensions", [3, 12])
+def test_k_plus_proches_exacts(dimensions):
+    rng = np.random.default_rng(dimensions)
+    points = rng.uniform(0, 255, (25, dimensions))
+    requetes = rng.uniform(0, 255, (200, dimensions))
+    index = IndexCouleurs(points)
+    np.testing.assert_array_equal(index.rechercher_k(requetes, 5), k_plus_proches(points, requetes, 5))
+    np.testing.assert_array_equal(index.rechercher(requetes), k_plus_proches(points, requetes, 1)[:, 0])
+
+
+def test_reclassement_exact_avec_tous_les_candidats():
+    """Au-delà de DIMENSIONS_ARBRE, la projection ne choisit que les candidats: reclassés sur les
+    descripteurs complets, ils redonnent la recherche exhaustive quand ils couvrent toute la bibliothèque"""
+    rng = np.random.default_rng(0)
+    points = rng.normal(0, 20, (300, 48))
+    requetes = rng.normal(0, 20, (100, 48))
+    index = IndexCouleurs(points)
+    assert index.projection is not None
+    index.CANDIDATS_RECLASSEMENT = len(points)
+    np.testing.assert_array_equal(index.rechercher_k(requetes, 4), k_plus_proches(points, requetes, 4))
+
+
+def attribution_bloc_par_bloc(candidats, rayon, fixes=None):
+    """Référence de attribuer_sans_repetition: les blocs un par un, dans l'ordre des classes"""
+    lignes, colonnes, _ = candidats.shape
+    choix = np.full((lignes, colonnes), -1) if fixes is None else fixes.copy()
+    pas = rayon + 1
+    for a in range(pas):
+        for b in range(pas):
+            for i in range(a, lignes, pas):
+                for j in range(b, colonnes, pas):
+                    if fixes is not None and fixes[i, j] >= 0:
+                        continue
+                    voisins = {choix[y, x]
+                               for y in range(max(0, i - rayon), min(lignes, i + rayon + 1))
+                               for x in range(max(0, j - rayon), min(colonnes, j + rayon + 1)) if (y, x) != (i, j)}
+                    libres = [c for c in candidats[i, j] if c not in voisins]
+                    choix[i, j] = libres[0] if libres else candidats[i, j, 0]
+    return choix
+
+
+@pytest.mark.parametrize("rayon", [1, 2])
+@pytest.mark.parametrize("graine", range(3))
+def test_attribution_sans_repetition_identique_bloc_par_bloc(rayon, graine):
+    candidats = np.random.default_rng(graine).integers(0, 12, (9, 13, 5))
+    np.testing.assert_array_equal(VideoMosaic.attribuer_sans_repetition(candidats, rayon),
+                                  attribution_bloc_par_bloc(candidats, rayon))
+
+
+def test_attribution_sans_repetition_garde_les_blocs_fixes():
+    rng = np.random.default_rng(5)
+    candidats = rng.integers(0, 12, (9, 13, 5))
+    fixes = np.where(rng.random((9, 13)) < 0.7, rng.integers(0, 12, (9, 13)), -1)
+    choix = VideoMosaic.attribuer_sans_repetition(candidats, 1, fixes)
+    np.testing.assert_array_equal(choix[fixes >= 0], fixes[fixes >= 0])
+    np.testing.assert_array_equal(choix, attribution_bloc_par_bloc(candidats, 1, fixes))
+
+
+def test_attribution_sans_voisin_identique_avec_assez_de_candidats():
+    # Chaque bloc a 9 candidats distincts: au plus 8 voisins, il en reste toujours un de libre
+    candidats = np.stack([np.random.default_rng(i).permutation(30)[:9] for i in range(8 * 11)]).reshape(8, 11, 9)
+    choix = VideoMosaic.attribuer_sans_repetition(candidats, 1)
+    for dy, dx in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        a = choix[max(0, -dy):8 - max(0, dy), max(0, -dx):11 - max(0, dx)]
+        b = choix[max(0, dy):8 + min(0, dy) or None, max(0, dx):11 + min(0, dx) or None]
+        assert not (a == b).any()
+
+
+def test_attribution_rayon_nul():
+    candidats = np.random.default_rng(0).integers(0, 12, (4, 5, 3))
+    np.testing.assert_array_equal(VideoMosaic.attribuer_sans_repetition(candidats, 0), candidats[..., 0])
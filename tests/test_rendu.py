@@ -0,0 +1,92 @@
+"""
+Rendus complets sur une courte vidéo: parallèle, par segments repris, avec le cache des grilles
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from sorties_video import SortieMemoire
+from video_mosaic import VideoMosaic
+
+
+def rendre(mosaic, video, **options):
+    return mosaic.traiter_video(video, 10, 10, sortie=SortieMemoire(), **options)
+
+
+def lire_frames(chemin):
+    cap = cv2.VideoCapture(chemin)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.stack(frames)
+
+
+def test_rendu_parallele_identique_au_rendu_sur_un_processus(photos, video):
+    mosaic = VideoMosaic(photos, silencieux=True)
+    seul = rendre(mosaic, video)
+    parallele = rendre(mosaic, video, workers=2)
+    assert len(seul) == 20
+    np.testing.assert_array_equal(parallele, seul)
+
+
+def test_rendu_identique_a_la_mosaique_de_chaque_frame(photos, video):
+    mosaic = VideoMosaic(photos, silencieux=True)
+    rendu = rendre(mosaic, video)
+    np.testing.assert_array_equal(rendu, np.stack([mosaic.creer_mosaique_frame(frame, 10)
+                                                   for frame in lire_frames(video)]))
+
+
+def test_reprise_ne_rend_que_les_segments_manquants(photos, video):
+    mosaic = VideoMosaic(photos, silencieux=True)
+    sortie = mosaic.traiter_video(video, 10, 10, duree_segment=0.5)
+    dossier = sortie + ".segments"
+    fichiers = sorted(f for f in os.listdir(dossier) if f.endswith(".mp4"))
+    assert fichiers == [f"segment_{i:05d}.mp4" for i in range(4)]
+    premiere = lire_frames(sortie)
+
+    dates = {f: os.stat(os.path.join(dossier, f)).st_mtime_ns for f in fichiers}
+    os.remove(os.path.join(dossier, fichiers[1]))
+    assert mosaic.traiter_video(video, 10, 10, duree_segment=0.5) == sortie
+
+    for f in fichiers:
+        if f == fichiers[1]:
+            assert os.path.exists(os.path.join(dossier, f))
+        else:
+            assert os.stat(os.path.join(dossier, f)).st_mtime_ns == dates[f]
+    reprise = lire_frames(sortie)
+    assert len(reprise) == len(premiere) == 20
+    np.testing.assert_array_equal(reprise, premiere)
+
+    # Même contenu que le rendu d'un seul tenant: les segments, réencodés à l'assemblage, perdent
+    # au plus deux fois ce que perd une seule vidéo mp4
+    exactes = rendre(mosaic, video).astype(np.int16)
+    perte_mp4 = np.abs(lire_frames(mosaic.traiter_video(video, 10, 10)) - exactes).mean()
+    assert np.abs(reprise - exactes).mean() < 2 * perte_mp4
+
+
+def test_grilles_en_cache_identiques_au_rendu_sans_cache(photos, video, tmp_path):
+    reference = rendre(VideoMosaic(photos, silencieux=True), video)
+
+    mosaic = VideoMosaic(photos, silencieux=True, cache_grilles=str(tmp_path / "grilles"))
+    premier = rendre(mosaic, video)
+    assert mosaic.suivi.caches['grilles'] == (0, 1)
+    second = rendre(mosaic, video)
+    assert mosaic.suivi.caches['grilles'] == (1, 1)
+
+    np.testing.assert_array_equal(premier, reference)
+    np.testing.assert_array_equal(second, reference)
+
+
+def test_grilles_en_cache_avec_effets(photos, video, tmp_path):
+    options = dict(silencieux=True, effets_apres=['melange:intensite=0.5'])
+    reference = rendre(VideoMosaic(photos, **options), video)
+    mosaic = VideoMosaic(photos, cache_grilles=str(tmp_path / "grilles"), **options)
+    rendre(mosaic, video)
+    np.testing.assert_array_equal(rendre(mosaic, video), reference)
+    assert mosaic.suivi.caches['grilles'] == (1, 1)
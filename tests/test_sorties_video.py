@@ -0,0 +1,65 @@
+"""
+Sorties en flux: taille exacte du flux brut et du y4m
+"""
+
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from sorties_video import SortieFlux, SortieMemoire
+
+
+def frames_aleatoires(nombre=5, hauteur=48, largeur=64):
+    return np.random.default_rng(0).integers(0, 256, (nombre, hauteur, largeur, 3), dtype=np.uint8)
+
+
+def ecrire(sortie, frames, fps=10):
+    sortie.preparer(frames.shape[2], frames.shape[1], fps)
+    for frame in frames:
+        assert sortie.ecrire(frame.copy())
+    return sortie.fermer()
+
+
+def test_flux_brut():
+    frames = frames_aleatoires()
+    flux = io.BytesIO()
+    ecrire(SortieFlux(flux, 'raw'), frames)
+    assert len(flux.getvalue()) == frames.size
+    assert flux.getvalue() == frames.tobytes()
+
+
+@pytest.mark.parametrize("fps, cadence", [(10, "10:1"), (30000 / 1001, "30000:1001")])
+def test_flux_y4m(fps, cadence):
+    frames = frames_aleatoires()
+    nombre, hauteur, largeur = frames.shape[:3]
+    flux = io.BytesIO()
+    ecrire(SortieFlux(flux, 'y4m'), frames, fps)
+
+    entete = f"YUV4MPEG2 W{largeur} H{hauteur} F{cadence} Ip A1:1 C420jpeg\n".encode('ascii')
+    taille_frame = largeur * hauteur * 3 // 2
+    donnees = flux.getvalue()
+    assert len(donnees) == len(entete) + nombre * (len(b"FRAME\n") + taille_frame)
+    assert donnees.startswith(entete)
+    for i, frame in enumerate(frames):
+        debut = len(entete) + i * (len(b"FRAME\n") + taille_frame)
+        assert donnees[debut:debut + 6] == b"FRAME\n"
+        assert donnees[debut + 6:debut + 6 + taille_frame] == cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420).tobytes()
+
+
+def test_flux_y4m_taille_impaire():
+    with pytest.raises(ValueError):
+        ecrire(SortieFlux(io.BytesIO(), 'y4m'), frames_aleatoires(1, 47, 64))
+
+
+def test_flux_vers_fichier(tmp_path):
+    frames = frames_aleatoires()
+    chemin = str(tmp_path / "frames.raw")
+    assert ecrire(SortieFlux(chemin, 'raw'), frames) == chemin
+    assert (tmp_path / "frames.raw").stat().st_size == frames.size
+
+
+def test_sortie_memoire():
+    frames = frames_aleatoires()
+    np.testing.assert_array_equal(ecrire(SortieMemoire(), frames), frames)
@@ -6,156 +6,707 @@ Transforme une vidéo en utilisant des photos comme "pixels"
 
 import os
 import sys
+import time
+import contextlib
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-import random
+from random import Random
 import math
 from pathlib import Path
 import argparse
 from collections import defaultdict
+from index_couleurs import IndexCouleurs
+from bibliotheque_photos import BibliothequePhotos
+from magasin_tuiles import MagasinTuiles
+from rendu_parallele import RenduParallele
+from pipeline_video import PipelineVideo
+from echantillonnage_video import EchantillonneurVideo
+from rendu_segments import RenduSegments
+from rendu_variantes import RenduVariantes
+from suivi_rendu import SuiviRendu, ObservateurConsole
+from effets_art import ChaineEffets, EFFETS
+from rendu_direct import RenduDirect, source_camera, source_brute, SortieFenetre
+from sorties_video import SortieMP4, SortieFlux, creer_sortie, FORMATS
+from tampons_frames import PoolTampons
+from cache_grilles import CacheGrilles
 
 class VideoMosaic:
-    def __init__(self, dossier_photos="photos_mosaique"):
+    # Descripteurs des photos et des blocs: taille de la grille de sous-blocs Lab (None: moyenne BGR)
+    DESCRIPTEURS = {'bgr': None, 'lab': 1, 'lab2x2': 2, 'lab4x4': 4}
+    # Passage du Lab 8 bits d'OpenCV au Lab des signatures
+    ECHELLE_LAB = np.array([100.0 / 255, 1.0, 1.0])
+    DECALAGE_LAB = np.array([0.0, 128.0, 128.0])
+    
+    def __init__(self, dossier_photos="photos_mosaique", niveaux_table=None, taille_vignette=32,
+                 workers_chargement=None, progression_chargement=None, charger=True, seuil_incremental=None,
+                 silencieux=False, taille_min_adaptative=None, seuil_variance=100.0, budget_tuiles=256 * 2**20,
+                 diversite=None, rayon_diversite=1, descripteur='bgr', effets_avant=None, effets_apres=None,
+                 cache_grilles=None):
         self.dossier_photos = dossier_photos
-        self.photos_cache = {}
+        self.silencieux = silencieux
+        if descripteur not in self.DESCRIPTEURS:
+            raise ValueError(f"Descripteur inconnu: {descripteur} (choix: {', '.join(self.DESCRIPTEURS)})")
+        if rayon_diversite < 1:
+            raise ValueError(f"Rayon de diversité invalide: {rayon_diversite} (au moins 1 bloc)")
+        self.descripteur = descripteur
+        self.grille_descripteur = self.DESCRIPTEURS[descripteur]
+        if niveaux_table and self.grille_descripteur:
+            print("⚠️  La table des couleurs ne s'applique qu'au descripteur bgr: ignorée")
+            niveaux_table = None
+        self.niveaux_table = niveaux_table
+        self.taille_vignette = taille_vignette
+        self.workers_chargement = workers_chargement
+        self.progression_chargement = progression_chargement or self.afficher_progression_chargement
+        self.bibliotheque = None
         self.photos_moyennes = {}
-        self.charger_photos_mosaique()
+        self.budget_tuiles = budget_tuiles
+        self.atlas_tuiles = {}
+        self.chemins_photos = []
+        self.index_couleurs = None
+        self.statistiques_pipeline = {}
+        # Tableaux de travail du rendu (images intégrales...), réutilisés d'une frame à l'autre
+        self.tampons_calcul = {}
+        self.seuil_incremental = seuil_incremental
+        self.etat_incremental = None
+        self.taille_min_adaptative = taille_min_adaptative
+        self.seuil_variance = seuil_variance
+        # Nombre de candidats par bloc pour éviter de répéter une photo dans un rayon de rayon_diversite blocs
+        self.diversite = diversite
+        self.rayon_diversite = rayon_diversite
+        # Effets d'image (voir effets_art.creer_effet) appliqués à la frame source, puis à la mosaïque
+        self.effets_avant = ChaineEffets(effets_avant)
+        self.effets_apres = ChaineEffets(effets_apres)
+        # Grilles d'indices des frames rendues, réutilisées par les rendus suivants (dossier, voir CacheGrilles)
+        self.cache_grilles = CacheGrilles(cache_grilles) if cache_grilles else None
+        # Grille des indices de photos de la dernière frame rendue (None en mode adaptatif)
+        self.derniere_grille = None
+        if taille_min_adaptative and seuil_incremental is not None:
+            print("⚠️  Le mode incrémental ne s'applique pas aux tuiles adaptatives: ignoré")
+            self.seuil_incremental = None
+        if taille_min_adaptative and diversite and diversite > 1:
+            print("⚠️  La diversité ne s'applique pas aux tuiles adaptatives: ignorée")
+            self.diversite = None
+        # Observateurs du rendu; la console par défaut, aucun en mode silencieux
+        self.suivi = SuiviRendu([] if silencieux else [ObservateurConsole()])
+        self.observateurs = self.suivi.observateurs
+        if charger:
+            self.charger_photos_mosaique()
+    
+    def afficher(self, *messages):
+        """Affiche un message d'information, sauf en mode silencieux"""
+        if not self.silencieux:
+            print(*messages)
+    
+    def ajouter_observateur(self, observateur):
+        """Abonne un observateur (voir suivi_rendu.ObservateurRendu) à l'avancement des rendus"""
+        self.observateurs.append(observateur)
+    
+    def retirer_observateur(self, observateur):
+        self.observateurs.remove(observateur)
     
     def charger_photos_mosaique(self):
         """Charge toutes les photos du dossier de mosaïque"""
-        print("🖼️  Chargement des photos pour la mosaïque...")
+        self.afficher("🖼️  Chargement des photos pour la mosaïque...")
         
         if not os.path.exists(self.dossier_photos):
             print(f"⚠️  Dossier '{self.dossier_photos}' non trouvé. Création d'un dossier avec des photos de démonstration...")
             self.creer_photos_demo()
         
-        extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        photos = []
+        self.bibliotheque = BibliothequePhotos(self.dossier_photos, self.taille_vignette, self.workers_chargement)
+        self.bibliotheque.charger(self.progression_chargement)
         
-        for fichier in os.listdir(self.dossier_photos):
-            if any(fichier.lower().endswith(ext) for ext in extensions):
-                chemin = os.path.join(self.dossier_photos, fichier)
-                photos.append(chemin)
+        mise_a_jour = self.bibliotheque.derniere_mise_a_jour
+        self.suivi.compter_cache('bibliotheque', mise_a_jour['a_jour'], mise_a_jour['analysees'])
+        if mise_a_jour['index_lu']:
+            self.afficher(f"📇 Index existant: {mise_a_jour['a_jour']} photos à jour, "
+                          f"{mise_a_jour['analysees']} à analyser, {mise_a_jour['supprimees']} supprimées")
         
-        if not photos:
+        if not len(self.bibliotheque):
             print("❌ Aucune photo trouvée dans le dossier. Création de photos de démonstration...")
             self.creer_photos_demo()
-            photos = [os.path.join(self.dossier_photos, f) for f in os.listdir(self.dossier_photos) 
-                     if any(f.lower().endswith(ext) for ext in extensions)]
-        
-        print(f"📸 {len(photos)} photos chargées pour la mosaïque")
-        
-        # Calculer la couleur moyenne de chaque photo
-        for i, chemin_photo in enumerate(photos):
-            try:
-                img = cv2.imread(chemin_photo)
-                if img is not None:
-                    # Redimensionner pour un calcul plus rapide
-                    img_petite = cv2.resize(img, (10, 10))
-                    moyenne = cv2.mean(img_petite)[:3]  # BGR
-                    self.photos_moyennes[chemin_photo] = moyenne
-                    
-                    if i % 10 == 0:
-                        print(f"   Traitement: {i+1}/{len(photos)}")
-            except Exception as e:
-                print(f"⚠️  Erreur avec {chemin_photo}: {e}")
-        
-        print("✅ Photos chargées et analysées!")
-    
-    def creer_photos_demo(self):
-        """Crée des photos de démonstration colorées"""
-        Path(self.dossier_photos).mkdir(exist_ok=True)
-        
-        print("🎨 Création de photos de démonstration...")
-        
-        # Créer 100 photos colorées différentes
-        for i in range(100):
+            self.bibliotheque.charger(self.progression_chargement)
+        
+        self.afficher(f"📸 {len(self.bibliotheque)} photos chargées pour la mosaïque")
+        
+        self.photos_moyennes = dict(zip(self.bibliotheque.chemins, map(tuple, self.bibliotheque.moyennes)))
+        self.construire_index_couleurs()
+        self.afficher("✅ Photos chargées et analysées!")
+    
+    def afficher_progression_chargement(self, faites, total):
+        """Progression par défaut de l'analyse des photos"""
+        if faites % 10 == 1 or faites == total:
+            self.afficher(f"   Traitement: {faites}/{total}")
+    
+    def construire_index_couleurs(self):
+        """Construit l'index des descripteurs des photos, interrogé par frame entière"""
+        self.chemins_photos = self.bibliotheque.chemins
+        if self.grille_descripteur:
+            descripteurs = self.bibliotheque.descripteurs(self.grille_descripteur)
+        else:
+            descripteurs = self.bibliotheque.moyennes
+        self.index_couleurs = IndexCouleurs(descripteurs, self.niveaux_table) if self.chemins_photos else None
+        self.atlas_tuiles = MagasinTuiles(self.bibliotheque, self.budget_tuiles) if self.chemins_photos else {}
+    
+    def options_rendu(self):
+        """Options du rendu des frames, à transmettre aux mosaïques des processus de rendu"""
+        return {'seuil_incremental': self.seuil_incremental, 'taille_min_adaptative': self.taille_min_adaptative,
+                'seuil_variance': self.seuil_variance, 'diversite': self.diversite,
+                'rayon_diversite': self.rayon_diversite, 'descripteur': self.descripteur,
+                'effets_avant': self.effets_avant.descriptions, 'effets_apres': self.effets_apres.descriptions}
+    
+    def exporter_etat_rendu(self, hauteur, largeur, taille_pixel):
+        """Tableaux nécessaires au rendu d'une vidéo (index des couleurs et atlas), à partager entre processus"""
+        tailles = self.tailles_rendu(hauteur, largeur, taille_pixel)
+        self.preparer_atlas(tailles)
+        
+        etat = {'moyennes': self.index_couleurs.moyennes}
+        if self.index_couleurs.table is not None:
+            etat['table'] = self.index_couleurs.table
+        # Atlas projetés depuis leurs fichiers: les processus de rendu les ouvrent sans copie
+        for h, l in tailles:
+            etat[f'atlas_{h}x{l}'] = self.atlas_tuiles.projete((h, l))
+        return etat
+    
+    def charger_etat_rendu(self, etat):
+        """Prépare le rendu à partir de tableaux exportés par exporter_etat_rendu, sans relire les photos"""
+        self.index_couleurs = IndexCouleurs(etat['moyennes'], table=etat.get('table'))
+        self.atlas_tuiles = {}
+        for nom, tableau in etat.items():
+            if nom.startswith('atlas_'):
+                h, l = map(int, nom[len('atlas_'):].split('x'))
+                self.atlas_tuiles[(h, l)] = tableau
+    
+    def creer_photos_demo(self, nombre=100, graine=None, dossier=None, taille=50):
+        """Crée des photos de démonstration colorées (reproductibles si une graine est donnée)"""
+        dossier = dossier or self.dossier_photos
+        Path(dossier).mkdir(parents=True, exist_ok=True)
+        hasard = Random(graine)
+        
+        self.afficher("🎨 Création de photos de démonstration...")
+        
+        # Créer des photos colorées différentes
+        for i in range(nombre):
             # Créer une image avec une couleur dominante
-            img = Image.new('RGB', (50, 50))
+            img = Image.new('RGB', (taille, taille))
             draw = ImageDraw.Draw(img)
             
             # Couleur de base
-            r = random.randint(0, 255)
-            g = random.randint(0, 255)
-            b = random.randint(0, 255)
+            r = hasard.randint(0, 255)
+            g = hasard.randint(0, 255)
+            b = hasard.randint(0, 255)
             
             # Dessiner des formes géométriques
-            for _ in range(random.randint(3, 8)):
-                x1 = random.randint(0, 50)
-                y1 = random.randint(0, 50)
-                x2 = random.randint(0, 50)
-                y2 = random.randint(0, 50)
+            for _ in range(hasard.randint(3, 8)):
+                x1 = hasard.randint(0, taille)
+                y1 = hasard.randint(0, taille)
+                x2 = hasard.randint(0, taille)
+                y2 = hasard.randint(0, taille)
                 
                 couleur = (
-                    min(255, max(0, r + random.randint(-50, 50))),
-                    min(255, max(0, g + random.randint(-50, 50))),
-                    min(255, max(0, b + random.randint(-50, 50)))
+                    min(255, max(0, r + hasard.randint(-50, 50))),
+                    min(255, max(0, g + hasard.randint(-50, 50))),
+                    min(255, max(0, b + hasard.randint(-50, 50)))
                 )
                 
-                forme = random.choice(['rectangle', 'cercle', 'ligne'])
+                forme = hasard.choice(['rectangle', 'cercle', 'ligne'])
                 if forme == 'rectangle':
-                    draw.rectangle([x1, y1, x2, y2], fill=couleur)
+                    draw.rectangle([min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)], fill=couleur)
                 elif forme == 'cercle':
-                    rayon = random.randint(5, 15)
+                    rayon = hasard.randint(5, 15)
                     draw.ellipse([x1-rayon, y1-rayon, x1+rayon, y1+rayon], fill=couleur)
                 else:
-                    draw.line([x1, y1, x2, y2], fill=couleur, width=random.randint(1, 3))
+                    draw.line([x1, y1, x2, y2], fill=couleur, width=hasard.randint(1, 3))
             
             # Sauvegarder
-            chemin = os.path.join(self.dossier_photos, f"demo_{i:03d}.png")
+            chemin = os.path.join(dossier, f"demo_{i:03d}.png")
             img.save(chemin)
     
-    def trouver_photo_similaire(self, couleur_cible, taille_pixel):
+    def trouver_photo_similaire(self, couleur_cible, taille_pixel=None):
         """Trouve la photo la plus similaire à la couleur cible"""
-        couleur_cible = np.array(couleur_cible)
-        meilleure_photo = None
-        meilleure_distance = float('inf')
+        if not self.chemins_photos:
+            return None
         
-        for chemin_photo, moyenne in self.photos_moyennes.items():
-            distance = np.linalg.norm(couleur_cible - moyenne)
-            if distance < meilleure_distance:
-                meilleure_distance = distance
-                meilleure_photo = chemin_photo
+        couleur = np.asarray(couleur_cible, dtype=np.float64)[:3]
+        if self.grille_descripteur:
+            pixel = np.clip(np.round(couleur), 0, 255).astype(np.uint8).reshape(1, 1, 3)
+            couleur = self.calculer_descripteurs_blocs(pixel, 1)[0, 0]
+        indice = self.index_couleurs.rechercher(couleur)
+        return self.chemins_photos[int(indice)]
+    
+    def trouver_photos_similaires(self, moyennes):
+        """Indices des photos les plus similaires pour toute une grille de couleurs (lignes, colonnes, 3)
         
-        return meilleure_photo
+        Avec la diversité activée, une grille entière reçoit pour chaque bloc la plus proche de ses
+        k meilleures photos qui n'est pas déjà utilisée autour de lui.
+        """
+        if self.diversite and self.diversite > 1 and moyennes.ndim == 3:
+            candidats = self.index_couleurs.rechercher_k(moyennes, self.diversite)
+            return self.attribuer_sans_repetition(candidats, self.rayon_diversite)
+        return self.index_couleurs.rechercher(moyennes)
     
-    def creer_mosaique_frame(self, frame, taille_pixel=20):
-        """Crée une mosaïque pour une frame de la vidéo"""
-        hauteur, largeur = frame.shape[:2]
-        resultat = np.zeros((hauteur, largeur, 3), dtype=np.uint8)
-        
-        # Parcourir la frame par blocs
-        for y in range(0, hauteur, taille_pixel):
-            for x in range(0, largeur, taille_pixel):
-                # Extraire la région
-                y_end = min(y + taille_pixel, hauteur)
-                x_end = min(x + taille_pixel, largeur)
-                region = frame[y:y_end, x:x_end]
-                
-                # Calculer la couleur moyenne de la région
-                moyenne = cv2.mean(region)[:3]  # BGR
-                
-                # Trouver la photo la plus similaire
-                photo_similaire = self.trouver_photo_similaire(moyenne, taille_pixel)
+    def trouver_photos_blocs(self, moyennes, grille, lignes, colonnes):
+        """Recherche à nouveau les blocs (lignes, colonnes) d'une grille d'indices, les autres gardant leur photo
+        
+        Avec la diversité activée, les blocs recherchés évitent aussi les photos des blocs gardés autour d'eux.
+        """
+        if not (self.diversite and self.diversite > 1):
+            grille[lignes, colonnes] = self.index_couleurs.rechercher(moyennes[lignes, colonnes])
+            return grille
+        candidats = np.full(grille.shape + (min(self.diversite, len(self.index_couleurs.moyennes)),), -1, dtype=np.intp)
+        candidats[lignes, colonnes] = self.index_couleurs.rechercher_k(moyennes[lignes, colonnes], self.diversite)
+        fixes = grille.astype(np.intp)
+        fixes[lignes, colonnes] = -1
+        grille[...] = self.attribuer_sans_repetition(candidats, self.rayon_diversite, fixes)
+        return grille
+    
+    @staticmethod
+    def attribuer_sans_repetition(candidats, rayon=1, fixes=None):
+        """Choisit pour chaque bloc le premier de ses candidats (lignes, colonnes, k) absent de son voisinage
+        
+        Les blocs sont répartis en (rayon+1)² classes entrelacées: deux blocs d'une même classe sont
+        trop loin l'un de l'autre pour se gêner, chaque classe est donc traitée d'un coup en tenant
+        compte des choix des classes précédentes. Si tous les candidats d'un bloc sont déjà pris
+        autour de lui, le plus proche est gardé. Sans voisinage (rayon 0), c'est le plus proche.
+        
+        fixes (optionnel): grille (lignes, colonnes) des photos déjà choisies, -1 pour les blocs à choisir.
+        """
+        if rayon < 1:
+            return candidats[..., 0] if fixes is None else np.where(fixes < 0, candidats[..., 0], fixes)
+        lignes, colonnes, k = candidats.shape
+        pas = rayon + 1
+        # Choix déjà faits, entourés d'une marge de rayon blocs (-1: pas encore choisi)
+        choix = np.full((lignes + 2 * rayon, colonnes + 2 * rayon), -1, dtype=np.intp)
+        if fixes is not None:
+            choix[rayon:rayon + lignes, rayon:rayon + colonnes] = fixes
+        decalages = [(dy, dx) for dy in range(-rayon, rayon + 1) for dx in range(-rayon, rayon + 1) if dy or dx]
+        
+        for a in range(min(pas, lignes)):
+            for b in range(min(pas, colonnes)):
+                classe = candidats[a::pas, b::pas]
+                n_l, n_c = classe.shape[:2]
+                voisins = np.stack([choix[rayon + a + dy:rayon + a + dy + (n_l - 1) * pas + 1:pas,
+                                          rayon + b + dx:rayon + b + dx + (n_c - 1) * pas + 1:pas]
+                                    for dy, dx in decalages], axis=-1)
                 
-                if photo_similaire:
-                    # Charger et redimensionner la photo
-                    if photo_similaire not in self.photos_cache:
-                        img_photo = cv2.imread(photo_similaire)
-                        if img_photo is not None:
-                            self.photos_cache[photo_similaire] = img_photo
-                    
-                    if photo_similaire in self.photos_cache:
-                        img_photo = self.photos_cache[photo_similaire]
-                        img_redimensionnee = cv2.resize(img_photo, (x_end - x, y_end - y))
-                        resultat[y:y_end, x:x_end] = img_redimensionnee
+                # Premier candidat libre de chaque bloc (le plus proche si aucun ne l'est)
+                pris = (classe[..., :, None] == voisins[..., None, :]).any(axis=-1)
+                libres = ~pris
+                rang = np.where(libres.any(axis=-1), libres.argmax(axis=-1), 0)
+                retenus = np.take_along_axis(classe, rang[..., None], axis=-1)[..., 0]
+                zone = choix[rayon + a:rayon + a + (n_l - 1) * pas + 1:pas,
+                             rayon + b:rayon + b + (n_c - 1) * pas + 1:pas]
+                # Les blocs fixés gardent leur photo
+                np.copyto(zone, retenus, where=zone < 0)
+        
+        return choix[rayon:rayon + lignes, rayon:rayon + colonnes]
+    
+    def tampon_calcul(self, nom, forme, dtype=np.float64):
+        """Tableau de travail non initialisé, le même à chaque frame pour un nom et une forme donnés"""
+        tampon = self.tampons_calcul.get(nom)
+        if tampon is None or tampon.shape != forme or tampon.dtype != dtype:
+            tampon = self.tampons_calcul[nom] = np.empty(forme, dtype)
+        return tampon
+    
+    def integrale(self, image, nom='integrale'):
+        """Image intégrale (hauteur + 1, largeur + 1, 3) en float64, calculée dans un tampon réutilisé"""
+        hauteur, largeur = image.shape[:2]
+        return cv2.integral(image, self.tampon_calcul(nom, (hauteur + 1, largeur + 1, 3)), sdepth=cv2.CV_64F)
+    
+    @staticmethod
+    def sommes_blocs(integrale, taille_pixel):
+        """Sommes des couleurs (lignes, colonnes, 3) et aires (lignes, colonnes, 1) des blocs, lues sur l'image intégrale"""
+        hauteur, largeur = integrale.shape[0] - 1, integrale.shape[1] - 1
+        
+        # Bornes des blocs, les derniers peuvent être plus petits (bords droit et bas)
+        bornes_y = np.append(np.arange(0, hauteur, taille_pixel), hauteur)
+        bornes_x = np.append(np.arange(0, largeur, taille_pixel), largeur)
+        
+        # La somme d'un bloc se lit sur ses quatre coins
+        coins = integrale[bornes_y][:, bornes_x]
+        sommes = coins[1:, 1:] - coins[:-1, 1:] - coins[1:, :-1] + coins[:-1, :-1]
+        
+        aires = np.outer(np.diff(bornes_y), np.diff(bornes_x))[..., None]
+        return sommes, aires
+    
+    def calculer_moyennes_blocs(self, frame, taille_pixel=20):
+        """Calcule d'un coup la couleur moyenne de chaque bloc de la frame (lignes, colonnes, 3)"""
+        sommes, aires = self.sommes_blocs(self.integrale(frame), taille_pixel)
+        return sommes / aires
+    
+    def calculer_descripteurs_blocs(self, frame, taille_pixel=20):
+        """Descripteurs de chaque bloc de la frame (lignes, colonnes, dimensions), comparables à ceux des photos"""
+        if not self.grille_descripteur:
+            return self.calculer_moyennes_blocs(frame, taille_pixel)
+        return self.descripteurs_grille(self.integrale_lab(frame), taille_pixel)
+    
+    def calculer_descripteurs_tailles(self, frame, tailles):
+        """Descripteurs des blocs de la frame pour plusieurs tailles de blocs, en une seule analyse: {taille: descripteurs}
+        
+        L'image intégrale n'est calculée qu'une fois. En BGR, les sommes des blocs d'une taille
+        multiple d'une taille plus fine sont regroupées à partir de la grille fine: les bornes de la
+        grille grossière, bords compris, sont aussi des bornes de la fine. Les moyennes obtenues sont
+        exactement celles de calculer_descripteurs_blocs.
+        """
+        tailles = sorted(set(tailles))
+        if self.grille_descripteur:
+            integrale = self.integrale_lab(frame)
+            return {taille: self.descripteurs_grille(integrale, taille) for taille in tailles}
+        
+        integrale = None
+        sommes = {}
+        for taille in tailles:
+            # La plus grande des tailles déjà calculées qui divise celle-ci
+            fine = next((t for t in reversed(list(sommes)) if taille % t == 0), None)
+            if fine is not None:
+                sommes[taille] = tuple(self.regrouper_blocs(t, taille // fine) for t in sommes[fine])
+            else:
+                integrale = self.integrale(frame) if integrale is None else integrale
+                sommes[taille] = self.sommes_blocs(integrale, taille)
+        return {taille: s / aires for taille, (s, aires) in sommes.items()}
+    
+    def descripteurs_grille(self, integrale, taille_pixel):
+        """Descripteurs Lab des blocs de la grille de taille taille_pixel, à partir de l'intégrale du Lab de la frame"""
+        hauteur, largeur = integrale.shape[0] - 1, integrale.shape[1] - 1
+        debuts_y = np.arange(0, hauteur, taille_pixel)
+        debuts_x = np.arange(0, largeur, taille_pixel)
+        y0, x0 = np.meshgrid(debuts_y, debuts_x, indexing='ij')
+        return self.descripteurs_rectangles(integrale, y0, np.minimum(y0 + taille_pixel, hauteur),
+                                            x0, np.minimum(x0 + taille_pixel, largeur))
+    
+    def integrale_lab(self, frame):
+        """Image intégrale de la frame convertie en Lab 8 bits (voir descripteurs_rectangles)"""
+        # La conversion 8 bits est deux fois plus rapide; son échelle est corrigée après les moyennes
+        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2Lab, self.tampon_calcul('lab', frame.shape, np.uint8))
+        return self.integrale(lab, 'integrale_lab')
+    
+    def descripteurs_rectangles(self, integrale, y0, y1, x0, x1):
+        """Couleurs Lab moyennes d'une grille de g x g sous-blocs pour des rectangles [y0, y1) x [x0, x1) quelconques
+        
+        L'intégrale est celle du Lab 8 bits d'OpenCV, ramené ici à l'échelle des signatures des photos
+        (L 0-100, a et b centrés sur 0). Un sous-bloc vide (rectangle de moins de g pixels de côté)
+        reprend la moyenne du rectangle.
+        """
+        g = self.grille_descripteur
+        j = np.arange(g + 1)
+        ys = y0[..., None] + ((y1 - y0)[..., None] * j) // g
+        xs = x0[..., None] + ((x1 - x0)[..., None] * j) // g
+        coins = integrale[ys[..., :, None], xs[..., None, :]]
+        sommes = coins[..., 1:, 1:, :] - coins[..., :-1, 1:, :] - coins[..., 1:, :-1, :] + coins[..., :-1, :-1, :]
+        aires = (np.diff(ys)[..., :, None] * np.diff(xs)[..., None, :])[..., None]
+        moyennes = sommes / np.maximum(aires, 1)
+        if g > 1 and not aires.all():
+            totales = sommes.sum(axis=(-3, -2)) / ((y1 - y0) * (x1 - x0))[..., None]
+            moyennes = np.where(aires > 0, moyennes, totales[..., None, None, :])
+        moyennes = moyennes * self.ECHELLE_LAB - self.DECALAGE_LAB
+        return moyennes.reshape(y0.shape + (-1,))
+    
+    def preparer_atlas(self, tailles):
+        """Prépare les atlas de tuiles (n_photos, hauteur, largeur, 3) des tailles demandées (voir MagasinTuiles)"""
+        tailles = list(dict.fromkeys(tailles))
+        # Dans un processus de rendu, les atlas partagés par le processus principal sont déjà tous là
+        construits = self.atlas_tuiles.preparer(tailles) if isinstance(self.atlas_tuiles, MagasinTuiles) else 0
+        self.suivi.compter_cache('atlas', len(tailles) - construits, construits)
+    
+    def completer_atlas(self, tailles):
+        """Prépare seulement les atlas qui manquent encore (les rendus les préparent tous d'avance, une fois)"""
+        manquantes = [t for t in dict.fromkeys(tailles) if t not in self.atlas_tuiles]
+        if manquantes:
+            self.preparer_atlas(manquantes)
+    
+    def tailles_atlas(self, hauteur, largeur, taille_pixel):
+        """Tailles de tuiles nécessaires pour une frame: blocs pleins et blocs coupés des bords"""
+        reste_y = hauteur % taille_pixel
+        reste_x = largeur % taille_pixel
+        hauteurs = ([taille_pixel] if hauteur >= taille_pixel else []) + ([reste_y] if reste_y else [])
+        largeurs = ([taille_pixel] if largeur >= taille_pixel else []) + ([reste_x] if reste_x else [])
+        return [(h, l) for h in hauteurs for l in largeurs]
+    
+    def tailles_rendu(self, hauteur, largeur, taille_pixel):
+        """Tailles de tuiles que le rendu d'une frame peut utiliser (tous les niveaux en mode adaptatif)"""
+        if not self.taille_min_adaptative:
+            return self.tailles_atlas(hauteur, largeur, taille_pixel)
+        return [t for niveau in self.niveaux_adaptatifs(taille_pixel) for t in self.tailles_atlas(hauteur, largeur, niveau)]
+    
+    def assembler_mosaique(self, grille_indices, hauteur, largeur, taille_pixel=20, resultat=None):
+        """Assemble la frame mosaïque à partir de la grille des indices de photos (dans resultat s'il est donné)"""
+        self.completer_atlas(self.tailles_atlas(hauteur, largeur, taille_pixel))
+        if resultat is None:
+            resultat = np.empty((hauteur, largeur, 3), dtype=np.uint8)
+        
+        p = taille_pixel
+        lignes = hauteur // p
+        colonnes = largeur // p
+        reste_y = hauteur - lignes * p
+        reste_x = largeur - colonnes * p
+        
+        # Blocs pleins: lecture indexée dans l'atlas écrite directement dans une vue (lignes, p, colonnes, p, 3) de la frame
+        if lignes and colonnes:
+            vue = resultat[:lignes * p, :colonnes * p].reshape(lignes, p, colonnes, p, 3)
+            np.take(self.atlas_tuiles[(p, p)], grille_indices[:lignes, :colonnes], axis=0,
+                    out=vue.transpose(0, 2, 1, 3, 4), mode='clip')
+        
+        # Bords droit et bas, puis le coin, avec leurs propres atlas
+        if reste_x and lignes:
+            blocs = self.atlas_tuiles[(p, reste_x)][grille_indices[:lignes, colonnes]]
+            resultat[:lignes * p, colonnes * p:] = blocs.reshape(lignes * p, reste_x, 3)
+        if reste_y and colonnes:
+            blocs = self.atlas_tuiles[(reste_y, p)][grille_indices[lignes, :colonnes]]
+            resultat[lignes * p:, :colonnes * p] = blocs.transpose(1, 0, 2, 3).reshape(reste_y, colonnes * p, 3)
+        if reste_y and reste_x:
+            resultat[lignes * p:, colonnes * p:] = self.atlas_tuiles[(reste_y, reste_x)][grille_indices[lignes, colonnes]]
+        
+        return resultat
+    
+    def creer_mosaique_frame(self, frame, taille_pixel=20, resultat=None, descripteurs=None):
+        """Crée une mosaïque pour une frame de la vidéo (dans resultat, un tableau de la taille de la frame, s'il est donné)
+        
+        descripteurs: ceux des blocs de la frame s'ils sont déjà calculés (voir calculer_descripteurs_tailles).
+        """
+        hauteur, largeur = frame.shape[:2]
+        if self.index_couleurs is None:
+            if resultat is None:
+                return np.zeros((hauteur, largeur, 3), dtype=np.uint8)
+            resultat[...] = 0
+            return resultat
+        if self.taille_min_adaptative:
+            self.derniere_grille = None
+            return self.creer_mosaique_frame_adaptative(frame, taille_pixel, resultat)
+        
+        # Analyse, recherche et assemblage, chacun sur la frame entière
+        if descripteurs is not None:
+            moyennes = descripteurs
+        else:
+            with self.suivi.mesurer('analyse'):
+                moyennes = self.calculer_descripteurs_blocs(frame, taille_pixel)
+        with self.suivi.mesurer('recherche'):
+            grille_indices = self.derniere_grille = self.trouver_photos_similaires(moyennes)
+        with self.suivi.mesurer('assemblage'):
+            return self.assembler_mosaique(grille_indices, hauteur, largeur, taille_pixel, resultat)
+    
+    def coller_blocs(self, resultat, grille_indices, lignes, colonnes, taille_pixel):
+        """Recolle seulement les blocs (lignes[i], colonnes[i]) de la grille dans une frame déjà assemblée"""
+        hauteur, largeur = resultat.shape[:2]
+        p = taille_pixel
+        lignes_pleines = hauteur // p
+        colonnes_pleines = largeur // p
+        
+        # Blocs pleins: écriture indexée dans une vue (lignes, p, colonnes, p, 3) de la frame
+        pleins = (lignes < lignes_pleines) & (colonnes < colonnes_pleines)
+        if pleins.any():
+            vue = resultat[:lignes_pleines * p, :colonnes_pleines * p].reshape(lignes_pleines, p, colonnes_pleines, p, 3)
+            l, c = lignes[pleins], colonnes[pleins]
+            vue[l, :, c] = self.atlas_tuiles[(p, p)][grille_indices[l, c]]
+        
+        # Blocs coupés des bords, peu nombreux
+        for l, c in zip(lignes[~pleins], colonnes[~pleins]):
+            y, x = l * p, c * p
+            y_end, x_end = min(y + p, hauteur), min(x + p, largeur)
+            resultat[y:y_end, x:x_end] = self.atlas_tuiles[(y_end - y, x_end - x)][grille_indices[l, c]]
+    
+    def niveaux_adaptatifs(self, taille_max):
+        """Tailles des niveaux du quadtree, de la plus grande à la plus petite: min, 2×min, 4×min... jusqu'à taille_max"""
+        niveaux = [self.taille_min_adaptative]
+        while niveaux[-1] * 2 <= taille_max:
+            niveaux.append(niveaux[-1] * 2)
+        return niveaux[::-1]
+    
+    def calculer_blocs_adaptatifs(self, frame, taille_max=20):
+        """Découpe la frame en quadtree selon la variance de couleur des blocs
+        
+        La variance d'un bloc est celle des couleurs moyennes de ses sous-blocs de taille minimale
+        (un détail plus fin que la plus petite tuile ne peut pas être rendu). Un bloc dont la variance
+        moyenne par canal dépasse seuil_variance est coupé en quatre, jusqu'à la taille minimale.
+        Renvoie {taille: (lignes, colonnes, moyennes)} où lignes et colonnes repèrent les blocs
+        gardés dans la grille de leur taille.
+        """
+        hauteur, largeur = frame.shape[:2]
+        niveaux = self.niveaux_adaptatifs(taille_max)
+        
+        # Sommes des blocs de taille minimale (image intégrale), puis regroupées deux par deux vers le haut
+        sommes, aires = self.sommes_blocs(self.integrale(frame), niveaux[-1])
+        aires = aires.astype(np.float64)
+        pyramide = [(sommes, sommes ** 2 / aires, aires)]
+        for _ in niveaux[1:]:
+            pyramide.append(tuple(self.regrouper_blocs(t) for t in pyramide[-1]))
+        pyramide.reverse()
+        
+        lignes, colonnes = np.nonzero(np.ones(pyramide[0][2].shape[:2], dtype=bool))
+        blocs = {}
+        for i, taille in enumerate(niveaux):
+            sommes, carres, aires = (t[lignes, colonnes] for t in pyramide[i])
+            moyennes = sommes / aires
+            if i == len(niveaux) - 1:
+                blocs[taille] = (lignes, colonnes, moyennes)
+                break
+            
+            coupes = (carres / aires - moyennes ** 2).mean(axis=1) > self.seuil_variance
+            blocs[taille] = (lignes[~coupes], colonnes[~coupes], moyennes[~coupes])
+            
+            # Les quatre enfants de chaque bloc coupé, hors de la frame exclus
+            lignes = (2 * lignes[coupes, None] + np.array([0, 0, 1, 1])).ravel()
+            colonnes = (2 * colonnes[coupes, None] + np.array([0, 1, 0, 1])).ravel()
+            dedans = (lignes < pyramide[i + 1][2].shape[0]) & (colonnes < pyramide[i + 1][2].shape[1])
+            lignes, colonnes = lignes[dedans], colonnes[dedans]
+        return blocs
+    
+    @staticmethod
+    def regrouper_blocs(tableau, facteur=2):
+        """Somme des blocs facteur×facteur d'une grille (lignes, colonnes, ...), les bords incomplets complétés par des zéros"""
+        lignes, colonnes = tableau.shape[:2]
+        marge = [(0, -lignes % facteur), (0, -colonnes % facteur)] + [(0, 0)] * (tableau.ndim - 2)
+        tableau = np.pad(tableau, marge)
+        return tableau.reshape(tableau.shape[0] // facteur, facteur, tableau.shape[1] // facteur, facteur,
+                               *tableau.shape[2:]).sum(axis=(1, 3))
+    
+    def creer_mosaique_frame_adaptative(self, frame, taille_max=20, resultat=None):
+        """Crée la mosaïque avec de grandes tuiles dans les zones unies et de petites dans les détails"""
+        hauteur, largeur = frame.shape[:2]
+        with self.suivi.mesurer('analyse'):
+            blocs = self.calculer_blocs_adaptatifs(frame, taille_max)
+            if self.grille_descripteur:
+                # Le découpage reste fait sur les couleurs BGR, la recherche sur les descripteurs des blocs gardés
+                integrale = self.integrale_lab(frame)
+                for taille, (lignes, colonnes, _) in blocs.items():
+                    y0, x0 = lignes * taille, colonnes * taille
+                    blocs[taille] = (lignes, colonnes, self.descripteurs_rectangles(
+                        integrale, y0, np.minimum(y0 + taille, hauteur), x0, np.minimum(x0 + taille, largeur)))
+        
+        # Une seule recherche pour les blocs de toutes les tailles
+        with self.suivi.mesurer('recherche'):
+            indices = self.trouver_photos_similaires(np.concatenate([m for _, _, m in blocs.values()]))
+        
+        with self.suivi.mesurer('assemblage'):
+            self.completer_atlas(self.tailles_rendu(hauteur, largeur, taille_max))
+            if resultat is None:
+                resultat = np.empty((hauteur, largeur, 3), dtype=np.uint8)
+            debut = 0
+            for taille, (lignes, colonnes, _) in blocs.items():
+                if not len(lignes):
+                    continue
+                grille = np.zeros((-(-hauteur // taille), -(-largeur // taille)), dtype=np.intp)
+                grille[lignes, colonnes] = indices[debut:debut + len(lignes)]
+                debut += len(lignes)
+                self.coller_blocs(resultat, grille, lignes, colonnes, taille)
+        return resultat
+    
+    def reinitialiser_incremental(self):
+        """Oublie la frame précédente du mode incrémental"""
+        self.etat_incremental = None
+    
+    def creer_mosaique_frame_incrementale(self, frame, taille_pixel=20, resultat=None, descripteurs=None):
+        """Crée la mosaïque en ne recherchant que les blocs dont la couleur a changé depuis leur dernière recherche"""
+        hauteur, largeur = frame.shape[:2]
+        etat = self.etat_incremental
+        if self.index_couleurs is None:
+            return self.creer_mosaique_frame(frame, taille_pixel, resultat)
+        if etat is None or etat['cle'] != (hauteur, largeur, taille_pixel):
+            with self.suivi.mesurer('analyse'):
+                moyennes = descripteurs if descripteurs is not None else self.calculer_descripteurs_blocs(frame, taille_pixel)
+            with self.suivi.mesurer('recherche'):
+                grille_indices = self.trouver_photos_similaires(moyennes)
+            with self.suivi.mesurer('assemblage'):
+                mosaique = self.assembler_mosaique(grille_indices, hauteur, largeur, taille_pixel)
+            # Les moyennes gardées sont modifiées sur place: pas de partage avec des descripteurs reçus
+            if descripteurs is not None:
+                moyennes = moyennes.copy()
+            etat = self.etat_incremental = {'cle': (hauteur, largeur, taille_pixel), 'moyennes': moyennes,
+                                            'grille': grille_indices, 'resultat': mosaique}
+            self.derniere_grille = grille_indices
+            return self.copier_resultat(etat['resultat'], resultat)
+        
+        # Les moyennes de référence sont celles de la dernière recherche de chaque bloc:
+        # une lente dérive finit par être prise en compte, le bruit d'une frame à l'autre non
+        with self.suivi.mesurer('analyse'):
+            moyennes = descripteurs if descripteurs is not None else self.calculer_descripteurs_blocs(frame, taille_pixel)
+            ecart = np.linalg.norm(moyennes - etat['moyennes'], axis=-1)
+            lignes, colonnes = np.nonzero(ecart > self.seuil_incremental)
+        self.suivi.compter_cache('blocs', ecart.size - len(lignes), len(lignes))
+        
+        if len(lignes):
+            etat['moyennes'][lignes, colonnes] = moyennes[lignes, colonnes]
+            with self.suivi.mesurer('recherche'):
+                self.trouver_photos_blocs(moyennes, etat['grille'], lignes, colonnes)
+            with self.suivi.mesurer('assemblage'):
+                self.coller_blocs(etat['resultat'], etat['grille'], lignes, colonnes, taille_pixel)
         
+        # Le reste de la frame précédente est réutilisé tel quel
+        self.derniere_grille = etat['grille']
+        return self.copier_resultat(etat['resultat'], resultat)
+    
+    @staticmethod
+    def copier_resultat(mosaique, resultat=None):
+        """Copie de la mosaïque gardée par le mode incrémental, dans resultat s'il est donné"""
+        if resultat is None:
+            return mosaique.copy()
+        np.copyto(resultat, mosaique)
         return resultat
     
-    def traiter_video(self, chemin_video, taille_pixel=20, fps_output=10):
-        """Traite une vidéo complète en mosaïque photographique"""
-        print(f"🎬 Traitement de la vidéo: {chemin_video}")
+    def mosaique_frame(self, frame, taille_pixel=20, resultat=None, descripteurs=None):
+        """Mosaïque d'une frame déjà passée par les effets d'entrée, incrémentale si demandé"""
+        if self.seuil_incremental is not None:
+            return self.creer_mosaique_frame_incrementale(frame, taille_pixel, resultat, descripteurs)
+        return self.creer_mosaique_frame(frame, taille_pixel, resultat, descripteurs)
+    
+    def rendre_frame(self, frame, taille_pixel=20, resultat=None):
+        """Rend une frame de la vidéo: effets sur la source, mosaïque (incrémentale si demandé), effets sur la mosaïque
+        
+        resultat (optionnel) reçoit la frame rendue, effets compris.
+        """
+        frame = self.effets_entree(frame)
+        mosaique = self.mosaique_frame(frame, taille_pixel, self.tampon_mosaique(frame.shape, resultat))
+        return self.effets_sortie(mosaique, resultat)
+    
+    def effets_entree(self, frame):
+        """Frame passée par les effets d'entrée, dans un tableau de travail réutilisé (la frame elle-même sans effet)"""
+        if not self.effets_avant:
+            return frame
+        with self.suivi.mesurer('effets'):
+            return self.effets_avant.appliquer(frame, self.tampon_calcul('effets_avant', frame.shape, np.uint8))
+    
+    def tampon_mosaique(self, forme, resultat=None):
+        """Où assembler la mosaïque: dans resultat, ou dans un tableau de travail quand les effets de sortie écrivent dans resultat"""
+        if not self.effets_apres:
+            return resultat
+        return self.tampon_calcul('mosaique', tuple(forme), np.uint8)
+    
+    def effets_sortie(self, mosaique, resultat=None):
+        """Mosaïque passée par les effets de sortie, écrite dans resultat s'il est donné"""
+        if not self.effets_apres:
+            return mosaique
+        with self.suivi.mesurer('effets'):
+            return self.effets_apres.appliquer(mosaique, resultat)
+    
+    def rendre_grille(self, grille_indices, hauteur, largeur, taille_pixel=20, resultat=None):
+        """Rend une frame à partir de sa grille d'indices de photos (cache des grilles): assemblage et effets sur la mosaïque"""
+        with self.suivi.mesurer('assemblage'):
+            mosaique = self.assembler_mosaique(grille_indices, hauteur, largeur, taille_pixel,
+                                               self.tampon_mosaique((hauteur, largeur, 3), resultat))
+        return self.effets_sortie(mosaique, resultat)
+    
+    def cle_grilles(self, chemin_video, taille_pixel, fps_output, debut=None, fin=None):
+        """Clé du cache des grilles pour un rendu, None si le cache ne s'applique pas (tuiles adaptatives)"""
+        if self.cache_grilles is None or self.taille_min_adaptative or self.bibliotheque is None:
+            return None
+        parametres = {'taille_pixel': taille_pixel, 'fps': float(fps_output), 'debut': debut, 'fin': fin,
+                      'descripteur': self.descripteur, 'niveaux_table': self.niveaux_table,
+                      'diversite': self.diversite, 'rayon_diversite': self.rayon_diversite,
+                      'seuil_incremental': self.seuil_incremental, 'effets_avant': self.effets_avant.descriptions}
+        return self.cache_grilles.cle(chemin_video, self.bibliotheque.empreinte(), parametres)
+    
+    def traiter_video(self, chemin_video, taille_pixel=20, fps_output=10, workers=1, debut=None, fin=None,
+                      duree_segment=None, annulation=None, sortie=None):
+        """Traite une vidéo complète (ou l'intervalle debut-fin, en secondes) en mosaïque photographique
+        
+        sortie (voir sorties_video) reçoit les frames rendues; par défaut une vidéo mp4 dans
+        video_mosaic_output/. Avec le cache des grilles, un rendu déjà fait avec la même vidéo, les
+        mêmes photos et les mêmes paramètres de choix des photos n'est ni décodé ni analysé: les
+        tuiles sont collées d'après les grilles enregistrées. Renvoie le résultat de la sortie (chemin, ou tableau des frames pour
+        une SortieMemoire).
+        annulation (threading.Event, optionnel) arrête proprement le traitement quand il est levé:
+        plus aucune frame n'est décodée, la sortie partielle est supprimée et None est renvoyé.
+        """
+        self.afficher(f"🎬 Traitement de la vidéo: {chemin_video}")
         
         # Ouvrir la vidéo
         cap = cv2.VideoCapture(chemin_video)
@@ -164,69 +715,278 @@ class VideoMosaic:
             return
         
         # Obtenir les propriétés de la vidéo
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        fps = cap.get(cv2.CAP_PROP_FPS)
         largeur = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         hauteur = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        print(f"📊 Propriétés vidéo: {largeur}x{hauteur}, {fps} FPS, {total_frames} frames")
+        self.afficher(f"📊 Propriétés vidéo: {largeur}x{hauteur}, {fps:g} FPS, {total_frames} frames")
+        
+        # Frames choisies par horodatage, les autres ne sont pas décodées; frames sources et mosaïques
+        # passent par des tampons réutilisés, rendus une fois rendus ou écrits
+        tampons_entree = PoolTampons((hauteur, largeur, 3))
+        tampons_sortie = PoolTampons((hauteur, largeur, 3))
+        echantillonneur = EchantillonneurVideo(cap, fps_output, debut, fin, tampons_entree)
+        total_sortie = echantillonneur.nombre_frames
         
         # Créer le dossier de sortie
         dossier_sortie = "video_mosaic_output"
         Path(dossier_sortie).mkdir(exist_ok=True)
         
-        # Préparer le writer vidéo
         nom_sortie = os.path.join(dossier_sortie, f"mosaic_{os.path.basename(chemin_video)}")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(nom_sortie, fourcc, fps_output, (largeur, hauteur))
         
-        frame_count = 0
-        frames_traitees = 0
+        # Longues vidéos: segments rendus dans des processus séparés, reprenables après une interruption
+        if duree_segment:
+            cap.release()
+            if sortie is not None and not isinstance(sortie, SortieMP4):
+                print("⚠️  Le rendu par segments écrit une vidéo mp4: sortie ignorée")
+            elif sortie is not None:
+                nom_sortie = sortie.chemin
+            rendu_segments = RenduSegments(self, chemin_video, nom_sortie, taille_pixel, fps_output,
+                                           duree_segment, workers, debut, fin, annulation)
+            nom_sortie = rendu_segments.executer()
+            if nom_sortie:
+                self.afficher(f"📁 Sauvegardée: {nom_sortie}")
+            return nom_sortie
         
-        print("🎨 Début du traitement des frames...")
+        # Les frames sont écrites en arrière-plan par la sortie
+        sortie = sortie or SortieMP4(nom_sortie)
+        sortie.preparer(largeur, hauteur, fps_output)
+        sortie.liberer = tampons_sortie.rendre
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Traiter seulement une frame sur plusieurs pour accélérer
-            if frame_count % max(1, fps // fps_output) == 0:
-                print(f"   Frame {frame_count}/{total_frames} ({frame_count/total_frames*100:.1f}%)")
-                
-                # Créer la mosaïque
-                frame_mosaique = self.creer_mosaique_frame(frame, taille_pixel)
-                
-                # Écrire la frame
-                out.write(frame_mosaique)
-                frames_traitees += 1
+        # Grilles d'un rendu identique déjà faites: ni décodage, ni analyse, ni recherche
+        cle = self.cle_grilles(chemin_video, taille_pixel, fps_output, debut, fin) if self.index_couleurs else None
+        grilles, enregistreur = (self.cache_grilles.lire(cle)[0] if cle else None), None
+        if grilles is not None:
+            self.afficher(f"🗃️  Grilles en cache ({len(grilles)} frames): décodage, analyse et recherche évités")
+            total_sortie = len(grilles)
+            workers = 1
+        elif cle:
+            enregistreur = self.cache_grilles.enregistreur(cle, len(self.index_couleurs.moyennes), hauteur=hauteur,
+                                                           largeur=largeur, taille_pixel=taille_pixel)
+        if cle:
+            self.suivi.compter_cache('grilles', int(grilles is not None), int(grilles is None))
         
-        # Nettoyer
-        cap.release()
-        out.release()
+        # Le mode incrémental s'appuie sur la frame précédente: rendu sur un seul processus
+        if self.seuil_incremental is not None and workers > 1:
+            print("⚠️  Mode incrémental: rendu sur un seul processus")
+            workers = 1
+        self.reinitialiser_incremental()
+        
+        # Atlas préparés une fois pour tout le rendu (par exporter_etat_rendu en rendu parallèle)
+        if self.index_couleurs is not None and workers == 1:
+            self.preparer_atlas(self.tailles_rendu(hauteur, largeur, taille_pixel))
+        
+        # Rendu sur plusieurs processus: l'atlas et l'index sont partagés en lecture seule
+        rendu = None
+        if workers > 1:
+            rendu = RenduParallele(self, hauteur, largeur, taille_pixel, workers, tampons_entree.rendre,
+                                   avec_grilles=enregistreur is not None)
+            self.afficher(f"⚙️  Rendu parallèle sur {workers} processus")
+        
+        suivi = self.suivi
+        
+        sortie_fermee = []
+        
+        def frames_a_traiter():
+            elements = iter(grilles) if grilles is not None else (frame for _, _, frame in echantillonneur)
+            while not (annulation and annulation.is_set()) and not sortie_fermee:
+                with suivi.mesurer('decodage'):
+                    element = next(elements, None)
+                if element is None:
+                    return
+                yield element
+        
+        def enregistrer(pretes):
+            # Les frames arrivent dans l'ordre, avec leur grille à mettre en cache
+            if enregistreur is None:
+                return pretes
+            for _, grille in pretes:
+                enregistreur.ajouter(grille)
+            return [frame for frame, _ in pretes]
+        
+        def rendre(element):
+            if grilles is not None:
+                return [self.rendre_grille(element, hauteur, largeur, taille_pixel, tampons_sortie.prendre())]
+            if rendu:
+                # Les étapes détaillées sont mesurées dans les processus de rendu
+                with suivi.mesurer('rendu'):
+                    return enregistrer(rendu.soumettre(element))
+            resultat = self.rendre_frame(element, taille_pixel, tampons_sortie.prendre())
+            tampons_entree.rendre(element)
+            return enregistrer([(resultat, self.derniere_grille)] if enregistreur else [resultat])
         
-        print(f"✅ Vidéo traitée! {frames_traitees} frames créées")
-        print(f"📁 Sauvegardée: {nom_sortie}")
+        def ecrire(frame_mosaique):
+            # Les observateurs voient la frame avant la sortie, qui peut la rendre au pool dès qu'elle est écrite
+            suivi.frames_terminees(frame=frame_mosaique)
+            with suivi.mesurer('encodage'):
+                if not sortie.ecrire(frame_mosaique):
+                    # Le lecteur du flux est parti: plus rien à décoder
+                    sortie_fermee.append(True)
         
-        return nom_sortie
+        self.afficher("🎨 Début du traitement des frames...")
+        suivi.commencer(total_sortie)
+        
+        # Décodage, rendu et encodage se recouvrent, reliés par des files bornées
+        pipeline = PipelineVideo()
+        try:
+            stats = pipeline.executer(frames_a_traiter(), rendre, ecrire,
+                                      (lambda: enregistrer(rendu.terminer())) if rendu else None)
+        except BaseException:
+            sortie.abandonner()
+            if enregistreur:
+                enregistreur.abandonner()
+            raise
+        finally:
+            # Nettoyer
+            if rendu:
+                rendu.fermer()
+            cap.release()
+        
+        frames_traitees = stats['encodage']['elements']
+        self.statistiques_pipeline = stats
+        if enregistreur:
+            # Seul un rendu allé jusqu'au bout de la vidéo laisse ses grilles dans le cache
+            if (annulation and annulation.is_set()) or sortie_fermee:
+                enregistreur.abandonner()
+            else:
+                enregistreur.terminer()
+        if annulation and annulation.is_set():
+            sortie.abandonner()
+            suivi.terminer()
+            print(f"⏹️  Traitement annulé après {frames_traitees} frames")
+            return None
+        with suivi.mesurer('encodage'):
+            resultat = sortie.fermer()
+        suivi.terminer()
+        for nom, etape in stats.items():
+            self.afficher(f"   ⏱️  {nom}: {etape['debit']:.1f} frames/s, occupation {etape['occupation']*100:.0f}%, "
+                          f"file moyenne {etape['profondeur_file_moyenne']:.1f} (max {etape['profondeur_file_max']})")
+        
+        self.afficher(f"✅ Vidéo traitée! {frames_traitees} frames créées")
+        if isinstance(resultat, str):
+            self.afficher(f"📁 Sauvegardée: {resultat}")
+        
+        return resultat
     
-    def creer_video_demo(self):
-        """Crée une vidéo de démonstration si aucune vidéo n'est fournie"""
-        print("🎬 Création d'une vidéo de démonstration...")
+    def traiter_variantes(self, chemin_video, variantes, debut=None, fin=None, annulation=None, sorties=None):
+        """Rend plusieurs variantes (taille_pixel, fps) d'une vidéo en ne la décodant et ne l'analysant qu'une fois
         
-        # Créer une vidéo simple avec des formes animées
-        largeur, hauteur = 640, 480
-        fps = 30
-        duree = 5  # secondes
+        sorties: une sortie par variante (voir sorties_video); par défaut des vidéos mp4
+        video_mosaic_output/mosaic_<taille>px_<fps>fps_<nom>. Renvoie la liste des résultats des
+        sorties, ou None si le traitement est annulé ou la vidéo illisible. Le rendu se fait sur
+        un seul processus, décodage et encodage en parallèle.
+        """
+        self.afficher(f"🎬 Traitement de la vidéo en {len(variantes)} variantes: {chemin_video}")
+        if sorties is None:
+            Path("video_mosaic_output").mkdir(exist_ok=True)
+            sorties = [SortieMP4(os.path.join("video_mosaic_output", self.nom_variante(chemin_video, taille, fps)))
+                       for taille, fps in variantes]
+        if len(sorties) != len(variantes):
+            raise ValueError(f"{len(variantes)} variantes pour {len(sorties)} sorties")
+        resultats = RenduVariantes(self, chemin_video, variantes, sorties, debut, fin, annulation).executer()
+        for resultat in resultats or []:
+            if isinstance(resultat, str):
+                self.afficher(f"📁 Sauvegardée: {resultat}")
+        return resultats
+    
+    @staticmethod
+    def nom_variante(chemin_video, taille_pixel, fps, extension=None):
+        """Nom du fichier d'une variante: mosaic_<taille>px_<fps>fps_<nom de la vidéo>"""
+        nom = f"mosaic_{taille_pixel}px_{fps:g}fps_{os.path.basename(chemin_video)}"
+        if extension is not None:
+            nom = os.path.splitext(nom)[0] + extension
+        return nom
+    
+    def planche_apercu(self, chemin_video, tailles_pixel=(20,), nombre=6, echelle=0.5, debut=None, fin=None,
+                       colonnes=None, largeur_vignette=None):
+        """Planche contact de `nombre` frames réparties sur la vidéo, rendues à échelle réduite
+        
+        Chaque frame est lue directement à son instant, réduite d'un facteur echelle avec ses tuiles,
+        puis rendue avec les options de la mosaïque: l'aspect du rendu final se juge en quelques
+        secondes. Avec plusieurs tailles de tuiles, chaque ligne de la planche correspond à une taille.
+        largeur_vignette borne la largeur des frames réduites (l'échelle est alors diminuée).
+        Renvoie l'image BGR de la planche, ou None si la vidéo ne peut pas être lue.
+        """
+        tailles_pixel = [tailles_pixel] if isinstance(tailles_pixel, int) else list(tailles_pixel)
+        cap = cv2.VideoCapture(chemin_video)
+        if not cap.isOpened():
+            print(f"❌ Impossible d'ouvrir la vidéo: {chemin_video}")
+            return None
+        
+        try:
+            echantillonneur = EchantillonneurVideo(cap, 1, debut, fin)
+            if largeur_vignette:
+                echelle = min(echelle, largeur_vignette / cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            duree = (echantillonneur.fin if echantillonneur.fin is not None else echantillonneur.debut) - echantillonneur.debut
+            instants = [echantillonneur.debut + (i + 0.5) * duree / nombre for i in range(nombre)]
+            frames = []
+            for instant in instants:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, echantillonneur.frame_source(instant))
+                ret, frame = cap.read()
+                if ret:
+                    frames.append((instant, cv2.resize(frame, None, fx=echelle, fy=echelle, interpolation=cv2.INTER_AREA)))
+        finally:
+            cap.release()
+        if not frames:
+            print(f"❌ Aucune frame lisible dans: {chemin_video}")
+            return None
+        
+        vignettes = []
+        if self.index_couleurs is not None:
+            hauteur_reduite, largeur_reduite = frames[0][1].shape[:2]
+            self.preparer_atlas([t for taille_pixel in tailles_pixel for t in self.tailles_rendu(
+                hauteur_reduite, largeur_reduite, max(2, int(round(taille_pixel * echelle))))])
+        for taille_pixel in tailles_pixel:
+            taille_reduite = max(2, int(round(taille_pixel * echelle)))
+            for instant, frame in frames:
+                # Chaque frame est indépendante: pas de mosaïque précédente pour le mode incrémental
+                self.reinitialiser_incremental()
+                vignette = self.rendre_frame(frame, taille_reduite)
+                texte = f"{instant:.1f}s - {taille_pixel}px"
+                cv2.putText(vignette, texte, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+                cv2.putText(vignette, texte, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+                vignettes.append(vignette)
+        self.reinitialiser_incremental()
         
+        colonnes = colonnes or (len(frames) if len(tailles_pixel) > 1 else math.ceil(math.sqrt(len(frames))))
+        hauteur, largeur = vignettes[0].shape[:2]
+        lignes = -(-len(vignettes) // colonnes)
+        marge = 4
+        planche = np.full((lignes * (hauteur + marge) + marge, colonnes * (largeur + marge) + marge, 3), 32, dtype=np.uint8)
+        for i, vignette in enumerate(vignettes):
+            y = marge + (i // colonnes) * (hauteur + marge)
+            x = marge + (i % colonnes) * (largeur + marge)
+            planche[y:y + hauteur, x:x + largeur] = vignette
+        return planche
+    
+    def creer_video_demo(self, chemin="demo_video.mp4", largeur=640, hauteur=480, fps=30, duree=5, graine=None,
+                         nombre_frames=None):
+        """Crée une vidéo de démonstration si aucune vidéo n'est fournie
+        
+        Avec une graine, un fond coloré aléatoire mais reproductible défile derrière les formes.
+        nombre_frames (optionnel) remplace la durée par un nombre exact de frames.
+        """
+        self.afficher("🎬 Création d'une vidéo de démonstration...")
+        
+        fond = None
+        if graine is not None:
+            rng = np.random.default_rng(graine)
+            fond = cv2.resize(rng.integers(0, 256, (9, 12, 3), dtype=np.uint8), (largeur, hauteur),
+                              interpolation=cv2.INTER_CUBIC)
+        
+        # Créer une vidéo simple avec des formes animées
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter('demo_video.mp4', fourcc, fps, (largeur, hauteur))
+        out = cv2.VideoWriter(chemin, fourcc, fps, (largeur, hauteur))
         
-        for frame_num in range(fps * duree):
+        if nombre_frames is None:
+            nombre_frames = int(round(fps * duree))
+        for frame_num in range(nombre_frames):
             # Créer une frame avec des formes animées
-            frame = np.zeros((hauteur, largeur, 3), dtype=np.uint8)
+            if fond is None:
+                frame = np.zeros((hauteur, largeur, 3), dtype=np.uint8)
+            else:
+                frame = np.roll(fond, frame_num * 2, axis=1)
             
             # Cercle qui bouge
             centre_x = int(largeur/2 + 100 * math.sin(frame_num * 0.1))
@@ -255,8 +1015,8 @@ class VideoMosaic:
             out.write(frame)
         
         out.release()
-        print("✅ Vidéo de démonstration créée: demo_video.mp4")
-        return "demo_video.mp4"
+        self.afficher(f"✅ Vidéo de démonstration créée: {chemin}")
+        return chemin
 
 def main():
     """Fonction principale"""
@@ -264,26 +1024,139 @@ def main():
     parser.add_argument("video", nargs="?", help="Chemin vers la vidéo à traiter")
     parser.add_argument("--photos", default="photos_mosaique", help="Dossier contenant les photos pour la mosaïque")
     parser.add_argument("--pixel-size", type=int, default=20, help="Taille des 'pixels' photos (défaut: 20)")
-    parser.add_argument("--fps", type=int, default=10, help="FPS de la vidéo de sortie (défaut: 10)")
+    parser.add_argument("--fps", type=float, default=10, help="FPS de la vidéo de sortie (défaut: 10)")
+    parser.add_argument("--start", type=float, default=None, help="Début de l'extrait à traiter, en secondes")
+    parser.add_argument("--end", type=float, default=None, help="Fin de l'extrait à traiter, en secondes")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus de rendu des frames (défaut: 1)")
+    parser.add_argument("--segments", type=float, default=None, metavar="SECONDES",
+                        help="Rend la vidéo par segments de SECONDES, reprenables si le rendu est interrompu")
+    parser.add_argument("--incremental", type=float, default=None, metavar="SEUIL",
+                        help="Ne recherche à nouveau que les blocs dont la couleur moyenne a bougé de plus de SEUIL (ex: 8)")
+    parser.add_argument("--load-workers", type=int, default=None,
+                        help="Nombre de threads pour analyser les photos de la bibliothèque (défaut: nombre de cœurs)")
+    parser.add_argument("--color-table", dest="table_couleurs", type=int, default=None, metavar="NIVEAUX",
+                        help="Précalcule une table de correspondance couleur -> photo de NIVEAUX³ cases (ex: 32 ou 64)")
+    parser.add_argument("--adaptive", type=int, default=None, metavar="TAILLE_MIN",
+                        help="Tuiles adaptatives: de TAILLE_MIN (détails) à --pixel-size (zones unies), en quadtree")
+    parser.add_argument("--variance-threshold", type=float, default=100.0,
+                        help="Variance de couleur au-delà de laquelle une tuile adaptative est coupée en quatre (défaut: 100)")
+    parser.add_argument("--diversity", type=int, default=None, metavar="K",
+                        help="Choisit parmi les K photos les plus proches une photo absente des blocs voisins (ex: 8)")
+    parser.add_argument("--diversity-radius", type=int, default=1,
+                        help="Rayon du voisinage sans répétition, en blocs (défaut: 1)")
+    parser.add_argument("--descriptor", choices=list(VideoMosaic.DESCRIPTEURS), default="bgr",
+                        help="Comparaison des blocs et des photos: couleur moyenne BGR, moyenne Lab, "
+                             "ou couleurs Lab d'une grille de 2x2 ou 4x4 sous-blocs (défaut: bgr)")
+    parser.add_argument("--tile-memory", type=float, default=256, metavar="MO",
+                        help="Mémoire vive réservée aux atlas de tuiles, le reste est lu sur disque (défaut: 256 Mo)")
+    parser.add_argument("--output", default=None, metavar="DESTINATION",
+                        help="Destination du rendu: vidéo (.mp4), dossier d'images, fichier .raw ou .y4m, "
+                             "ou '-' pour la sortie standard (défaut: video_mosaic_output/mosaic_<nom>)")
+    parser.add_argument("--output-format", choices=FORMATS, default=None,
+                        help="Format de --output: mp4, suite d'images png ou jpg, flux brut BGR ou y4m "
+                             "(défaut: d'après l'extension)")
+    parser.add_argument("--grid-cache", nargs="?", const=CacheGrilles.DOSSIER, default=None, metavar="DOSSIER",
+                        help="Garde les grilles de photos de chaque frame: refaire le rendu avec la même vidéo, "
+                             "les mêmes photos et les mêmes réglages ne fait plus que coller les tuiles "
+                             f"(défaut: {CacheGrilles.DOSSIER})")
+    parser.add_argument("--variants", default=None, metavar="TAILLE[@FPS],...",
+                        help="Plusieurs rendus en un seul décodage, ex: 10,20@15,40@5 (FPS par défaut: --fps); "
+                             "--output est alors le dossier des variantes")
+    parser.add_argument("--preview", type=int, default=None, metavar="N",
+                        help="Aperçu rapide: planche de N frames réparties sur la vidéo, rendues à échelle réduite, "
+                             "au lieu du rendu complet (image dans --output ou video_mosaic_output/)")
+    parser.add_argument("--preview-sizes", default=None, metavar="TAILLES",
+                        help="Tailles de tuiles à comparer dans l'aperçu, une ligne par taille (ex: 10,20,40; "
+                             "défaut: --pixel-size)")
+    parser.add_argument("--preview-scale", type=float, default=0.5,
+                        help="Échelle des frames de l'aperçu (défaut: 0.5)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="N'affiche que le chemin de la vidéo créée (et les erreurs)")
+    parser.add_argument("--live", default=None, metavar="SOURCE",
+                        help="Rendu en direct depuis une caméra (indice, ex: 0), l'adresse d'un flux, "
+                             "ou '-' pour des frames BGR brutes sur l'entrée standard")
+    parser.add_argument("--live-size", default=None, metavar="LxH",
+                        help="Taille des frames brutes lues sur l'entrée standard (ex: 640x480)")
+    parser.add_argument("--live-output", choices=["window", "stdout", "y4m"], default="window",
+                        help="Sortie du rendu en direct: fenêtre, frames BGR brutes ou y4m sur la sortie standard")
+    parser.add_argument("--latency-ms", type=float, default=100,
+                        help="Latence visée par frame en direct; les tuiles grossissent pour la tenir (défaut: 100)")
+    parser.add_argument("--max-pixel-size", type=int, default=None,
+                        help="Taille de tuile maximale en direct (défaut: 4 fois --pixel-size)")
+    parser.add_argument("--pre-effect", action="append", default=None, metavar="EFFET",
+                        help="Effet appliqué aux frames avant la mosaïque, répétable: nom ou "
+                             "nom:parametre=valeur,... (" + ", ".join(EFFETS) + ")")
+    parser.add_argument("--post-effect", action="append", default=None, metavar="EFFET",
+                        help="Effet appliqué à la mosaïque, répétable (même syntaxe que --pre-effect)")
     
     args = parser.parse_args()
+    try:
+        ChaineEffets(args.pre_effect), ChaineEffets(args.post_effect)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.diversity_radius < 1:
+        parser.error(f"--diversity-radius doit valoir au moins 1 (reçu: {args.diversity_radius})")
+
+    if args.live is not None:
+        return main_direct(args)
+    
+    if args.preview:
+        return main_apercu(args)
     
-    print("🎨 MOSAÏQUE VIDÉO PHOTOGRAPHIQUE 🎨")
-    print("=" * 50)
+    if args.variants:
+        try:
+            variantes = [(int(t), float(f or args.fps)) for t, _, f in
+                         (v.strip().partition('@') for v in args.variants.split(',') if v.strip())]
+        except ValueError:
+            parser.error(f"Variantes invalides: {args.variants} (ex: 10,20@15,40@5)")
+        if args.segments or args.output == "-":
+            parser.error("--variants ne s'utilise ni avec --segments ni avec --output -")
+        return main_variantes(args, variantes)
+    
+    # Frames sur la sortie standard: les messages passent sur la sortie d'erreur
+    try:
+        sortie = creer_sortie(args.output, args.output_format, args.fps) if args.output else None
+    except ValueError as e:
+        parser.error(str(e))
+    with contextlib.redirect_stdout(sys.stderr if args.output == "-" else sys.stdout):
+        return main_video(args, sortie)
+
+def creer_mosaique(args, **options):
+    """Mosaïque configurée par les options de la ligne de commande (options: paramètres de VideoMosaic à remplacer)"""
+    parametres = dict(niveaux_table=args.table_couleurs, workers_chargement=args.load_workers,
+                      seuil_incremental=args.incremental, silencieux=args.quiet,
+                      taille_min_adaptative=args.adaptive, seuil_variance=args.variance_threshold,
+                      budget_tuiles=int(args.tile_memory * 2**20), diversite=args.diversity,
+                      rayon_diversite=args.diversity_radius, descripteur=args.descriptor,
+                      effets_avant=args.pre_effect, effets_apres=args.post_effect,
+                      cache_grilles=args.grid_cache)
+    parametres.update(options)
+    return VideoMosaic(args.photos, **parametres)
+
+def main_video(args, sortie=None):
+    """Traitement d'une vidéo (ou de la vidéo de démonstration) vers sa sortie"""
+    if not args.quiet:
+        print("🎨 MOSAÏQUE VIDÉO PHOTOGRAPHIQUE 🎨")
+        print("=" * 50)
     
     # Créer l'instance
-    mosaic = VideoMosaic(args.photos)
+    mosaic = creer_mosaique(args)
     
     # Déterminer la vidéo à traiter
     if args.video:
         chemin_video = args.video
     else:
-        print("📹 Aucune vidéo spécifiée. Création d'une vidéo de démonstration...")
+        mosaic.afficher("📹 Aucune vidéo spécifiée. Création d'une vidéo de démonstration...")
         chemin_video = mosaic.creer_video_demo()
     
     # Traiter la vidéo
     try:
-        resultat = mosaic.traiter_video(chemin_video, args.pixel_size, args.fps)
+        resultat = mosaic.traiter_video(chemin_video, args.pixel_size, args.fps, args.workers, args.start, args.end,
+                                        args.segments, sortie=sortie)
+        if args.quiet:
+            print(resultat)
+            return 0 if resultat else 1
         print(f"\n🎉 Traitement terminé avec succès!")
         print(f"📁 Vidéo mosaïque: {resultat}")
         print(f"🔧 Paramètres utilisés:")
@@ -297,5 +1170,96 @@ def main():
     
     return 0
 
+def main_variantes(args, variantes):
+    """Plusieurs variantes (--variants) rendues en un seul décodage de la vidéo"""
+    if not args.quiet:
+        print("🎨 MOSAÏQUE VIDÉO PHOTOGRAPHIQUE 🎨")
+        print("=" * 50)
+    try:
+        mosaic = creer_mosaique(args)
+        chemin_video = args.video or mosaic.creer_video_demo()
+        if args.workers > 1:
+            print("⚠️  Variantes: rendu sur un seul processus")
+        
+        # Une sortie par variante dans le dossier --output (ou video_mosaic_output), au format demandé
+        dossier = args.output or "video_mosaic_output"
+        Path(dossier).mkdir(parents=True, exist_ok=True)
+        extension = {None: None, 'mp4': None, 'png': '', 'jpg': ''}.get(args.output_format, '.' + str(args.output_format))
+        sorties = [creer_sortie(os.path.join(dossier, VideoMosaic.nom_variante(chemin_video, taille, fps, extension)),
+                                args.output_format, fps)
+                   for taille, fps in variantes]
+        
+        resultats = mosaic.traiter_variantes(chemin_video, variantes, args.start, args.end, sorties=sorties)
+    except Exception as e:
+        print(f"❌ Erreur lors du traitement: {e}")
+        return 1
+    
+    if not resultats:
+        return 1
+    if args.quiet:
+        print("\n".join(map(str, resultats)))
+        return 0
+    print(f"\n🎉 Traitement terminé avec succès!")
+    for (taille, fps), resultat in zip(variantes, resultats):
+        print(f"📁 {taille}px, {fps:g} FPS: {resultat}")
+    return 0
+
+def main_apercu(args):
+    """Aperçu rapide (--preview): planche contact au lieu du rendu complet"""
+    if not args.quiet:
+        print("👁️  APERÇU DE LA MOSAÏQUE")
+    try:
+        tailles = [int(t) for t in args.preview_sizes.split(',') if t] if args.preview_sizes else [args.pixel_size]
+        mosaic = creer_mosaique(args)
+        chemin_video = args.video or mosaic.creer_video_demo()
+        
+        debut = time.perf_counter()
+        planche = mosaic.planche_apercu(chemin_video, tailles, args.preview, args.preview_scale, args.start, args.end)
+        if planche is None:
+            return 1
+        chemin = args.output or os.path.join("video_mosaic_output", f"apercu_{Path(chemin_video).stem}.jpg")
+        if os.path.dirname(chemin):
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        if not cv2.imwrite(chemin, planche):
+            print(f"❌ Impossible d'écrire l'aperçu: {chemin}")
+            return 1
+    except Exception as e:
+        print(f"❌ Erreur lors de l'aperçu: {e}")
+        return 1
+    
+    if args.quiet:
+        print(chemin)
+    else:
+        print(f"✅ Aperçu de {args.preview} frames x {len(tailles)} taille(s) en {time.perf_counter() - debut:.1f}s")
+        print(f"📁 Aperçu: {chemin}")
+    return 0
+
+def main_direct(args):
+    """Rendu en direct (--live): les messages vont sur la sortie d'erreur si les frames vont sur la sortie standard"""
+    sortie_standard = sys.stdout.buffer
+    messages = sys.stderr if args.live_output != "window" else sys.stdout
+    with contextlib.redirect_stdout(messages):
+        try:
+            mosaic = creer_mosaique(args)
+            if args.live == "-":
+                if not args.live_size:
+                    print("❌ --live-size est nécessaire pour lire des frames brutes sur l'entrée standard")
+                    return 1
+                largeur, hauteur = (int(v) for v in args.live_size.lower().split('x'))
+                source = source_brute(sys.stdin.buffer, largeur, hauteur)
+            else:
+                largeur, hauteur = (int(v) for v in args.live_size.lower().split('x')) if args.live_size else (None, None)
+                source = source_camera(int(args.live) if args.live.isdigit() else args.live, largeur, hauteur)
+            if args.live_output == "window":
+                sortie = SortieFenetre()
+            else:
+                # File courte: une frame en attente d'écriture ajoute à la latence
+                sortie = SortieFlux(sortie_standard, "raw" if args.live_output == "stdout" else "y4m", taille_file=2)
+            RenduDirect(mosaic, source, sortie, args.pixel_size, args.latency_ms / 1000, args.max_pixel_size).executer()
+        except Exception as e:
+            print(f"❌ Erreur lors du rendu en direct: {e}")
+            return 1
+    return 0
+
 if __name__ == "__main__":
     exit(main())